@@ -9,6 +9,8 @@ from app.models.comparison import Comparison
 from app.models.diff_review import DiffReview
 from app.services.ai_review_service import AIReviewService
 from app.schemas.ai_review import DiffReviewResponse, DiffReviewCreate
+from app.utils.result_codec import get_diff_count, get_diff_list
+from app.utils.diff_engine import STABLE_DIFF_ID_PATTERN
 
 router = APIRouter(
     prefix="/api/ai-review",
@@ -62,6 +64,22 @@ async def _perform_batch_ai_review(db: Session, comparison_id: str, diff_list: L
         
         print(f"[DEBUG] 未审查的差异数量: {len(unreviewed_diffs)}")
         
+        # 同一标准文档的历史对比中已审查过的相同差异（内容寻址ID相同）直接复用审查结果
+        reused_reviews = _find_reusable_reviews(db, comparison, unreviewed_diffs)
+        for diff_id, review in reused_reviews.items():
+            db.add(DiffReview(
+                comparison_id=comparison_uuid,
+                diff_id=diff_id,
+                risk_level=review.risk_level,
+                compliance=review.compliance,
+                review_suggestions=review.review_suggestions,
+                raw_ai_response=review.raw_ai_response
+            ))
+        if reused_reviews:
+            db.commit()
+            unreviewed_diffs = [diff for diff in unreviewed_diffs if (diff.get("element_id") or diff.get("diff_id")) not in reused_reviews]
+            print(f"[DEBUG] 复用历史审查结果 {len(reused_reviews)} 条, 仍需审查 {len(unreviewed_diffs)} 条")
+        
         if not unreviewed_diffs:
             print(f"[DEBUG] All diffs already reviewed for comparison {comparison_id}")
             return
@@ -107,6 +125,27 @@ async def _perform_batch_ai_review(db: Session, comparison_id: str, diff_list: L
         traceback.print_exc()
         db.rollback()
 
+def _find_reusable_reviews(db: Session, comparison: Comparison, diffs: List[Dict]) -> Dict[str, DiffReview]:
+    """查找同一标准文档的其他对比中、差异ID相同的最新审查结果
+
+    只有内容寻址的差异ID（由差异文本和前后文计算）才能跨对比复用，早期按序号生成的ID不参与。
+    """
+    diff_ids = [diff.get("element_id") or diff.get("diff_id") for diff in diffs]
+    diff_ids = [diff_id for diff_id in diff_ids if diff_id and STABLE_DIFF_ID_PATTERN.match(diff_id)]
+    if not diff_ids:
+        return {}
+
+    reviews = db.query(DiffReview).join(Comparison, DiffReview.comparison_id == Comparison.id).filter(
+        Comparison.standard_document_id == comparison.standard_document_id,
+        DiffReview.comparison_id != comparison.id,
+        DiffReview.diff_id.in_(diff_ids)
+    ).order_by(DiffReview.created_at.desc()).all()
+
+    reusable = {}
+    for review in reviews:
+        reusable.setdefault(review.diff_id, review)
+    return reusable
+
 def _process_ai_review_result(result: Dict) -> Dict:
     """处理AI审查结果，确保数据格式正确"""
     processed = {
@@ -150,10 +189,10 @@ async def start_ai_review(
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid comparison ID format")
 
-    if not comparison.result_json or not comparison.result_json.get("diff_list"):
+    if not get_diff_count(comparison.result_json):
         raise HTTPException(status_code=400, detail="No differences found in comparison result to review.")
 
-    diff_list = comparison.result_json["diff_list"]
+    diff_list = get_diff_list(comparison.result_json)
     
     # 启动后台任务进行AI审查
     background_tasks.add_task(_perform_batch_ai_review, db, comparison_id, diff_list)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.services.comparison_service import ComparisonService
@@ -6,16 +7,129 @@ from app.services.document_service import DocumentService
 from app.services.ai_review_service import AIReviewService
 from app.utils.diff_engine import DiffEngine
 from app.utils.image_processor import ImageProcessor
+from app.utils.comparison_cache import get_comparison_cache
+from app.utils.text_normalizer import TextNormalizer
+from app.utils.executors import get_executors
+from app.utils.result_codec import ColumnarResult, decode_result, is_encoded
+from app.utils.coordinate_transform import DEFAULT_RENDER_SCALE, get_page_sizes
 from app.schemas.comparison import ComparisonResponse, ComparisonList
+from app.config import settings
 from pydantic import BaseModel
+from typing import List, Optional, Tuple
 from uuid import UUID
+import asyncio
+import json
 
 router = APIRouter(prefix="/api/comparisons", tags=["comparisons"])
 
+# 单次请求允许的最大渲染倍数
+MAX_RENDER_SCALE = 8.0
+
 class ComparisonRequest(BaseModel):
     standard_document_id: UUID
     target_document_id: UUID
     enable_ai_review: bool = True  # 是否启用AI审查
+    render_scale: Optional[float] = None  # 对比图片渲染倍数，默认取配置 IMAGE_RENDER_SCALE
+
+class ThreeWayComparisonRequest(BaseModel):
+    base_document_id: UUID      # 共同的基准版本
+    standard_document_id: UUID  # 我方版本
+    target_document_id: UUID    # 对方版本
+    enable_ai_review: bool = True  # 是否启用AI审查
+    render_scale: Optional[float] = None  # 对比图片渲染倍数，默认取配置 IMAGE_RENDER_SCALE
+
+class BatchComparisonRequest(BaseModel):
+    standard_document_id: UUID
+    target_document_ids: List[UUID]
+    enable_ai_review: bool = True  # 是否启用AI审查
+    render_scale: Optional[float] = None  # 对比图片渲染倍数，默认取配置 IMAGE_RENDER_SCALE
+
+def _resolve_render_scale(render_scale: Optional[float]) -> float:
+    """请求指定的渲染倍数，未指定时取配置"""
+    if render_scale is None:
+        return settings.IMAGE_RENDER_SCALE
+    if not 0 < render_scale <= MAX_RENDER_SCALE:
+        raise HTTPException(status_code=400, detail=f"渲染倍数须大于0且不超过{MAX_RENDER_SCALE}")
+    return render_scale
+
+async def _get_cached_response(cache_key: str, db: Session, render_scale: float = DEFAULT_RENDER_SCALE) -> dict:
+    """查找内容相同的已完成对比；对应的对比记录已被删除时使缓存失效，图片渲染倍数不同时不命中"""
+    if not settings.COMPARISON_CACHE_ENABLED:
+        return None
+    cache = get_comparison_cache()
+    cached_response = cache.get(cache_key)
+    if cached_response is None or cached_response.get("render_scale", DEFAULT_RENDER_SCALE) != render_scale:
+        return None
+    comparison = await ComparisonService(db).get_comparison(cached_response["comparison_id"])
+    if not comparison:
+        cache.invalidate(cache_key)
+        return None
+    print(f"[DEBUG] 对比缓存命中: comparison_id={cached_response['comparison_id']}")
+    return cached_response
+
+async def _adopt_cached_response(cached_response: dict, standard_document_id, target_document_id, enable_ai_review: bool, db: Session, background_tasks: BackgroundTasks) -> dict:
+    """缓存按内容哈希命中，结果可能属于另一对文档（内容相同的重复上传）
+
+    此时为本次请求的文档对保存一条新的对比记录（复用已保存的结果），并改写响应中的对比ID、PDF地址和AI审查标志；
+    同一对文档直接返回缓存的响应。
+    """
+    comparison_service = ComparisonService(db)
+    source = await comparison_service.get_comparison(cached_response["comparison_id"])
+    if str(source.standard_document_id) == str(standard_document_id) and str(source.target_document_id) == str(target_document_id):
+        return cached_response
+
+    comparison = await comparison_service.create_comparison({
+        "standard_document_id": standard_document_id,
+        "target_document_id": target_document_id,
+        "result_json": source.result_json,
+        "status": "completed",
+        "differences_count": len(cached_response["diff_list"])
+    })
+    print(f"[DEBUG] 复用缓存结果: {source.id} -> {comparison.id}")
+    if enable_ai_review and cached_response["diff_list"]:
+        from app.api.ai_review import _perform_batch_ai_review
+        background_tasks.add_task(_perform_batch_ai_review, db, str(comparison.id), cached_response["diff_list"])
+    return {
+        **cached_response,
+        "comparison_id": str(comparison.id),
+        "standard_pdf_url": f"/api/documents/{standard_document_id}/pdf",
+        "target_pdf_url": f"/api/documents/{target_document_id}/pdf",
+        "ai_review_enabled": enable_ai_review
+    }
+
+def _put_cached_response(cache_key: str, response: dict):
+    # 含降级对比区段的结果与当时的负载有关，不缓存，下次重新计算
+    if response.get("summary", {}).get("coarse_differences"):
+        return
+    if settings.COMPARISON_CACHE_ENABLED:
+        get_comparison_cache().put(cache_key, response)
+
+def _page_batches(diff_list: List[dict]) -> List[Tuple[int, List[dict]]]:
+    """按标准文档页号分批重放已保存的差异项，每页只产出一次（与 DiffEngine.iter_compare_documents 的分批一致）
+
+    新增项的 page_index 是目标文档页号，归入前一批（其插入位置之前的差异所在的标准文档页）。
+    """
+    batches: List[Tuple[int, List[dict]]] = []
+    for diff_item in diff_list:
+        page_index = diff_item.get("page_index", 0)
+        if batches and (diff_item.get("status") == "ADD" or page_index <= batches[-1][0]):
+            batches[-1][1].append(diff_item)
+        else:
+            batches.append((page_index, [diff_item]))
+    return batches
+
+def _create_diff_engine(**kwargs) -> DiffEngine:
+    """按配置创建差异引擎；差异计算默认提交到共享执行器，不阻塞事件循环"""
+    kwargs.setdefault("executor", get_executors().cpu_executor)
+    return DiffEngine(
+        algorithm=settings.DIFF_ALGORITHM,
+        granularity=settings.DIFF_GRANULARITY,
+        highlight_mode=settings.DIFF_HIGHLIGHT_MODE,
+        normalize_rules=TextNormalizer.parse_rules(settings.DIFF_NORMALIZE_RULES),
+        time_budget=settings.DIFF_TIME_BUDGET_S or None,
+        memory_budget_mb=settings.DIFF_MEMORY_BUDGET_MB or None,
+        **kwargs
+    )
 
 @router.post("/", response_model=dict)
 async def create_comparison(
@@ -34,10 +148,22 @@ async def create_comparison(
     
     if standard_doc.status != "processed" or target_doc.status != "processed":
         raise HTTPException(status_code=400, detail="文档尚未处理完成")
+
+    render_scale = _resolve_render_scale(request.render_scale)
     
     try:
         # 执行差异对比
-        diff_engine = DiffEngine()
+        diff_engine = _create_diff_engine()
+
+        # 相同内容、相同选项的对比直接返回已保存的结果
+        cache_key = diff_engine.cache_key(standard_doc.content_json, target_doc.content_json)
+        cached_response = await _get_cached_response(cache_key, db, render_scale)
+        if cached_response:
+            cached_response = await _adopt_cached_response(
+                cached_response, request.standard_document_id, request.target_document_id, request.enable_ai_review, db, background_tasks
+            )
+            return {**cached_response, "cached": True}
+
         comparison_result = await diff_engine.compare_documents(
             standard_doc.content_json,
             target_doc.content_json
@@ -49,7 +175,8 @@ async def create_comparison(
             standard_doc.pdf_path or standard_doc.file_path,
             target_doc.pdf_path or target_doc.file_path,
             f"comp_{request.standard_document_id}_{request.target_document_id}",
-            comparison_result["diff_list"]  # 传递差异列表
+            comparison_result["diff_list"],  # 传递差异列表
+            render_scale
         )
         
         # 将AI审查标志添加到结果中
@@ -74,7 +201,7 @@ async def create_comparison(
         else:
             print(f"[DEBUG] 未启动AI审查: enable_ai_review={request.enable_ai_review}, diff_list存在={bool(comparison_result['diff_list'])}")
         
-        return {
+        response = {
             "comparison_id": str(comparison.id),
             "standard_pdf_url": f"/api/documents/{request.standard_document_id}/pdf",
             "target_pdf_url": f"/api/documents/{request.target_document_id}/pdf",
@@ -83,33 +210,353 @@ async def create_comparison(
             "diff_list": comparison_result["diff_list"],
             "summary": comparison_result["summary"],
             "ai_review_enabled": request.enable_ai_review,
-            "page_count": len(images["standard_images"])  # 添加页数信息
+            "page_count": len(images["standard_images"]),  # 添加页数信息
+            "render_scale": render_scale
         }
+        _put_cached_response(cache_key, response)
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"对比处理失败: {str(e)}")
 
+@router.post("/stream")
+async def create_comparison_stream(
+    request: ComparisonRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """流式创建文档对比任务 - 以NDJSON逐页返回差异项，最后返回摘要
+
+    每行一个JSON事件:
+        {"type": "page", "page_index": 0, "diff_list": [...]}
+        {"type": "summary", "comparison_id": "...", "summary": {...}, ...}
+        {"type": "error", "detail": "..."}
+
+    page 事件按标准文档页号分批，每页只出现一次；新增项随其插入位置所在的标准文档页产出，自身的 page_index 为目标文档页号。
+    """
+    document_service = DocumentService(db)
+    standard_doc = await document_service.get_document(str(request.standard_document_id))
+    target_doc = await document_service.get_document(str(request.target_document_id))
+    
+    if not standard_doc or not target_doc:
+        raise HTTPException(status_code=404, detail="文档不存在")
+    
+    if standard_doc.status != "processed" or target_doc.status != "processed":
+        raise HTTPException(status_code=400, detail="文档尚未处理完成")
+
+    render_scale = _resolve_render_scale(request.render_scale)
+
+    async def event_stream():
+        diff_list = []
+        try:
+            diff_engine = _create_diff_engine()
+            cache_key = diff_engine.cache_key(standard_doc.content_json, target_doc.content_json)
+            cached_response = await _get_cached_response(cache_key, db, render_scale)
+            if cached_response:
+                cached_response = await _adopt_cached_response(
+                    cached_response, request.standard_document_id, request.target_document_id, request.enable_ai_review, db, background_tasks
+                )
+                # 缓存命中：按页重放已保存的差异项
+                for page_index, page_batch in _page_batches(cached_response["diff_list"]):
+                    yield json.dumps({"type": "page", "page_index": page_index, "diff_list": page_batch}, ensure_ascii=False) + "\n"
+                summary_event = {key: value for key, value in cached_response.items() if key != "diff_list"}
+                yield json.dumps({"type": "summary", **summary_event, "cached": True}, ensure_ascii=False) + "\n"
+                return
+
+            summary = {}
+            async for event in diff_engine.iter_compare_documents(standard_doc.content_json, target_doc.content_json):
+                if event["type"] == "page":
+                    diff_list.extend(event["diff_list"])
+                else:
+                    summary = event["summary"]
+                    continue
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+
+            # 全部差异产出后再生成带标记的对比图片
+            image_processor = ImageProcessor()
+            images = await image_processor.generate_comparison_images(
+                standard_doc.pdf_path or standard_doc.file_path,
+                target_doc.pdf_path or target_doc.file_path,
+                f"comp_{request.standard_document_id}_{request.target_document_id}",
+                diff_list,
+                render_scale
+            )
+
+            comparison_result = {
+                "diff_list": diff_list,
+                "summary": summary,
+                "ai_review_enabled": request.enable_ai_review
+            }
+            comparison_service = ComparisonService(db)
+            comparison = await comparison_service.create_comparison({
+                "standard_document_id": request.standard_document_id,
+                "target_document_id": request.target_document_id,
+                "result_json": comparison_result,
+                "status": "completed",
+                "differences_count": len(diff_list)
+            })
+
+            # 后台任务在流结束后执行
+            if request.enable_ai_review and diff_list:
+                print(f"[DEBUG] 启动AI审查后台任务: comparison_id={comparison.id}")
+                from app.api.ai_review import _perform_batch_ai_review
+                background_tasks.add_task(_perform_batch_ai_review, db, str(comparison.id), diff_list)
+
+            summary_event = {
+                "comparison_id": str(comparison.id),
+                "standard_pdf_url": f"/api/documents/{request.standard_document_id}/pdf",
+                "target_pdf_url": f"/api/documents/{request.target_document_id}/pdf",
+                "standard_images": images["standard_images"],
+                "target_images": images["target_images"],
+                "summary": summary,
+                "ai_review_enabled": request.enable_ai_review,
+                "page_count": len(images["standard_images"]),
+                "render_scale": render_scale
+            }
+            # 流式对比只在区段内检测移动，结果可能与整篇对比不同，不写入缓存（避免普通对比命中流式结果）
+            yield json.dumps({"type": "summary", **summary_event}, ensure_ascii=False) + "\n"
+
+        except Exception as e:
+            print(f"[DEBUG] 流式对比失败: {e}")
+            yield json.dumps({"type": "error", "detail": f"对比处理失败: {str(e)}"}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.post("/three-way", response_model=dict)
+async def create_three_way_comparison(
+    request: ThreeWayComparisonRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """创建三方对比任务 - 以基准版本为参照区分我方与对方的修改，并标出冲突"""
+    document_service = DocumentService(db)
+    base_doc = await document_service.get_document(str(request.base_document_id))
+    standard_doc = await document_service.get_document(str(request.standard_document_id))
+    target_doc = await document_service.get_document(str(request.target_document_id))
+
+    if not base_doc or not standard_doc or not target_doc:
+        raise HTTPException(status_code=404, detail="文档不存在")
+
+    if base_doc.status != "processed" or standard_doc.status != "processed" or target_doc.status != "processed":
+        raise HTTPException(status_code=400, detail="文档尚未处理完成")
+
+    render_scale = _resolve_render_scale(request.render_scale)
+
+    try:
+        diff_engine = _create_diff_engine()
+        comparison_result = await diff_engine.compare_three_way(
+            base_doc.content_json,
+            standard_doc.content_json,
+            target_doc.content_json
+        )
+
+        image_processor = ImageProcessor()
+        images = await image_processor.generate_comparison_images(
+            standard_doc.pdf_path or standard_doc.file_path,
+            target_doc.pdf_path or target_doc.file_path,
+            f"comp3_{request.base_document_id}_{request.standard_document_id}_{request.target_document_id}",
+            comparison_result["diff_list"],
+            render_scale
+        )
+
+        comparison_result["ai_review_enabled"] = request.enable_ai_review
+        comparison_result["base_document_id"] = str(request.base_document_id)
+
+        comparison_service = ComparisonService(db)
+        comparison = await comparison_service.create_comparison({
+            "standard_document_id": request.standard_document_id,
+            "target_document_id": request.target_document_id,
+            "result_json": comparison_result,
+            "status": "completed",
+            "differences_count": len(comparison_result["diff_list"])
+        })
+
+        if request.enable_ai_review and comparison_result["diff_list"]:
+            print(f"[DEBUG] 启动AI审查后台任务: comparison_id={comparison.id}")
+            from app.api.ai_review import _perform_batch_ai_review
+            background_tasks.add_task(_perform_batch_ai_review, db, str(comparison.id), comparison_result["diff_list"])
+
+        return {
+            "comparison_id": str(comparison.id),
+            "mode": "three_way",
+            "base_document_id": str(request.base_document_id),
+            "standard_pdf_url": f"/api/documents/{request.standard_document_id}/pdf",
+            "target_pdf_url": f"/api/documents/{request.target_document_id}/pdf",
+            "standard_images": images["standard_images"],
+            "target_images": images["target_images"],
+            "diff_list": comparison_result["diff_list"],
+            "summary": comparison_result["summary"],
+            "ai_review_enabled": request.enable_ai_review,
+            "page_count": len(images["standard_images"]),
+            "render_scale": render_scale
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"三方对比处理失败: {str(e)}")
+
+@router.post("/batch", response_model=dict)
+async def create_batch_comparison(
+    request: BatchComparisonRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """一对多批量对比 - 标准文档只预处理和渲染一次，与多个目标文档并发对比，每个目标生成一条对比记录"""
+    if not request.target_document_ids:
+        raise HTTPException(status_code=400, detail="目标文档列表为空")
+    render_scale = _resolve_render_scale(request.render_scale)
+
+    document_service = DocumentService(db)
+    standard_doc = await document_service.get_document(str(request.standard_document_id))
+    if not standard_doc:
+        raise HTTPException(status_code=404, detail="标准文档不存在")
+    if standard_doc.status != "processed":
+        raise HTTPException(status_code=400, detail="标准文档尚未处理完成")
+
+    target_docs = []
+    for target_document_id in request.target_document_ids:
+        target_doc = await document_service.get_document(str(target_document_id))
+        if not target_doc:
+            raise HTTPException(status_code=404, detail=f"目标文档不存在: {target_document_id}")
+        if target_doc.status != "processed":
+            raise HTTPException(status_code=400, detail=f"目标文档尚未处理完成: {target_document_id}")
+        target_docs.append(target_doc)
+
+    print(f"[DEBUG] 批量对比: 标准文档={request.standard_document_id}, 目标文档数={len(target_docs)}")
+    standard_data = standard_doc.content_json
+    standard_path = standard_doc.pdf_path or standard_doc.file_path
+    image_processor = ImageProcessor()
+
+    # 标准文档的坐标索引、字符映射、归一化文本和文本哈希只构建一次，各目标共享
+    document_cache = {}
+    _create_diff_engine(document_cache=document_cache).prepare_document(standard_data)
+    # 标准文档页面只渲染一次，各目标在其副本上绘制差异
+    standard_base_images = await image_processor.pdf_to_images(standard_path, f"batch_{request.standard_document_id}_standard_base", render_scale)
+    standard_page_sizes = get_page_sizes(standard_data)
+
+    # 各目标的差异计算在共享执行器中并发执行
+    async def compare_target(target_doc):
+        diff_engine = _create_diff_engine(document_cache=document_cache)
+        cache_key = diff_engine.cache_key(standard_data, target_doc.content_json)
+        cached_response = await _get_cached_response(cache_key, db, render_scale)
+        if cached_response:
+            return cache_key, cached_response, None, None
+
+        comparison_result = await diff_engine.compare_documents(standard_data, target_doc.content_json)
+        images = await image_processor.generate_comparison_images_with_base(
+            standard_base_images,
+            target_doc.pdf_path or target_doc.file_path,
+            f"comp_{request.standard_document_id}_{target_doc.id}",
+            comparison_result["diff_list"],
+            render_scale,
+            standard_page_sizes
+        )
+        return cache_key, None, comparison_result, images
+
+    outcomes = await asyncio.gather(*[compare_target(target_doc) for target_doc in target_docs], return_exceptions=True)
+
+    # 数据库会话不支持并发，对比记录按顺序写入
+    comparison_service = ComparisonService(db)
+    results = []
+    for target_doc, outcome in zip(target_docs, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"[DEBUG] 批量对比失败: target={target_doc.id}, {outcome}")
+            results.append({"target_document_id": str(target_doc.id), "status": "failed", "error": f"对比处理失败: {str(outcome)}"})
+            continue
+
+        cache_key, cached_response, comparison_result, images = outcome
+        if cached_response:
+            response = await _adopt_cached_response(
+                cached_response, request.standard_document_id, target_doc.id, request.enable_ai_review, db, background_tasks
+            )
+        else:
+            comparison_result["ai_review_enabled"] = request.enable_ai_review
+            comparison = await comparison_service.create_comparison({
+                "standard_document_id": request.standard_document_id,
+                "target_document_id": target_doc.id,
+                "result_json": comparison_result,
+                "status": "completed",
+                "differences_count": len(comparison_result["diff_list"])
+            })
+            if request.enable_ai_review and comparison_result["diff_list"]:
+                from app.api.ai_review import _perform_batch_ai_review
+                background_tasks.add_task(_perform_batch_ai_review, db, str(comparison.id), comparison_result["diff_list"])
+
+            response = {
+                "comparison_id": str(comparison.id),
+                "standard_pdf_url": f"/api/documents/{request.standard_document_id}/pdf",
+                "target_pdf_url": f"/api/documents/{target_doc.id}/pdf",
+                "standard_images": images["standard_images"],
+                "target_images": images["target_images"],
+                "diff_list": comparison_result["diff_list"],
+                "summary": comparison_result["summary"],
+                "ai_review_enabled": request.enable_ai_review,
+                "page_count": len(images["standard_images"]),
+                "render_scale": render_scale
+            }
+            _put_cached_response(cache_key, response)
+
+        # 差异明细较大，批量接口只返回摘要，明细通过 GET /api/comparisons/{comparison_id} 获取
+        results.append({
+            "target_document_id": str(target_doc.id),
+            "status": "completed",
+            "cached": cached_response is not None,
+            **{key: value for key, value in response.items() if key != "diff_list"},
+            "differences_count": len(response["diff_list"])
+        })
+
+    return {
+        "standard_document_id": str(request.standard_document_id),
+        "total": len(results),
+        "completed": len([result for result in results if result["status"] == "completed"]),
+        "results": results
+    }
+
 @router.get("/", response_model=ComparisonList)
 async def list_comparisons(db: Session = Depends(get_db)):
-    """获取对比任务列表"""
+    """获取对比任务列表（result_json 还原为旧格式，与列式存储之前的响应一致）"""
     comparison_service = ComparisonService(db)
     comparisons = await comparison_service.list_comparisons()
-    return ComparisonList(comparisons=comparisons, total=len(comparisons))
+    responses = await get_executors().run_in_thread(_legacy_comparison_responses, comparisons)
+    return ComparisonList(comparisons=responses, total=len(responses))
+
+def _legacy_comparison_responses(comparisons) -> List[ComparisonResponse]:
+    """解压列式结果；不修改ORM对象，避免编码结果被还原后写回数据库"""
+    return [
+        ComparisonResponse.model_validate(comparison).model_copy(update={"result_json": decode_result(comparison.result_json)})
+        for comparison in comparisons
+    ]
 
 @router.get("/{comparison_id}", response_model=dict)
-async def get_comparison_result(comparison_id: str, db: Session = Depends(get_db)):
-    """获取对比结果"""
+async def get_comparison_result(comparison_id: str, format: str = "legacy", db: Session = Depends(get_db)):
+    """获取对比结果
+
+    format=legacy（默认）返回嵌套的 diff_list；format=columns 返回并行数组形式的 columns，不展开逐项高亮结构。
+    """
+    if format not in ("legacy", "columns"):
+        raise HTTPException(status_code=400, detail=f"不支持的结果格式: {format}")
+
     comparison_service = ComparisonService(db)
     comparison = await comparison_service.get_comparison(comparison_id)
     if not comparison:
         raise HTTPException(status_code=404, detail="对比任务不存在")
     
-    return {
+    response = {
         "comparison_id": str(comparison.id),
         "standard_document_id": str(comparison.standard_document_id),
         "target_document_id": str(comparison.target_document_id),
         "status": comparison.status,
-        "diff_list": comparison.result_json["diff_list"],
         "summary": comparison.result_json["summary"],
         "created_at": comparison.created_at
     }
+    result_json = comparison.result_json
+    if not is_encoded(result_json):
+        # 列式格式之前保存的结果
+        response["diff_list"] = result_json["diff_list"]
+        return response
+
+    columnar_result = await get_executors().run_in_thread(ColumnarResult, result_json)
+    if format == "columns":
+        response["columns"] = columnar_result.to_columns()
+    else:
+        response["diff_list"] = await get_executors().run_in_thread(columnar_result.to_diff_list)
+    return response
@@ -10,6 +10,8 @@ class Settings:
     DOCUMENTS_DIR: str = "uploads/documents"
     IMAGES_DIR: str = "uploads/images"
     TEMP_DIR: str = "uploads/temp"
+    # 对比图片的页面渲染倍数（PDF点 -> 像素），对比请求可通过 render_scale 单独指定
+    IMAGE_RENDER_SCALE: float = float(os.getenv("IMAGE_RENDER_SCALE", "2.0"))
     
     # 文件大小限制 (50MB)
     MAX_FILE_SIZE: int = 50 * 1024 * 1024
@@ -23,6 +25,29 @@ class Settings:
     # 支持的文件扩展名
     ALLOWED_EXTENSIONS: list = [".pdf", ".docx", ".doc"]
     
+    # 差异算法: auto(按文档规模选择) / myers / patience / sequence_matcher
+    DIFF_ALGORITHM: str = os.getenv("DIFF_ALGORITHM", "auto")
+    # 对比粒度: char(整篇字符级) / hierarchical(段落 -> 句子 -> 字符分层对比) / clause(按"第X条"、"X.Y"编号对齐条款后逐条对比) / token(按词元对比：中文分词、数字/金额/日期整体比较，并合并零碎修改)
+    DIFF_GRANULARITY: str = os.getenv("DIFF_GRANULARITY", "char")
+    # 高亮格式: run(同行连续字符合并为一个矩形) / char(每个字符一个高亮项，兼容旧格式)
+    DIFF_HIGHLIGHT_MODE: str = os.getenv("DIFF_HIGHLIGHT_MODE", "run")
+    # 对比前的文本归一化规则（逗号分隔，默认关闭）: fullwidth(全角转半角) / cjk_spaces(删除中文字间空白) / hyphenation(删除软连字符)
+    # 开启后差异位置映射回原文，equal 区间两侧的原文可能只差空白或全角/半角，不再逐字节相同
+    DIFF_NORMALIZE_RULES: str = os.getenv("DIFF_NORMALIZE_RULES", "")
+    
+    # 每个对比区段的时间/内存预算（0 表示不限），超出时该区段降级为行级对比并在结果中标记 coarse
+    DIFF_TIME_BUDGET_S: float = float(os.getenv("DIFF_TIME_BUDGET_S", "30"))
+    DIFF_MEMORY_BUDGET_MB: int = int(os.getenv("DIFF_MEMORY_BUDGET_MB", "1024"))
+    
+    # 对比结果缓存（按文档内容哈希命中，LRU淘汰）
+    COMPARISON_CACHE_ENABLED: bool = os.getenv("COMPARISON_CACHE_ENABLED", "true").lower() == "true"
+    COMPARISON_CACHE_MAX_ENTRIES: int = int(os.getenv("COMPARISON_CACHE_MAX_ENTRIES", "128"))
+    COMPARISON_CACHE_MAX_MB: int = int(os.getenv("COMPARISON_CACHE_MAX_MB", "256"))
+    
+    # 执行器配置：线程池处理PyMuPDF解析/渲染，进程池处理差异计算（-1 表示CPU核数，0 表示不启用进程池）
+    EXECUTOR_THREAD_WORKERS: int = int(os.getenv("EXECUTOR_THREAD_WORKERS", "4"))
+    EXECUTOR_PROCESS_WORKERS: int = int(os.getenv("EXECUTOR_PROCESS_WORKERS", "-1"))
+    
     # AI模型配置
     ARK_BASE_URL: str = os.getenv("ARK_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3/")
     ARK_API_KEY: str = os.getenv("ARK_API_KEY", "your_api_key_here")
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import documents, comparisons, ai_review
+from app.utils.executors import get_executors, shutdown_executors
 
 app = FastAPI(title="合同差异对比系统", version="1.0.0")
 
@@ -31,3 +32,12 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics/executors")
+async def executor_metrics():
+    """执行器层的排队深度、等待时间和执行时间"""
+    return get_executors().stats()
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_executors()
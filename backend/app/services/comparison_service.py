@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from app.models.comparison import Comparison
 from app.schemas.comparison import ComparisonCreate
+from app.utils.executors import get_executors
+from app.utils.result_codec import encode_result, is_encoded
 from typing import List, Optional
 from uuid import UUID
 
@@ -9,7 +11,10 @@ class ComparisonService:
         self.db = db
     
     async def create_comparison(self, comparison_data: dict) -> Comparison:
-        """创建对比任务"""
+        """创建对比任务（对比结果以列式压缩格式保存）"""
+        result_json = comparison_data.get("result_json")
+        if result_json and "diff_list" in result_json and not is_encoded(result_json):
+            comparison_data = {**comparison_data, "result_json": await get_executors().run_in_thread(encode_result, result_json)}
         comparison = Comparison(**comparison_data)
         self.db.add(comparison)
         self.db.commit()
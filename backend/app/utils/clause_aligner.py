@@ -0,0 +1,173 @@
+import difflib
+import re
+from typing import List, Dict, Optional, Tuple
+from app.utils.diff_algorithms import Opcode, create_diff_algorithm
+from app.utils.hierarchical_diff import BudgetedDiff, CoarseSection, merge_opcodes
+
+# 条款编号：第X条（中文或阿拉伯数字），或 X.Y / X.Y.Z 形式的多级编号
+# 只识别位于文本开头、句末标点或空白之后的编号，避免把"根据第五条约定"之类的引用当作条款起点
+CLAUSE_HEADING_PATTERN = re.compile(
+    r'(?:^|(?<=[。；;：:！？!?\s　）)]))'
+    r'(第\s*[一二三四五六七八九十百千零〇两\d]+\s*条|\d{1,3}(?:\.\d{1,3})+(?![\d.%万元亿]))'
+)
+
+# 按标题相似度配对时比较的条款开头字符数
+TITLE_CHARS = 40
+# 标题相似度低于该值的条款不配对，按整条删除/新增处理
+MIN_TITLE_SIMILARITY = 0.5
+# 编号相同时的相似度加成
+SAME_NUMBER_BONUS = 0.2
+# 未对齐区域内两侧条款数之积超过该值时不再两两比较标题
+MAX_PAIRING_CELLS = 10000
+
+
+def find_renumbered_clauses(text1: str, text2: str, opcodes: List[Opcode]) -> List[Tuple[str, str]]:
+    """从条款对齐对比的操作码中找出重新编号的条款 [(原编号, 新编号), ...]
+
+    重新编号的编号范围以 equal 输出，是唯一两侧文本不同的 equal 区域，其中的条款编号按顺序一一对应。
+    """
+    renumbered = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != 'equal' or text1[i1:i2] == text2[j1:j2]:
+            continue
+        numbers1 = [re.sub(r'\s+', '', match.group(1)) for match in CLAUSE_HEADING_PATTERN.finditer(text1, i1, i2)]
+        numbers2 = [re.sub(r'\s+', '', match.group(1)) for match in CLAUSE_HEADING_PATTERN.finditer(text2, j1, j2)]
+        renumbered.extend((number1, number2) for number1, number2 in zip(numbers1, numbers2) if number1 != number2)
+    return renumbered
+
+
+class Clause:
+    """条款区间 [start, end)：从编号开始到下一个编号之前；第一个编号之前的内容作为无编号的前言"""
+
+    __slots__ = ("start", "end", "number", "body_start")
+
+    def __init__(self, start: int, end: int, number: Optional[str], body_start: int):
+        self.start = start
+        self.end = end
+        self.number = number          # 归一化后的编号（去除空白），前言为 None
+        self.body_start = body_start  # 编号之后正文的起点
+
+
+class ClauseSegmenter:
+    """按条款编号切分合同文本，得到首尾相接、覆盖全文的条款区间"""
+
+    def split(self, text: str) -> List[Clause]:
+        headings = [(match.start(1), match.end(1), re.sub(r'\s+', '', match.group(1))) for match in CLAUSE_HEADING_PATTERN.finditer(text)]
+        clauses = []
+        if not headings or headings[0][0] > 0:
+            first_start = headings[0][0] if headings else len(text)
+            clauses.append(Clause(0, first_start, None, 0))
+        for index, (start, body_start, number) in enumerate(headings):
+            end = headings[index + 1][0] if index + 1 < len(headings) else len(text)
+            clauses.append(Clause(start, end, number, body_start))
+        return clauses
+
+
+class ClauseAlignedDiff:
+    """条款对齐对比
+
+    先按条款切分两侧文本，正文（去掉编号）完全相同的条款直接对齐，
+    其余条款按编号和标题相似度配对（可识别插入条款后的整体重新编号），
+    只对配对的条款做字符级对比；未配对的条款按整条删除/新增输出。
+    配对条款的编号不同（如插入条款后 第3条 -> 第4条）时，编号范围按 equal 输出，不逐条报告差异，
+    重新编号由 find_renumbered_clauses 从操作码中汇总。
+    条款数不足时回退为整篇字符级对比。
+    """
+
+    def __init__(self, algorithm: str = "auto", time_budget: float = None, memory_budget: int = None):
+        self.segmenter = ClauseSegmenter()
+        self.char_differ = BudgetedDiff(algorithm, time_budget, memory_budget)
+        self.aligned_pairs = 0  # 最近一次对比中对齐的条款对数
+
+    @property
+    def coarse_sections(self) -> List[CoarseSection]:
+        return self.char_differ.coarse_sections
+
+    def get_opcodes(self, text1: str, text2: str) -> List[Opcode]:
+        clauses1 = self.segmenter.split(text1)
+        clauses2 = self.segmenter.split(text2)
+        if len(clauses1) < 2 or len(clauses2) < 2:
+            return self.char_differ.get_opcodes(text1, text2, 0, len(text1), 0, len(text2))
+
+        pairs = self._align(text1, text2, clauses1, clauses2)
+        self.aligned_pairs = len(pairs)
+
+        opcodes = []
+        last_a, last_b = 0, 0
+        for i, j in pairs + [(len(clauses1), len(clauses2))]:
+            a_start = clauses1[i].start if i < len(clauses1) else len(text1)
+            b_start = clauses2[j].start if j < len(clauses2) else len(text2)
+            # 两个配对之间未配对的条款整体删除/新增
+            if a_start > last_a or b_start > last_b:
+                tag = 'replace' if a_start > last_a and b_start > last_b else ('delete' if a_start > last_a else 'insert')
+                opcodes.append((tag, last_a, a_start, last_b, b_start))
+            if i < len(clauses1):
+                clause1, clause2 = clauses1[i], clauses2[j]
+                if clause1.number is not None and clause2.number is not None:
+                    # 编号与正文分开对比，重新编号不影响正文的对齐；编号相同时只可能是空白不同，按字符对比
+                    if clause1.number != clause2.number:
+                        opcodes.append(('equal', clause1.start, clause1.body_start, clause2.start, clause2.body_start))
+                    else:
+                        opcodes.extend(self.char_differ.get_opcodes(text1, text2, clause1.start, clause1.body_start, clause2.start, clause2.body_start))
+                    opcodes.extend(self.char_differ.get_opcodes(text1, text2, clause1.body_start, clause1.end, clause2.body_start, clause2.end))
+                else:
+                    opcodes.extend(self.char_differ.get_opcodes(text1, text2, clause1.start, clause1.end, clause2.start, clause2.end))
+                last_a, last_b = clause1.end, clause2.end
+        return merge_opcodes(opcodes)
+
+    def _align(self, text1: str, text2: str, clauses1: List[Clause], clauses2: List[Clause]) -> List[Tuple[int, int]]:
+        """返回按两侧顺序单调递增的条款配对 [(i, j), ...]"""
+        body_ids: Dict[str, int] = {}
+        ids1 = [body_ids.setdefault(text1[clause.body_start:clause.end], len(body_ids)) for clause in clauses1]
+        ids2 = [body_ids.setdefault(text2[clause.body_start:clause.end], len(body_ids)) for clause in clauses2]
+
+        pairs = []
+        for tag, i1, i2, j1, j2 in create_diff_algorithm("patience").get_opcodes(ids1, ids2):
+            if tag == 'equal':
+                pairs.extend(zip(range(i1, i2), range(j1, j2)))
+            elif tag == 'replace':
+                pairs.extend(self._pair_by_title(text1, text2, clauses1, clauses2, i1, i2, j1, j2))
+        return pairs
+
+    def _pair_by_title(self, text1: str, text2: str, clauses1: List[Clause], clauses2: List[Clause], i1: int, i2: int, j1: int, j2: int) -> List[Tuple[int, int]]:
+        """在未对齐区域内按编号和标题相似度做保序配对（动态规划求相似度之和最大的配对）"""
+        rows, cols = i2 - i1, j2 - j1
+        if rows * cols > MAX_PAIRING_CELLS:
+            # 区域过大时不再配对，整个区域按删除/新增输出
+            return []
+
+        titles1 = [text1[clause.body_start:clause.body_start + TITLE_CHARS] for clause in clauses1[i1:i2]]
+        titles2 = [text2[clause.body_start:clause.body_start + TITLE_CHARS] for clause in clauses2[j1:j2]]
+        scores = [[0.0] * cols for _ in range(rows)]
+        for row in range(rows):
+            matcher = difflib.SequenceMatcher(None, autojunk=False)
+            matcher.set_seq2(titles1[row])
+            for col in range(cols):
+                matcher.set_seq1(titles2[col])
+                score = matcher.ratio()
+                if clauses1[i1 + row].number == clauses2[j1 + col].number:
+                    score += SAME_NUMBER_BONUS
+                if score >= MIN_TITLE_SIMILARITY:
+                    scores[row][col] = score
+
+        # best[r][c]: 前r个、前c个条款的最大相似度之和
+        best = [[0.0] * (cols + 1) for _ in range(rows + 1)]
+        for row in range(rows - 1, -1, -1):
+            for col in range(cols - 1, -1, -1):
+                candidates = [best[row + 1][col], best[row][col + 1]]
+                if scores[row][col]:
+                    candidates.append(best[row + 1][col + 1] + scores[row][col])
+                best[row][col] = max(candidates)
+
+        pairs = []
+        row, col = 0, 0
+        while row < rows and col < cols:
+            if scores[row][col] and best[row][col] == best[row + 1][col + 1] + scores[row][col]:
+                pairs.append((i1 + row, j1 + col))
+                row += 1
+                col += 1
+            elif best[row][col] == best[row + 1][col]:
+                row += 1
+            else:
+                col += 1
+        return pairs
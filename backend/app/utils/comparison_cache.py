@@ -0,0 +1,85 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ComparisonCache:
+    """对比结果缓存 - 以文档内容哈希为键的LRU缓存，按条目数和总字节数限制容量"""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """查找缓存，命中时将条目移到最近使用的位置"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: Dict):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        size = len(json.dumps(entry, ensure_ascii=False, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            print(f"[DEBUG] 对比结果过大({size}字节)，不写入缓存")
+            return
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._sizes[key] = size
+            self._total_bytes += size
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                print(f"[DEBUG] 对比缓存淘汰: {oldest_key[:12]}")
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def _remove(self, key: str):
+        if key in self._entries:
+            del self._entries[key]
+            self._total_bytes -= self._sizes.pop(key)
+
+
+_comparison_cache: Optional[ComparisonCache] = None
+
+
+def get_comparison_cache() -> ComparisonCache:
+    """获取进程内共享的对比结果缓存"""
+    global _comparison_cache
+    if _comparison_cache is None:
+        from app.config import settings
+        _comparison_cache = ComparisonCache(
+            max_entries=settings.COMPARISON_CACHE_MAX_ENTRIES,
+            max_bytes=settings.COMPARISON_CACHE_MAX_MB * 1024 * 1024
+        )
+    return _comparison_cache
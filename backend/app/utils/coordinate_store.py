@@ -0,0 +1,238 @@
+import base64
+import json
+import struct
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 序列化格式标识，写入 document_data["coordinate_store"] 的二进制头
+STORE_FORMAT = "coords-v1"
+
+# 列名 -> 小端 dtype：页号、页内行号（跨文本块连续编号）、float32矩形(每字符4个)、字体序号、字号、颜色
+COLUMNS = {
+    "pages": "<i4",
+    "lines": "<i4",
+    "bboxes": "<f4",
+    "font_ids": "<u2",
+    "sizes": "<f4",
+    "colors": "<u4",
+}
+
+# 高亮区间: (起始全局字符索引, 结束索引, 页号, 行号, 合并矩形)
+LineRun = Tuple[int, int, int, int, List[float]]
+
+
+class CoordinateStore:
+    """字符坐标的结构数组存储
+
+    第 i 个元素对应 full_text[i]：页号 pages[i]、页内行号 lines[i]、矩形 bboxes[i]（float32, [x0, y0, x1, y1]）、
+    字体 fonts[font_ids[i]]、字号 sizes[i]、颜色 colors[i]。字体名只在 fonts 表中保存一次。
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], fonts: List[str], text: str = ""):
+        self.pages = columns["pages"]
+        self.lines = columns["lines"]
+        self.bboxes = columns["bboxes"].reshape(-1, 4)
+        self.font_ids = columns["font_ids"]
+        self.sizes = columns["sizes"]
+        self.colors = columns["colors"]
+        self.fonts = fonts
+        # 文档全文（不序列化，由 get_coordinate_store 填入），用于按字符内容匹配
+        self.text = text
+        # 按需构建的查找索引：每页第一个字符的全局索引、(页号, 行号) -> 行的全局字符区间
+        self._page_starts: Optional[Dict[int, int]] = None
+        self._line_ranges: Optional[Dict[Tuple[int, int], Tuple[int, int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    @classmethod
+    def from_document(cls, document_data: Dict) -> "CoordinateStore":
+        """遍历一次文档的 span 构建坐标列（旧数据：页面结构中带 span 和 char_bboxes）"""
+        builder = CoordinateStoreBuilder()
+        for page in document_data.get("pages", []):
+            page_index = page["page_index"]
+            page_line = 0
+            for block in page.get("blocks", []):
+                for line in block.get("lines", []):
+                    # 与解析器一致：页内行号只计有内容的行
+                    line_has_text = False
+                    for span in line.get("spans", []):
+                        count = len(span.get("text", ""))
+                        if not count:
+                            continue
+                        line_has_text = True
+                        char_bboxes = span.get("char_bboxes", [])
+                        span_bbox = span["bbox"][:4]
+                        builder.add_span(
+                            page_index, page_line,
+                            (char_bboxes[i] if i < len(char_bboxes) else span_bbox for i in range(count)),
+                            count, span.get("font", ""), span.get("size", 12), span.get("color", 0)
+                        )
+                    if line_has_text:
+                        page_line += 1
+        return builder.build(document_data.get("full_text", ""))
+
+    def to_bytes(self) -> bytes:
+        """序列化为二进制：4字节头长度 + JSON头（格式、字符数、字体表）+ 各列小端原始字节，整体zlib压缩"""
+        header = json.dumps({"format": STORE_FORMAT, "count": len(self), "fonts": self.fonts}, ensure_ascii=False).encode("utf-8")
+        parts = [struct.pack("<I", len(header)), header]
+        for name, dtype in COLUMNS.items():
+            parts.append(np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes())
+        return zlib.compress(b"".join(parts), 6)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, text: str = "") -> "CoordinateStore":
+        raw = zlib.decompress(blob)
+        header_length = struct.unpack_from("<I", raw)[0]
+        header = json.loads(raw[4:4 + header_length].decode("utf-8"))
+        if header.get("format") != STORE_FORMAT:
+            raise ValueError(f"未知的坐标存储格式: {header.get('format')}")
+        count = header["count"]
+        columns = {}
+        offset = 4 + header_length
+        for name, dtype in COLUMNS.items():
+            size = count * 4 if name == "bboxes" else count
+            columns[name] = np.frombuffer(raw, dtype=dtype, count=size, offset=offset)
+            offset += columns[name].nbytes
+        return cls(columns, header["fonts"], text)
+
+    def encode(self) -> str:
+        """base64 文本形式，可直接存入文档的JSON内容"""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def decode(cls, encoded: str, text: str = "") -> "CoordinateStore":
+        return cls.from_bytes(base64.b64decode(encoded), text)
+
+    def char_info(self, char_index: int) -> Optional[Dict]:
+        """单个字符的坐标信息（字段同旧版 char_sequence_map 的条目，char_index 为页内字符序号），超出范围返回 None"""
+        if not 0 <= char_index < len(self):
+            return None
+        if self._page_starts is None:
+            self._build_indexes()
+        page_index = int(self.pages[char_index])
+        return {
+            "char": self.text[char_index] if char_index < len(self.text) else "",
+            "page_index": page_index,
+            "line_index": int(self.lines[char_index]),
+            "char_index": char_index - self._page_starts[page_index],
+            "bbox": [round(float(value), 2) for value in self.bboxes[char_index]],
+            "font": self.fonts[self.font_ids[char_index]] if self.fonts else "",
+            "size": round(float(self.sizes[char_index]), 2),
+            "color": int(self.colors[char_index])
+        }
+
+    def _build_indexes(self):
+        """一次向量化扫描得到所有行的起止位置（字符按页、行顺序排列），建立页起点和 (页号, 行号) 索引"""
+        count = len(self)
+        line_starts = np.concatenate(([0], np.flatnonzero((self.pages[1:] != self.pages[:-1]) | (self.lines[1:] != self.lines[:-1])) + 1)) if count else np.zeros(0, dtype=np.int64)
+        line_ends = np.append(line_starts[1:], count)
+        self._line_ranges = {}
+        self._page_starts = {}
+        for start, end, page_index, line_index in zip(line_starts.tolist(), line_ends.tolist(), self.pages[line_starts].tolist(), self.lines[line_starts].tolist()):
+            self._line_ranges.setdefault((page_index, line_index), (start, end))
+            self._page_starts.setdefault(page_index, start)
+
+    def index_of(self, page_index: int, line_index: int, page_char_index: int) -> Optional[int]:
+        """按 (页号, 行号, 页内字符序号) 查找全局索引，O(1)；位置不在该行上时返回 None"""
+        if self._page_starts is None:
+            self._build_indexes()
+        page_start = self._page_starts.get(page_index)
+        if page_start is None:
+            return None
+        char_index = page_start + page_char_index
+        line_range = self._line_ranges.get((page_index, line_index))
+        if line_range is None or not line_range[0] <= char_index < line_range[1]:
+            return None
+        return char_index
+
+    def find_on_line(self, page_index: int, line_index: int, char: str, near: Optional[int] = None) -> Optional[int]:
+        """按 (页号, 行号, 字符内容) 查找全局索引：行内有多个相同字符时取离 near 最近的一个，未给出 near 时取第一个"""
+        if not char:
+            return None
+        if self._line_ranges is None:
+            self._build_indexes()
+        line_range = self._line_ranges.get((page_index, line_index))
+        if line_range is None:
+            return None
+        start, end = line_range
+        best = None
+        position = self.text.find(char, start, end)
+        while position != -1:
+            if near is None:
+                return position
+            if best is None or abs(position - near) < abs(best - near):
+                best = position
+            position = self.text.find(char, position + 1, end)
+        return best
+
+    def line_runs(self, start: int, end: int, split_chars: bool = False) -> List[LineRun]:
+        """把 [start, end) 内的字符按同页同行切分为连续区间，并求每个区间的外接矩形（向量化）
+
+        split_chars 为 True 时每个字符单独作为一个区间。只覆盖有坐标的部分，超出存储范围的字符由调用方处理。
+        """
+        end = min(end, len(self))
+        if start >= end:
+            return []
+        pages = self.pages[start:end]
+        lines = self.lines[start:end]
+        bboxes = self.bboxes[start:end]
+        if split_chars:
+            run_starts = np.arange(end - start)
+        else:
+            run_starts = np.concatenate(([0], np.flatnonzero((pages[1:] != pages[:-1]) | (lines[1:] != lines[:-1])) + 1))
+        run_ends = np.append(run_starts[1:], end - start)
+        mins = np.minimum.reduceat(bboxes[:, :2], run_starts, axis=0)
+        maxs = np.maximum.reduceat(bboxes[:, 2:], run_starts, axis=0)
+        run_bboxes = np.round(np.hstack((mins, maxs)).astype(np.float64), 2).tolist()
+        return [
+            (start + run_start, start + run_end, page_index, line_index, run_bbox)
+            for run_start, run_end, page_index, line_index, run_bbox in zip(
+                run_starts.tolist(), run_ends.tolist(), pages[run_starts].tolist(), lines[run_starts].tolist(), run_bboxes
+            )
+        ]
+
+
+class CoordinateStoreBuilder:
+    """逐 span 追加字符坐标，最后一次性转换为 CoordinateStore 的列（解析时直接写入，不经过中间的字典/列表）"""
+
+    def __init__(self):
+        self.pages, self.lines, self.bboxes = array("i"), array("i"), array("f")
+        self.font_ids, self.sizes, self.colors = array("H"), array("f"), array("I")
+        self.font_table: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def add_span(self, page_index: int, line_index: int, char_bboxes: Iterable[Sequence[float]], count: int, font: str, size: float, color: int):
+        """追加一个 span 的 count 个字符；char_bboxes 依次给出每个字符的 [x0, y0, x1, y1]"""
+        for bbox in char_bboxes:
+            self.bboxes.extend(bbox[:4])
+        font_id = self.font_table.setdefault(font or "", len(self.font_table))
+        self.pages.extend([page_index] * count)
+        self.lines.extend([line_index] * count)
+        self.font_ids.extend([font_id] * count)
+        self.sizes.extend([size] * count)
+        self.colors.extend([color & 0xFFFFFFFF] * count)
+
+    def build(self, text: str = "") -> CoordinateStore:
+        columns = {
+            "pages": np.array(self.pages, dtype=np.int32),
+            "lines": np.array(self.lines, dtype=np.int32),
+            "bboxes": np.array(self.bboxes, dtype=np.float32),
+            "font_ids": np.array(self.font_ids, dtype=np.uint16),
+            "sizes": np.array(self.sizes, dtype=np.float32),
+            "colors": np.array(self.colors, dtype=np.uint32),
+        }
+        return CoordinateStore(columns, list(self.font_table), text)
+
+
+def get_coordinate_store(document_data: Dict) -> CoordinateStore:
+    """读取文档的坐标存储；旧数据（没有 coordinate_store 字段）从页面结构重新构建"""
+    encoded = document_data.get("coordinate_store")
+    if encoded:
+        return CoordinateStore.decode(encoded, document_data.get("full_text", ""))
+    return CoordinateStore.from_document(document_data)
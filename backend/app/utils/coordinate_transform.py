@@ -0,0 +1,68 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 页面渲染倍数（PDF点 -> 图片像素）
+DEFAULT_RENDER_SCALE = 2.0
+# 文档数据缺少页面尺寸时使用的默认值（US Letter，点）
+DEFAULT_PAGE_SIZE = (612.0, 792.0)
+
+# 坐标原点：PyMuPDF 的页面坐标以左上角为原点；PDF 原生坐标以左下角为原点
+ORIGIN_TOP_LEFT = "top-left"
+ORIGIN_BOTTOM_LEFT = "bottom-left"
+
+
+def get_page_sizes(document_data: Optional[Dict]) -> Dict[int, Tuple[float, float]]:
+    """各页的 (宽, 高)，单位为点"""
+    sizes = {}
+    for page in (document_data or {}).get("pages", []):
+        sizes[page["page_index"]] = (float(page.get("width") or DEFAULT_PAGE_SIZE[0]), float(page.get("height") or DEFAULT_PAGE_SIZE[1]))
+    return sizes
+
+
+def pdf_rects_to_image(rects, page_width: float, page_height: float, scale: float = DEFAULT_RENDER_SCALE, origin: str = ORIGIN_TOP_LEFT) -> np.ndarray:
+    """将一页的全部矩形 [x0, y0, x1, y1] 一次性转换为图片像素坐标
+
+    按渲染倍数缩放；左下角原点的坐标先翻转Y轴；结果裁剪到页面图片范围内。返回 (n, 4) float64 数组。
+    """
+    rects = np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+    if origin == ORIGIN_BOTTOM_LEFT:
+        rects = np.column_stack((rects[:, 0], page_height - rects[:, 3], rects[:, 2], page_height - rects[:, 1]))
+    elif origin != ORIGIN_TOP_LEFT:
+        raise ValueError(f"未知的坐标原点: {origin}")
+    image_rects = rects * scale
+    np.clip(image_rects[:, 0::2], 0, page_width * scale, out=image_rects[:, 0::2])
+    np.clip(image_rects[:, 1::2], 0, page_height * scale, out=image_rects[:, 1::2])
+    return image_rects
+
+
+# 高亮矩形的文本来源: (差异项序号, 起始全局字符索引, 结束索引)，索引未知时为 -1
+RectSpan = Tuple[int, int, int]
+
+
+def collect_page_rects(diff_list: List[Dict], doc_index: int) -> Dict[int, Tuple[List[List[float]], List[str], List[RectSpan]]]:
+    """按页收集某一侧文档的高亮矩形：{页号: ([矩形...], [对应差异状态...], [对应文本来源...])}
+
+    页号优先取高亮项自身的 page_index（跨页的差异按各高亮项所在页绘制），缺省时取差异项的页号。
+    文本来源取自高亮项的 sub_text_index，供合并矩形时判断字符是否连续。
+    """
+    pages: Dict[int, Tuple[List[List[float]], List[str], List[RectSpan]]] = {}
+    for diff_number, diff in enumerate(diff_list or []):
+        status = diff.get("status", "")
+        for char_group in diff.get("diff", []):
+            for char_info in char_group:
+                if char_info.get("doc_index") != doc_index:
+                    continue
+                page_index = char_info.get("page_index", diff.get("page_index", 0))
+                rects, statuses, spans = pages.setdefault(page_index, ([], [], []))
+                polygons = [polygon for polygon in char_info.get("char_polygons", []) if len(polygon) >= 4]
+                text_index = (char_info.get("sub_info") or [{}])[0].get("sub_text_index")
+                if text_index and len(polygons) == 1:
+                    span = (diff_number, text_index["start_index"], text_index["start_index"] + text_index["length"])
+                else:
+                    span = (diff_number, -1, -1)
+                for polygon in polygons:
+                    rects.append(polygon[:4])
+                    statuses.append(status)
+                    spans.append(span)
+    return pages
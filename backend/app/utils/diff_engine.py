@@ -1,17 +1,111 @@
-import difflib
+import asyncio
+import os
 import time
 import hashlib
-from typing import List, Dict, Any
+import re
+from concurrent.futures import Executor
+from typing import List, Dict, Any, AsyncIterator, Tuple
+from app.utils.coordinate_mapper import get_page_offsets, find_page_index
+from app.utils.clause_aligner import find_renumbered_clauses
+from app.utils.coordinate_store import CoordinateStore, get_coordinate_store
+from app.utils.entity_extractor import EntityExtractor, EntityIndex
+from app.utils.move_detector import MoveDetector, detect_moves
+from app.utils.parallel_diff import ParallelDiffRunner, compute_opcodes_within_budget
+from app.utils.text_normalizer import TextNormalizer, OffsetMap
+from app.utils.three_way_merge import ThreeWayMerger, ORIGIN_STANDARD, ORIGIN_TARGET, ORIGIN_BOTH, ORIGIN_CONFLICT
+
+# 内容寻址的差异ID格式（_stable_diff_id 生成），用于区分早期按序号生成的ID
+STABLE_DIFF_ID_PATTERN = re.compile(r'^diff_[0-9a-f]{12}(_\d+)?$')
+
+# 差异引擎版本：对比结果格式或算法行为变化时递增，使旧的缓存结果失效
+ENGINE_VERSION = "7"
 
 class DiffEngine:
-    def __init__(self):
+    # 两文档总字符数达到该值时启用按页并行对比
+    PARALLEL_MIN_CHARS = 200000
+    # 计算差异ID时纳入的前后文字符数
+    DIFF_ID_CONTEXT_CHARS = 30
+
+    def __init__(self, algorithm: str = "auto", granularity: str = "char", detect_moves: bool = True, max_workers: int = None, highlight_mode: str = "run", normalize_rules: Tuple[str, ...] = (), executor: Executor = None, document_cache: Dict = None, time_budget: float = None, memory_budget_mb: int = None):
+        # 差异算法: auto(按文档规模选择) / myers / patience / sequence_matcher
+        self.algorithm = algorithm
+        # 对比粒度: char(整篇字符级对比) / hierarchical(段落 -> 句子 -> 字符分层对比) / clause(按条款编号对齐后逐条对比) / token(词元级对比)
+        self.granularity = granularity
+        # 是否将"删除 + 别处新增"的相同句子识别为移动
+        self.detect_moves = detect_moves
+        # 并行对比的进程数（None 表示使用CPU核数，1 表示关闭并行）
+        self.max_workers = max_workers
+        # 高亮格式: run(同行连续字符合并为一个矩形) / char(每个字符一个高亮项，兼容旧格式)
+        if highlight_mode not in ("run", "char"):
+            raise ValueError(f"未知的高亮格式: {highlight_mode}")
+        self.highlight_mode = highlight_mode
+        # 对比前的文本归一化规则（空表示不归一化），差异位置会映射回原文
+        self.normalize_rules = tuple(normalize_rules)
+        self.normalizer = TextNormalizer(self.normalize_rules) if self.normalize_rules else None
+        # 执行差异计算和移动检测的执行器（None 表示在当前进程中计算）
+        self.executor = executor
+        # 文档预处理结果缓存（归一化文本、字符序列映射、文本哈希），一对多批量对比时多个引擎共享
+        self.document_cache = document_cache if document_cache is not None else {}
+        # 每个对比区段的时间（秒）/内存（MB）预算，超出时该区段降级为行级对比（None 表示不限）
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        # 最近一次对比中降级对比的区段: (a_start, a_end, b_start, b_end, 降级粒度)
+        self.coarse_sections: List[Tuple] = []
+        # 最近一次条款对齐对比中重新编号的条款: (原编号, 新编号)，只在摘要中汇总，不作为差异项
+        self.renumbered_clauses: List[Tuple[str, str]] = []
         self.colors = {
             "ADD": "#90EE90",      # 浅绿色 - 新增
             "DELETE": "#FFB6C1",   # 浅红色 - 删除
             "CHANGE": "#FFFF99",   # 浅黄色 - 修改
-            "MOVE": "#87CEEB"      # 浅蓝色 - 移动
+            "MOVE": "#87CEEB",     # 浅蓝色 - 移动
+            "CONFLICT": "#D8BFD8"  # 浅紫色 - 冲突（三方对比）
         }
-        self.diff_counter = 0  # 差异计数器
+        # 本次对比中已分配的差异ID及次数（相同内容、相同上下文的重复差异按出现顺序编号）
+        self._diff_id_counts: Dict[str, int] = {}
+        # 金额/百分比/日期/期限变更标注
+        self.entity_extractor = EntityExtractor()
+        self._entity_indexes: Tuple[EntityIndex, EntityIndex] = None
+    
+    def prepare_document(self, document_data: Dict):
+        """预先构建文档的坐标索引、字符序列映射、归一化文本和文本哈希
+
+        一对多批量对比时对标准文档调用一次，之后与各目标文档对比时直接复用。
+        """
+        self._get_coordinate_store(document_data)
+        self._get_text_hash(document_data)
+        self._get_entity_index(document_data)
+        if self.normalizer is not None:
+            self._get_normalized_text(document_data)
+
+    def _document_cached(self, document_data: Dict, name: str, build):
+        """按文档对象缓存预处理结果"""
+        key = (id(document_data), name)
+        value = self.document_cache.get(key)
+        if value is None:
+            value = build()
+            self.document_cache[key] = value
+        return value
+
+    def _get_coordinate_store(self, document_data: Dict) -> CoordinateStore:
+        return self._document_cached(document_data, "coordinate_store", lambda: get_coordinate_store(document_data))
+
+    def _get_text_hash(self, document_data: Dict) -> bytes:
+        return self._document_cached(document_data, "text_sha256", lambda: hashlib.sha256(document_data.get("full_text", "").encode("utf-8")).digest())
+
+    def _get_entity_index(self, document_data: Dict) -> EntityIndex:
+        return self._document_cached(document_data, "entities", lambda: self.entity_extractor.extract(document_data.get("full_text", "")))
+
+    def _get_normalized_text(self, document_data: Dict) -> Tuple[str, OffsetMap]:
+        return self._document_cached(document_data, f"normalized:{','.join(self.normalize_rules)}", lambda: self.normalizer.normalize(document_data.get("full_text", "")))
+
+    def cache_key(self, standard_data: Dict, target_data: Dict) -> str:
+        """对比结果缓存键：两文档文本的SHA-256 + 引擎选项 + 引擎版本"""
+        digest = hashlib.sha256()
+        for document_data in (standard_data, target_data):
+            digest.update(self._get_text_hash(document_data))
+        options = f"{ENGINE_VERSION}|{self.algorithm}|{self.granularity}|{self.detect_moves}|{self.highlight_mode}|{','.join(self.normalize_rules)}|{self.time_budget}|{self.memory_budget}"
+        digest.update(options.encode("utf-8"))
+        return digest.hexdigest()
     
     async def compare_documents(self, standard_data: Dict, target_data: Dict) -> Dict:
         """对比两个文档并返回差异信息 - 按照5步流程实现"""
@@ -20,7 +114,7 @@ class DiffEngine:
         target_text = target_data.get("full_text", "")
         print(f"[DEBUG] 标准文档: {len(standard_text)}字符, 目标文档: {len(target_text)}字符")
         
-        # 使用difflib进行文本对比
+        # 进行文本对比
         diff_list = await self._compare_texts(standard_text, target_text, standard_data, target_data)
 
         print(f"[DEBUG] diff结果: 发现{len(diff_list)}个差异")
@@ -30,57 +124,249 @@ class DiffEngine:
         from app.utils.coordinate_mapper import CoordinateMapper
         mapper = CoordinateMapper()
         
-        # 构建字符序列映射
-        standard_map = mapper.build_char_sequence_map(standard_data)
-        target_map = mapper.build_char_sequence_map(target_data)
-        
         # 映射差异到坐标
         mapped_diff_list = mapper.map_diff_to_coordinates(diff_list, {
-            "standard": standard_map,
-            "target": target_map
+            "standard": self._get_coordinate_store(standard_data),
+            "target": self._get_coordinate_store(target_data)
         })
         
         print(f"[DEBUG] 坐标映射完成: {len(mapped_diff_list)}个差异")
         
         result = {
             "diff_list": mapped_diff_list,
-            "summary": self.generate_summary(mapped_diff_list)
+            "summary": self.generate_summary(mapped_diff_list),
+            "renumbered_clauses": [{"standard_number": old, "target_number": new} for old, new in self.renumbered_clauses]
         }
         
         print(f"[DEBUG] 对比完成: {result['summary']}")
         print("[DEBUG] ===== 文档对比完成 =====")
         return result
     
+    async def compare_three_way(self, base_data: Dict, standard_data: Dict, target_data: Dict) -> Dict:
+        """三方对比：以共同的基准版本为参照，区分我方(标准文档)与对方(目标文档)的修改
+
+        只做 基准↔标准、基准↔目标 两次对齐，再按基准偏移合并变更区域；
+        双方对同一处做了不同修改时输出 CONFLICT。
+        """
+        print("[DEBUG] ===== 开始三方对比流程 =====")
+        base_text = base_data.get("full_text", "")
+        standard_text = standard_data.get("full_text", "")
+        target_text = target_data.get("full_text", "")
+        print(f"[DEBUG] 基准文档: {len(base_text)}字符, 标准文档: {len(standard_text)}字符, 目标文档: {len(target_text)}字符")
+
+        self.coarse_sections = []
+        self.renumbered_clauses = []
+        self._diff_id_counts = {}
+        standard_opcodes, target_opcodes = await asyncio.gather(
+            self._compute_opcodes(base_text, standard_text, base_data, standard_data),
+            self._compute_opcodes(base_text, target_text, base_data, target_data)
+        )
+        regions = ThreeWayMerger().merge(base_text, standard_text, target_text, standard_opcodes, target_opcodes)
+        print(f"[DEBUG] 三方合并: {len(regions)}个变更区域")
+
+        standard_page_offsets = get_page_offsets(standard_data)
+        target_page_offsets = get_page_offsets(target_data)
+
+        diff_list = []
+        for origin, base_start, base_end, standard_start, standard_end, target_start, target_end in regions:
+            base_part = base_text[base_start:base_end]
+            standard_part = standard_text[standard_start:standard_end]
+            target_part = target_text[target_start:target_end]
+            # 只涉及空白的变更不输出
+            if not (base_part.strip() or standard_part.strip() or target_part.strip()):
+                continue
+
+            if origin == ORIGIN_CONFLICT:
+                status = "CONFLICT"
+            else:
+                changed_part = target_part if origin == ORIGIN_TARGET else standard_part
+                if not base_part.strip():
+                    status = "ADD"
+                elif not changed_part.strip():
+                    status = "DELETE"
+                else:
+                    status = "MODIFY"
+
+            if standard_part:
+                page_index = self._calculate_page_index(standard_start, standard_page_offsets)
+            else:
+                page_index = self._calculate_page_index(target_start, target_page_offsets)
+
+            # 两侧文本都按修改项生成高亮：标准文档一侧与目标文档一侧
+            diff_item = await self._create_modification_diff_item(
+                self._stable_diff_id(f"{status}:{origin}", standard_text, target_text, standard_start, standard_end, target_start, target_end),
+                standard_part, target_part,
+                standard_start, standard_end, target_start, target_end,
+                page_index, standard_data, target_data
+            )
+            diff_item.update({
+                "status": status,
+                "origin": origin,
+                "base_text": base_part,
+                "base_start": base_start
+            })
+            # 两组对齐的降级区段都以基准文本偏移记录，按基准区间判断
+            diff_list.append(self._mark_coarse(diff_item, base_start, base_end, None, None))
+
+        from app.utils.coordinate_mapper import CoordinateMapper
+        mapped_diff_list = CoordinateMapper().map_diff_to_coordinates(diff_list, {
+            "standard": self._get_coordinate_store(standard_data),
+            "target": self._get_coordinate_store(target_data)
+        })
+
+        summary = self.generate_summary(mapped_diff_list)
+        summary.update({
+            "standard_changes": len([d for d in mapped_diff_list if d["origin"] == ORIGIN_STANDARD]),
+            "target_changes": len([d for d in mapped_diff_list if d["origin"] == ORIGIN_TARGET]),
+            "agreed_changes": len([d for d in mapped_diff_list if d["origin"] == ORIGIN_BOTH])
+        })
+        print(f"[DEBUG] 三方对比完成: {summary}")
+        return {
+            "mode": "three_way",
+            "diff_list": mapped_diff_list,
+            "summary": summary
+        }
+
+    async def iter_compare_documents(self, standard_data: Dict, target_data: Dict) -> AsyncIterator[Dict]:
+        """流式对比两个文档：按页对齐的区段逐段对比，每段算完即按页产出已完成坐标映射的差异项，最后产出摘要
+
+        产出的事件:
+            {"type": "page", "page_index": 页号, "diff_list": [...]}  标准文档同一页上的差异项
+            {"type": "summary", "summary": {...}}                      全部差异产出后的摘要
+
+        事件按标准文档的页号分批，每页只产出一次；新增项归入其插入位置所在的标准文档页，
+        差异项自身的 page_index 仍是目标文档页号。移动检测在区段内进行，跨区段的移动显示为删除和新增。
+        """
+        print("[DEBUG] ===== 开始流式文档对比 =====")
+        standard_text = standard_data.get("full_text", "")
+        target_text = target_data.get("full_text", "")
+        standard_page_offsets = get_page_offsets(standard_data)
+
+        from app.utils.coordinate_mapper import CoordinateMapper
+        mapper = CoordinateMapper()
+        coordinate_stores = {
+            "standard": self._get_coordinate_store(standard_data),
+            "target": self._get_coordinate_store(target_data)
+        }
+
+        self.coarse_sections = []
+        self.renumbered_clauses = []
+        self._diff_id_counts = {}
+        all_diffs = []
+        page_batch = []
+        batch_page = 0
+        async for opcodes in self._iter_section_opcodes(standard_text, target_text, standard_data, target_data):
+            self._collect_renumbered_clauses(standard_text, target_text, opcodes)
+            async for standard_position, diff_item in self._diff_items_from_opcodes(standard_text, target_text, opcodes, standard_data, target_data):
+                page_index = max(self._calculate_page_index(standard_position, standard_page_offsets), batch_page)
+                if page_batch and page_index != batch_page:
+                    mapped_batch = mapper.map_diff_to_coordinates(page_batch, coordinate_stores)
+                    all_diffs.extend(mapped_batch)
+                    yield {"type": "page", "page_index": batch_page, "diff_list": mapped_batch}
+                    page_batch = []
+                batch_page = page_index
+                page_batch.append(diff_item)
+
+        if not page_batch and not all_diffs:
+            print("[DEBUG] 未发现差异，生成示例差异用于测试")
+            page_batch = await self._generate_sample_diffs()
+            batch_page = page_batch[0]["page_index"]
+        if page_batch:
+            mapped_batch = mapper.map_diff_to_coordinates(page_batch, coordinate_stores)
+            all_diffs.extend(mapped_batch)
+            yield {"type": "page", "page_index": batch_page, "diff_list": mapped_batch}
+
+        summary = self.generate_summary(all_diffs)
+        print(f"[DEBUG] 流式对比完成: {summary}")
+        yield {"type": "summary", "summary": summary}
+
+    async def _iter_section_opcodes(self, text1: str, text2: str, standard_data: Dict, target_data: Dict) -> AsyncIterator[List[tuple]]:
+        """逐个产出按页对齐的区段的操作码（原文偏移），降级对比的区段追加到 self.coarse_sections"""
+        offset_map1 = offset_map2 = None
+        if self.normalizer is not None:
+            text1, offset_map1 = self._get_normalized_text(standard_data)
+            text2, offset_map2 = self._get_normalized_text(target_data)
+
+        runner = ParallelDiffRunner(self.algorithm, self.granularity, self.max_workers, self.executor, self.time_budget, self.memory_budget)
+        async for opcodes, coarse_sections in runner.iter_section_opcodes(text1, text2, standard_data, offset_map1):
+            if offset_map1 is not None:
+                coarse_sections = [
+                    (offset_map1.to_original(a_start), offset_map1.to_original(a_end), offset_map2.to_original(b_start), offset_map2.to_original(b_end), level)
+                    for a_start, a_end, b_start, b_end, level in coarse_sections
+                ]
+                opcodes = self._map_opcodes_to_original(opcodes, offset_map1, offset_map2)
+            self.coarse_sections.extend(coarse_sections)
+            yield opcodes
+
     async def _compare_texts(self, text1: str, text2: str, standard_data: Dict, target_data: Dict) -> List[Dict]:
         """使用算法进行差异类型判断"""
+        diff_list = [diff_item async for diff_item in self._iter_diff_items(text1, text2, standard_data, target_data)]
+
+        print(f"[DEBUG] 算法差异检测完成，发现 {len(diff_list)} 个差异")
+        
+        # 如果没有发现差异，生成示例差异用于测试
+        if len(diff_list) == 0:
+            print("[DEBUG] 未发现差异，生成示例差异用于测试")
+            diff_list = await self._generate_sample_diffs()
+        
+        return diff_list
+
+    async def _iter_diff_items(self, text1: str, text2: str, standard_data: Dict, target_data: Dict) -> AsyncIterator[Dict]:
+        """按文档顺序逐个产出差异项（未做坐标映射）"""
         print("[DEBUG] 开始基于算法的差异检测")
         
-        # 使用SequenceMatcher进行文本对比
-        matcher = difflib.SequenceMatcher(None, text1, text2)
-        diff_list = []
-        diff_count = 0
+        # 使用可插拔的差异算法进行文本对比
+        self.coarse_sections = []
+        self.renumbered_clauses = []
+        self._diff_id_counts = {}
+        opcodes = await self._compute_opcodes(text1, text2, standard_data, target_data)
+        self._collect_renumbered_clauses(text1, text2, opcodes)
+        async for _, diff_item in self._diff_items_from_opcodes(text1, text2, opcodes, standard_data, target_data):
+            yield diff_item
+
+    def _collect_renumbered_clauses(self, text1: str, text2: str, opcodes: List[tuple]):
+        """条款对齐对比时，记录以 equal 输出的重新编号条款"""
+        if self.granularity == "clause":
+            self.renumbered_clauses.extend(find_renumbered_clauses(text1, text2, opcodes))
 
+    async def _diff_items_from_opcodes(self, text1: str, text2: str, opcodes: List[tuple], standard_data: Dict, target_data: Dict) -> AsyncIterator[Tuple[int, Dict]]:
+        """由操作码（原文偏移）按文档顺序产出 (标准文档中的位置, 差异项)"""
         # 收集所有差异操作
         operations = []
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for tag, i1, i2, j1, j2 in opcodes:
             if tag != 'equal':
                 operations.append((tag, i1, i2, j1, j2))
 
+        # 移动检测：将匹配的删除/新增句子块合并为MOVE
+        if self.detect_moves:
+            if self.executor is not None:
+                operations = await asyncio.get_running_loop().run_in_executor(self.executor, detect_moves, text1, text2, operations)
+            else:
+                operations = MoveDetector().detect(text1, text2, operations)
+
+        # 页偏移表只构建一次，每个差异的页面定位为 O(log 页数)
+        standard_page_offsets = get_page_offsets(standard_data)
+        target_page_offsets = get_page_offsets(target_data)
+        # 两侧文档的数值实体各扫描一次（按文档缓存），差异项标注时二分查找
+        self._entity_indexes = (self._get_entity_index(standard_data), self._get_entity_index(target_data))
+
         # 分析差异类型
         i = 0
         while i < len(operations):
             tag, i1, i2, j1, j2 = operations[i]
             
-            # 计算差异所在的页面索引
-            page_index = self._calculate_page_index(i1, standard_data)
+            # 计算差异所在的页面索引（新增内容只存在于目标文档，按目标文档定位）
+            if tag == 'insert':
+                page_index = self._calculate_page_index(j1, target_page_offsets)
+            else:
+                page_index = self._calculate_page_index(i1, standard_page_offsets)
             
             if tag == 'delete':
                 # 检查是否是删除
                 deleted_text = text1[i1:i2]
                 if deleted_text.strip():
-                    diff_count += 1
                     diff_item = await self._create_diff_item_by_type(
-                        f"diff_{diff_count}",
+                        self._stable_diff_id("DELETE", text1, text2, i1, i2, j1, j2),
                         "DELETE",
                         deleted_text,
                         None,
@@ -90,15 +376,14 @@ class DiffEngine:
                         standard_data,
                         target_data
                     )
-                    diff_list.append(diff_item)
+                    yield i1, self._annotate(diff_item, i1, i2, j1, j2)
             
             elif tag == 'insert':
                 # 检查是否是新增
                 inserted_text = text2[j1:j2]
                 if inserted_text.strip():
-                    diff_count += 1
                     diff_item = await self._create_diff_item_by_type(
-                        f"diff_{diff_count}",
+                        self._stable_diff_id("ADD", text1, text2, i1, i2, j1, j2),
                         "ADD",
                         None,
                         inserted_text,
@@ -108,7 +393,7 @@ class DiffEngine:
                         standard_data,
                         target_data
                     )
-                    diff_list.append(diff_item)
+                    yield i1, self._annotate(diff_item, i1, i2, j1, j2)
             
             elif tag == 'replace':
                 # 检查是否是修改（替换）
@@ -117,9 +402,8 @@ class DiffEngine:
                 
                 if deleted_text.strip() and inserted_text.strip():
                     # 有删除也有插入，判断为修改
-                    diff_count += 1
                     diff_item = await self._create_diff_item_by_type(
-                        f"diff_{diff_count}",
+                        self._stable_diff_id("MODIFY", text1, text2, i1, i2, j1, j2),
                         "MODIFY",
                         deleted_text,
                         inserted_text,
@@ -129,12 +413,11 @@ class DiffEngine:
                         standard_data,
                         target_data
                     )
-                    diff_list.append(diff_item)
+                    yield i1, self._annotate(diff_item, i1, i2, j1, j2)
                 elif deleted_text.strip():
                     # 只有删除，判断为删除
-                    diff_count += 1
                     diff_item = await self._create_diff_item_by_type(
-                        f"diff_{diff_count}",
+                        self._stable_diff_id("DELETE", text1, text2, i1, i2, j1, j2),
                         "DELETE",
                         deleted_text,
                         None,
@@ -144,115 +427,193 @@ class DiffEngine:
                         standard_data,
                         target_data
                     )
-                    diff_list.append(diff_item)
+                    yield i1, self._annotate(diff_item, i1, i2, j1, j2)
                 elif inserted_text.strip():
                     # 只有插入，判断为新增
-                    diff_count += 1
                     diff_item = await self._create_diff_item_by_type(
-                        f"diff_{diff_count}",
+                        self._stable_diff_id("ADD", text1, text2, i1, i2, j1, j2),
                         "ADD",
                         None,
                         inserted_text,
                         None, None,
                         j1, j2,
-                        page_index,  # 使用计算的页面索引
+                        self._calculate_page_index(j1, target_page_offsets),  # 新增内容按目标文档定位
                         standard_data,
                         target_data
                     )
-                    diff_list.append(diff_item)
+                    yield i1, self._annotate(diff_item, i1, i2, j1, j2)
+            
+            elif tag == 'move':
+                # 移动：内容从标准文档i1处移动到目标文档j1处
+                diff_item = await self._create_diff_item_by_type(
+                    self._stable_diff_id("MOVE", text1, text2, i1, i2, j1, j2),
+                    "MOVE",
+                    text1[i1:i2],
+                    text2[j1:j2],
+                    i1, i2,
+                    j1, j2,
+                    page_index,  # 使用计算的页面索引
+                    standard_data,
+                    target_data
+                )
+                yield i1, self._annotate(diff_item, i1, i2, j1, j2)
             
             i += 1
+            # 定期让出事件循环，避免构建大量差异项时阻塞其他请求
+            if i % 200 == 0:
+                await asyncio.sleep(0)
+    
+    def _stable_diff_id(self, status: str, text1: str, text2: str, i1: int, i2: int, j1: int, j2: int) -> str:
+        """内容寻址的差异ID：由差异类型、两侧差异文本及其前后文计算
 
-        print(f"[DEBUG] 算法差异检测完成，发现 {len(diff_list)} 个差异")
-        
-        # 如果没有发现差异，生成示例差异用于测试
-        if len(diff_list) == 0:
-            print("[DEBUG] 未发现差异，生成示例差异用于测试")
-            diff_list = await self._generate_sample_diffs()
-        
-        return diff_list
+        文档其他位置的修改不会改变该ID，重新对比后可据此复用已有的AI审查结果。
+        """
+        context = self.DIFF_ID_CONTEXT_CHARS
+        digest = hashlib.sha1(status.encode("utf-8"))
+        for text, start, end in ((text1, i1, i2), (text2, j1, j2)):
+            for part in (text[max(0, start - context):start], text[start:end], text[end:end + context]):
+                digest.update(part.encode("utf-8"))
+                digest.update(b"\x00")
+        diff_id = f"diff_{digest.hexdigest()[:12]}"
+
+        count = self._diff_id_counts.get(diff_id, 0) + 1
+        self._diff_id_counts[diff_id] = count
+        return diff_id if count == 1 else f"{diff_id}_{count}"
+
+    def _annotate(self, diff_item: Dict, i1: int, i2: int, j1: int, j2: int) -> Dict:
+        """标注降级粒度和数值实体变更"""
+        self._mark_coarse(diff_item, i1, i2, j1, j2)
+        return self._tag_entities(diff_item, i1, i2, j1, j2)
+
+    def _tag_entities(self, diff_item: Dict, i1: int, i2: int, j1: int, j2: int) -> Dict:
+        """差异涉及金额/百分比/日期/期限且归一化值发生变化时，标注 entity_type 及新旧值（entity_changes）"""
+        standard_entities, target_entities = self._entity_indexes
+        changes = self.entity_extractor.compare(standard_entities.overlapping(i1, i2), target_entities.overlapping(j1, j2))
+        if changes:
+            diff_item["entity_type"] = changes[0]["type"]
+            diff_item["entity_changes"] = changes
+        return diff_item
+
+    def _mark_coarse(self, diff_item: Dict, i1: int, i2: int, j1: int, j2: int) -> Dict:
+        """差异落在降级对比的区段内时，标记其降级粒度（coarse: line/section）"""
+        for a_start, a_end, b_start, b_end, level in self.coarse_sections:
+            if self._overlaps(i1, i2, a_start, a_end) or (j1 is not None and self._overlaps(j1, j2, b_start, b_end)):
+                diff_item["coarse"] = level
+                break
+        return diff_item
+
+    @staticmethod
+    def _overlaps(start: int, end: int, section_start: int, section_end: int) -> bool:
+        if start is None:
+            return False
+        if start == end:
+            return section_start <= start <= section_end
+        return start < section_end and section_start < end
+
+    async def _compute_opcodes(self, text1: str, text2: str, standard_data: Dict, target_data: Dict) -> List[tuple]:
+        """计算全文操作码；启用归一化时对归一化文本对比，再将操作码映射回原文偏移
+
+        超出预算而降级对比的区段（原文偏移）追加到 self.coarse_sections。
+        """
+        if self.normalizer is None:
+            opcodes, coarse_sections = await self._compute_raw_opcodes(text1, text2, standard_data)
+            self.coarse_sections.extend(coarse_sections)
+            return opcodes
+
+        start_time = time.time()
+        normalized1, offset_map1 = self._get_normalized_text(standard_data)
+        normalized2, offset_map2 = self._get_normalized_text(target_data)
+        print(f"[DEBUG] 文本归一化({','.join(self.normalize_rules)}): {len(text1)}->{len(normalized1)}, {len(text2)}->{len(normalized2)}字符, 耗时: {time.time() - start_time:.3f}秒")
+
+        opcodes, coarse_sections = await self._compute_raw_opcodes(normalized1, normalized2, standard_data, offset_map1)
+        for a_start, a_end, b_start, b_end, level in coarse_sections:
+            self.coarse_sections.append((
+                offset_map1.to_original(a_start), offset_map1.to_original(a_end),
+                offset_map2.to_original(b_start), offset_map2.to_original(b_end), level
+            ))
+        return self._map_opcodes_to_original(opcodes, offset_map1, offset_map2)
+
+    def _map_opcodes_to_original(self, opcodes: List[tuple], offset_map1: OffsetMap, offset_map2: OffsetMap) -> List[tuple]:
+        """将归一化文本上的操作码映射回原文偏移（相邻操作码首尾仍然相接）"""
+        return [
+            (tag,
+             offset_map1.to_original(i1), offset_map1.to_original(i2),
+             offset_map2.to_original(j1), offset_map2.to_original(j2))
+            for tag, i1, i2, j1, j2 in opcodes
+        ]
+
+    async def _compute_raw_opcodes(self, text1: str, text2: str, standard_data: Dict, offset_map: OffsetMap = None) -> Tuple[List[tuple], List[Tuple]]:
+        """计算操作码：长文档按页对齐后在进程池中并行对比；返回 (操作码, 降级对比的区段)
+
+        text1 为归一化文本时 offset_map 为其到原文的映射，用于把页边界换算到归一化文本上。
+        """
+        max_workers = self.max_workers or os.cpu_count() or 1
+        if max_workers > 1 and len(text1) + len(text2) >= self.PARALLEL_MIN_CHARS:
+            runner = ParallelDiffRunner(self.algorithm, self.granularity, max_workers, self.executor, self.time_budget, self.memory_budget)
+            opcodes = await runner.get_opcodes(text1, text2, standard_data, offset_map)
+            return opcodes, runner.coarse_sections
+        if self.executor is not None:
+            # 批量对比时各目标文档的对比在共享进程池中并发执行
+            start_time = time.time()
+            opcodes, coarse_sections = await asyncio.get_running_loop().run_in_executor(
+                self.executor, compute_opcodes_within_budget, text1, text2,
+                self.algorithm, self.granularity, self.time_budget, self.memory_budget
+            )
+            print(f"[DEBUG] 差异计算({self.granularity}/{self.algorithm}, 进程池) 耗时: {time.time() - start_time:.3f}秒, 操作码: {len(opcodes)}个, 降级区段: {len(coarse_sections)}个")
+            return opcodes, coarse_sections
+        return self._get_opcodes(text1, text2)
     
-    def _calculate_page_index(self, char_index: int, document_data: Dict) -> int:
-        """根据字符索引计算差异所在的页面索引"""
-        try:
-            pages = document_data.get("pages", [])
-            if not pages:
-                return 0
-            
-            # 如果只有一个页面，直接返回0
-            if len(pages) == 1:
-                return 0
-            
-            # 计算每页的字符数量
-            full_text = document_data.get("full_text", "")
-            if not full_text:
-                return 0
-            
-            # 简单的方法：根据换行符分割页面
-            # 这里假设每个页面以换行符分隔
-            page_texts = full_text.split('\n')
-            current_char_count = 0
-            
-            for page_index, page_text in enumerate(page_texts):
-                # 加上换行符的长度
-                page_length = len(page_text) + 1  # +1 for newline
-                
-                if char_index < current_char_count + page_length:
-                    return page_index
-                
-                current_char_count += page_length
-            
-            # 如果超出范围，返回最后一页
-            return len(page_texts) - 1
-            
-        except Exception as e:
-            print(f"[DEBUG] 计算页面索引失败: {e}")
-            return 0
+    def _get_opcodes(self, text1: str, text2: str) -> Tuple[List[tuple], List[Tuple]]:
+        """计算字符级操作码（格式与 difflib.SequenceMatcher.get_opcodes() 相同）及降级对比的区段"""
+        start_time = time.time()
+        opcodes, coarse_sections = compute_opcodes_within_budget(text1, text2, self.algorithm, self.granularity, self.time_budget, self.memory_budget)
+        print(f"[DEBUG] 差异计算({self.granularity}/{self.algorithm}) 耗时: {time.time() - start_time:.3f}秒, 操作码: {len(opcodes)}个, 降级区段: {len(coarse_sections)}个")
+        return opcodes, coarse_sections
     
-    def _convert_pdf_coords_to_image_coords(self, pdf_coords: List[float], page_height: float = 792.0, scale_factor: float = 2.0) -> List[float]:
-        """将PDF坐标转换为图片坐标（基于原始图片像素尺寸）
-        
-        Args:
-            pdf_coords: PDF坐标 [x0, y0, x1, y1]
-            page_height: PDF页面高度（点，默认792）
-            scale_factor: 缩放因子（默认2.0）
-        
-        Returns:
-            转换后的图片坐标 [x0, y0, x1, y1] - 基于原始图片像素尺寸
-        """
-        if len(pdf_coords) < 4:
-            return pdf_coords
-            
-        x0, y0, x1, y1 = pdf_coords[:4]
-        
-        # 1. 应用缩放因子（PDF -> 图片像素）
-        x0_scaled = x0 * scale_factor
-        y0_scaled = y0 * scale_factor
-        x1_scaled = x1 * scale_factor
-        y1_scaled = y1 * scale_factor
-        
-        # 2. 翻转Y轴（PDF原点在左下角，图片原点在左上角）
-        image_height = page_height * scale_factor
-        y0_flipped = image_height - y1_scaled
-        y1_flipped = image_height - y0_scaled
-        
-        return [x0_scaled, y0_flipped, x1_scaled, y1_flipped]
+    def _calculate_page_index(self, char_index: int, page_offsets: List[int]) -> int:
+        """根据字符索引计算差异所在的页面索引（在页偏移表上二分查找）"""
+        return find_page_index(char_index, page_offsets)
 
-    def _convert_pdf_coords_to_frontend_coords(self, pdf_coords: List[float], page_height: float = 792.0, scale_factor: float = 2.0) -> List[float]:
-        """将PDF坐标转换为前端Canvas坐标
-        
-        注意：前端Canvas的坐标系统是基于图片的显示尺寸，而不是原始像素尺寸
-        由于图片使用 maxWidth: 100%, height: auto，实际显示尺寸可能被浏览器缩放
-        
-        Args:
-            pdf_coords: PDF坐标 [x0, y0, x1, y1]
-            page_height: PDF页面高度（点，默认792）
-            scale_factor: 缩放因子（默认2.0）
-        
-        Returns:
-            转换后的前端坐标 [x0, y0, x1, y1] - 基于原始图片像素尺寸
+    def _build_highlight_groups(self, text: str, start: int, page_index: int, doc_data: Dict, doc_index: int) -> List[List[Dict]]:
+        """生成差异文本的高亮分组
+
+        run 模式：同一行上连续的字符合并为一组，携带合并后的矩形和 start_index/length；
+        char 模式：每个字符一组（旧格式）。
         """
-        return self._convert_pdf_coords_to_image_coords(pdf_coords, page_height, scale_factor)
+        store = self._get_coordinate_store(doc_data)
+        end = start + len(text)
+
+        # 有坐标的部分按同页同行切分（char 模式每个字符单独一组），矩形在坐标存储上向量化求并
+        runs = [
+            [run_start, text[run_start - start:run_end - start], (run_page, run_line), run_bbox]
+            for run_start, run_end, run_page, run_line, run_bbox in store.line_runs(start, end, split_chars=self.highlight_mode != "run")
+        ]
+        # 超出坐标范围的字符使用占位矩形，不合并
+        for char_index in range(max(start, len(store)), end):
+            i = char_index - start
+            runs.append([char_index, text[i], None, [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]])
+
+        groups = []
+        for run_start, run_text, line_key, run_bbox in runs:
+            run_page, run_line = line_key or (page_index, 0)
+            groups.append([{
+                "text": run_text,
+                "page_index": run_page,
+                "line_index": run_line,
+                "doc_index": doc_index,
+                "char_polygons": [run_bbox],
+                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
+                "sub_info": [{
+                    "page_id": run_page,
+                    "sub_polygons": run_bbox,
+                    "sub_text_index": {
+                        "start_index": run_start,
+                        "length": len(run_text)
+                    }
+                }],
+                "sub_type": ""
+            }])
+        return groups
 
     async def _create_diff_item_by_type(self, element_id: str, diff_type: str, old_text: str, new_text: str, old_start: int, old_end: int, new_start: int, new_end: int, page_index: int, standard_data: Dict, target_data: Dict) -> Dict:
         """根据差异类型创建差异项"""
@@ -273,6 +634,11 @@ class DiffEngine:
             return await self._create_deletion_diff_item(
                 element_id, old_text, old_start, old_end, page_index, standard_data
             )
+        elif diff_type == "MOVE":
+            # 移动类型：同时显示原位置和新位置
+            return await self._create_move_diff_item(
+                element_id, old_text, new_text, old_start, old_end, new_start, new_end, page_index, standard_data, target_data
+            )
         else:
             raise ValueError(f"未知的差异类型: {diff_type}")
 
@@ -280,102 +646,16 @@ class DiffEngine:
         """创建修改差异项"""
         print(f"[DEBUG] 创建修改差异: '{old_text}' -> '{new_text}'")
         
-        # 获取字符序列映射
-        char_sequence_map = standard_data.get("char_sequence_map", {})
-        target_char_sequence_map = target_data.get("char_sequence_map", {})
-        
-        # 创建原文本的字符差异
-        old_char_diffs = []
-        for i, char in enumerate(old_text):
-            char_index = old_start + i
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 从字符序列映射中获取坐标
-            # 尝试不同的键格式来查找字符坐标
-            char_info = None
-            for line_index in range(10):  # 尝试前10行
-                char_key = f"{page_index}_{line_index}_{char_index}"
-                if char_key in char_sequence_map:
-                    char_info = char_sequence_map[char_key]
-                    break
-            
-            if char_info:
-                char_bbox = char_info.get("bbox", char_bbox)
-                # print(f"[DEBUG] 原字符 '{char}' 使用映射坐标: {char_bbox}")
-            else:
-                # print(f"[DEBUG] 原字符 '{char}' 使用默认坐标: {char_bbox}")
-                pass
-            
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 1,  # 标准文档
-                "char_polygons": [char_bbox],
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            old_char_diffs.append([char_info])
-        
-        # 创建新文本的字符差异
-        new_char_diffs = []
-        for i, char in enumerate(new_text):
-            char_index = new_start + i
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 从目标文档的字符序列映射中获取坐标
-            # 尝试不同的键格式来查找字符坐标
-            char_info = None
-            for line_index in range(10):  # 尝试前10行
-                char_key = f"{page_index}_{line_index}_{char_index}"
-                if char_key in target_char_sequence_map:
-                    char_info = target_char_sequence_map[char_key]
-                    break
-            
-            if char_info:
-                char_bbox = char_info.get("bbox", char_bbox)
-                # print(f"[DEBUG] 新字符 '{char}' 使用映射坐标: {char_bbox}")
-            else:
-                # print(f"[DEBUG] 新字符 '{char}' 使用默认坐标: {char_bbox}")
-                pass
-            
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 2,  # 目标文档
-                "char_polygons": [char_bbox],
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            new_char_diffs.append([char_info])
+        # 原文本（标准文档）与新文本（目标文档）的高亮分组
+        old_char_diffs = self._build_highlight_groups(old_text, old_start, page_index, standard_data, 1)
+        new_char_diffs = self._build_highlight_groups(new_text, new_start, page_index, target_data, 2)
         
         # 生成完整句子信息（基于原文本）
         full_sentence = self._get_full_sentence(old_text, old_start, standard_data)
         
-        # 生成简化的差异ID
-        self.diff_counter += 1
-        diff_id = f"diff_{self.diff_counter:03d}"
-        
         return {
             "element_id": element_id,
-            "diff_id": diff_id,
+            "diff_id": element_id,
             "type": "text",
             "status": "MODIFY",
             "page_index": page_index,
@@ -389,64 +669,35 @@ class DiffEngine:
             "new_text": new_text
         }
 
+    async def _create_move_diff_item(self, element_id: str, old_text: str, new_text: str, old_start: int, old_end: int, new_start: int, new_end: int, page_index: int, standard_data: Dict, target_data: Dict) -> Dict:
+        """创建移动差异项 - 原位置(标准文档)与新位置(目标文档)的字符都需要高亮"""
+        print(f"[DEBUG] 创建移动差异: {old_start}-{old_end} -> {new_start}-{new_end}")
+        
+        diff_item = await self._create_modification_diff_item(
+            element_id, old_text, new_text, old_start, old_end, new_start, new_end, page_index, standard_data, target_data
+        )
+        diff_item.update({
+            "status": "MOVE",
+            "elements": f'["{old_text}"]',
+            "diff_text": old_text,
+            "moved_from": old_start,
+            "moved_to": new_start
+        })
+        return diff_item
+
     async def _create_addition_diff_item(self, element_id: str, new_text: str, new_start: int, new_end: int, page_index: int, target_data: Dict) -> Dict:
         """创建新增差异项"""
         print(f"[DEBUG] 创建新增差异: '{new_text}'")
         
-        # 获取字符序列映射
-        char_sequence_map = target_data.get("char_sequence_map", {})
-        
-        # 创建新文本的字符差异
-        char_diffs = []
-        for i, char in enumerate(new_text):
-            char_index = new_start + i
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 从字符序列映射中获取坐标
-            # 尝试不同的键格式来查找字符坐标
-            char_info = None
-            for line_index in range(10):  # 尝试前10行
-                char_key = f"{page_index}_{line_index}_{char_index}"
-                if char_key in char_sequence_map:
-                    char_info = char_sequence_map[char_key]
-                    break
-            
-            if char_info:
-                char_bbox = char_info.get("bbox", char_bbox)
-                # print(f"[DEBUG] 新增字符 '{char}' 使用映射坐标: {char_bbox}")
-            else:
-                # print(f"[DEBUG] 新增字符 '{char}' 使用默认坐标: {char_bbox}")
-                pass
-            
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 2,  # 目标文档
-                "char_polygons": [char_bbox],
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            char_diffs.append([char_info])
+        # 新文本（目标文档）的高亮分组
+        char_diffs = self._build_highlight_groups(new_text, new_start, page_index, target_data, 2)
         
         # 生成完整句子信息
         full_sentence = self._get_full_sentence(new_text, new_start, target_data)
         
-        # 生成简化的差异ID
-        self.diff_counter += 1
-        diff_id = f"diff_{self.diff_counter:03d}"
-        
         return {
             "element_id": element_id,
-            "diff_id": diff_id,
+            "diff_id": element_id,
             "type": "text",
             "status": "ADD",
             "page_index": page_index,
@@ -464,60 +715,15 @@ class DiffEngine:
         """创建删除差异项"""
         print(f"[DEBUG] 创建删除差异: '{old_text}'")
         
-        # 获取字符序列映射
-        char_sequence_map = standard_data.get("char_sequence_map", {})
-        
-        # 创建原文本的字符差异
-        char_diffs = []
-        for i, char in enumerate(old_text):
-            char_index = old_start + i
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 从字符序列映射中获取坐标
-            # 尝试不同的键格式来查找字符坐标
-            char_info = None
-            for line_index in range(10):  # 尝试前10行
-                char_key = f"{page_index}_{line_index}_{char_index}"
-                if char_key in char_sequence_map:
-                    char_info = char_sequence_map[char_key]
-                    break
-            
-            if char_info:
-                char_bbox = char_info.get("bbox", char_bbox)
-                # print(f"[DEBUG] 删除字符 '{char}' 使用映射坐标: {char_bbox}")
-            else:
-                # print(f"[DEBUG] 删除字符 '{char}' 使用默认坐标: {char_bbox}")
-                pass
-            
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 1,  # 标准文档
-                "char_polygons": [char_bbox],
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            char_diffs.append([char_info])
+        # 原文本（标准文档）的高亮分组
+        char_diffs = self._build_highlight_groups(old_text, old_start, page_index, standard_data, 1)
         
         # 生成完整句子信息
         full_sentence = self._get_full_sentence(old_text, old_start, standard_data)
         
-        # 生成简化的差异ID
-        self.diff_counter += 1
-        diff_id = f"diff_{self.diff_counter:03d}"
-        
         return {
             "element_id": element_id,
-            "diff_id": diff_id,
+            "diff_id": element_id,
             "type": "text",
             "status": "DELETE",
             "page_index": page_index,
@@ -531,165 +737,6 @@ class DiffEngine:
             "new_text": ""
         }
 
-    async def _create_replacement_diff_item(self, element_id: str, old_text: str, new_text: str, old_start: int, old_end: int, new_start: int, new_end: int, page_index: int, standard_data: Dict, target_data: Dict) -> Dict:
-        """创建替换差异项"""
-        print(f"[DEBUG] 创建替换差异: '{old_text}' -> '{new_text}'")
-        
-        # 获取字符序列
-        char_sequence = standard_data.get("char_sequence_map", {}).get("char_sequence", [])
-        
-        # 创建原文本的字符差异
-        old_char_diffs = []
-        for i, char in enumerate(old_text):
-            char_index = old_start + i
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 尝试从字符序列中获取精确坐标
-            if char_index < len(char_sequence):
-                char_info = char_sequence[char_index]
-                pdf_bbox = char_info.get("bbox", char_bbox)
-                char_bbox = pdf_bbox
-                print(f"[DEBUG] 原字符 '{char}' 使用PDF坐标: {pdf_bbox}")
-            
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 1,  # 标准文档
-                "char_polygons": [char_bbox],
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            old_char_diffs.append([char_info])
-        
-        # 创建新文本的字符差异
-        new_char_diffs = []
-        for i, char in enumerate(new_text):
-            char_index = new_start + i
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 尝试从目标文档的字符序列中获取精确坐标
-            target_char_sequence = target_data.get("char_sequence_map", {}).get("char_sequence", [])
-            if char_index < len(target_char_sequence):
-                char_info = target_char_sequence[char_index]
-                pdf_bbox = char_info.get("bbox", char_bbox)
-                char_bbox = pdf_bbox
-                print(f"[DEBUG] 新字符 '{char}' 使用PDF坐标: {pdf_bbox}")
-            
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 2,  # 目标文档
-                "char_polygons": [char_bbox],
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            new_char_diffs.append([char_info])
-        
-        # 生成完整句子信息（基于原文本）
-        full_sentence = self._get_full_sentence(old_text, old_start, standard_data)
-        
-        return {
-            "element_id": element_id,
-            "type": "text",
-            "status": "REPLACE",
-            "page_index": page_index,
-            "elements": f'["{old_text}", "{new_text}"]',
-            "diff": old_char_diffs + new_char_diffs,  # 合并原文本和新文本的差异
-            "full_sentence": full_sentence,
-            "diff_text": f"{old_text} -> {new_text}",
-            "diff_start": old_start,
-            "diff_length": len(old_text),
-            "old_text": old_text,
-            "new_text": new_text
-        }
-
-    async def _create_char_level_diff_item(self, element_id: str, status: str, text: str, start_idx: int, end_idx: int, page_index: int, doc_data: Dict) -> Dict:
-        """创建字符级差异项"""
-        print(f"[DEBUG] 创建字符级差异项: {element_id}, 状态: {status}, 文本: '{text}', 位置: {start_idx}-{end_idx}")
-        
-        # 从文档数据中获取字符序列和页面信息
-        char_sequence = []
-        page_height = 792.0  # 默认A4页面高度
-        for page in doc_data.get("pages", []):
-            if page["page_index"] == page_index:
-                char_sequence = page.get("char_sequence", [])
-                page_height = page.get("height", 792.0)
-                break
-        
-        char_diffs = []
-        
-        # 为每个字符创建坐标信息
-        for i, char in enumerate(text):
-            char_index = start_idx + i
-            # 默认坐标（基于图片像素尺寸）
-            char_bbox = [100 + i * 12, 100 + page_index * 20, 112 + i * 12, 116 + page_index * 20]
-            
-            # 尝试从字符序列中获取精确坐标
-            if char_index < len(char_sequence):
-                char_info = char_sequence[char_index]
-                pdf_bbox = char_info.get("bbox", char_bbox)
-                # 直接使用PDF坐标，PyMuPDF会处理坐标转换
-                char_bbox = pdf_bbox
-                print(f"[DEBUG] 字符 '{char}' 使用PDF坐标: {pdf_bbox}")
-            
-            # 创建字符信息，确保char_polygons是4元素数组
-            char_info = {
-                "text": char,
-                "page_index": page_index,
-                "line_index": 0,
-                "doc_index": 1 if status == "DELETE" else 2,
-                "char_polygons": [char_bbox],  # 4元素数组 [x0, y0, x1, y1]
-                "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
-                "sub_info": [{
-                    "page_id": page_index,
-                    "sub_polygons": char_bbox,
-                    "sub_text_index": {
-                        "start_index": char_index,
-                        "length": 1
-                    }
-                }],
-                "sub_type": ""
-            }
-            char_diffs.append([char_info])
-
-        # 生成完整句子信息
-        full_sentence = self._get_full_sentence(text, start_idx, doc_data)
-        
-        return {
-            "element_id": element_id,
-            "type": "text",
-            "status": status,
-            "page_index": page_index,
-            "elements": f'["{text}"]',
-            "diff": char_diffs,
-            "full_sentence": full_sentence,
-            "diff_text": text,
-            "diff_start": start_idx,
-            "diff_length": len(text)
-        }
-
-    async def _create_diff_item(self, element_id: str, status: str, text: str, page_index: int, doc_data: Dict) -> Dict:
-        """创建差异项 - 兼容性方法"""
-        return await self._create_char_level_diff_item(element_id, status, text, 0, len(text), page_index, doc_data)
-    
     def _get_full_sentence(self, diff_text: str, start_idx: int, doc_data: Dict) -> Dict:
         """获取包含差异的完整句子"""
         try:
@@ -757,13 +804,6 @@ class DiffEngine:
                 "diff_end": len(diff_text)
             }
     
-    def _generate_char_bbox(self, char_index: int, page_index: int) -> List[int]:
-        """生成字符边界框"""
-        # 模拟坐标，实际应该从文档解析中获取
-        x = 100 + char_index * 12
-        y = 100 + page_index * 20
-        return [x, y, x + 12, y + 16]
-    
     async def _generate_sample_diffs(self) -> List[Dict]:
         """生成示例差异用于演示 - 使用正确的坐标格式"""
         # 示例PDF坐标（基于612x792的A4页面）
@@ -921,6 +961,13 @@ class DiffEngine:
             "additions": len([d for d in diff_list if d["status"] == "ADD"]),
             "deletions": len([d for d in diff_list if d["status"] == "DELETE"]),
             "modifications": len([d for d in diff_list if d["status"] == "MODIFY"]),
-            "moves": len([d for d in diff_list if d["status"] == "MOVE"])
+            "moves": len([d for d in diff_list if d["status"] == "MOVE"]),
+            "conflicts": len([d for d in diff_list if d["status"] == "CONFLICT"]),
+            # 超出预算而按行/区段粗粒度对比的差异数
+            "coarse_differences": len([d for d in diff_list if d.get("coarse")]),
+            # 条款对齐对比中仅编号变化（如插入条款后整体顺延）的条款数
+            "renumbered_clauses": len(self.renumbered_clauses),
+            # 金额/百分比/日期/期限发生变化的差异数
+            "entity_differences": len([d for d in diff_list if d.get("entity_type")])
         }
         return summary
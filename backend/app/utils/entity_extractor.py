@@ -0,0 +1,153 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import zip_longest
+from typing import List, Dict, Optional, Tuple
+
+# 实体类型
+ENTITY_AMOUNT = "AMOUNT"
+ENTITY_PERCENTAGE = "PERCENTAGE"
+ENTITY_DATE = "DATE"
+ENTITY_DURATION = "DURATION"
+
+# 合同风险优先级：差异项同时涉及多类实体时，entity_type 取优先级最高者
+ENTITY_PRIORITY = (ENTITY_AMOUNT, ENTITY_PERCENTAGE, ENTITY_DATE, ENTITY_DURATION)
+
+CN_DIGITS = {"零": 0, "〇": 0, "一": 1, "壹": 1, "二": 2, "贰": 2, "两": 2, "三": 3, "叁": 3, "四": 4, "肆": 4,
+             "五": 5, "伍": 5, "六": 6, "陆": 6, "七": 7, "柒": 7, "八": 8, "捌": 8, "九": 9, "玖": 9}
+CN_UNITS = {"十": 10, "拾": 10, "百": 100, "佰": 100, "千": 1000, "仟": 1000}
+CN_SECTIONS = {"万": 10000, "亿": 100000000}
+MAGNITUDES = {"万": 10000, "亿": 100000000}
+
+# 数字前不能紧跟数字，避免从长数字的中间开始匹配
+_NUMBER = r'(?<![\d.])\d+(?:[,，]\d{3})*(?:\.\d+)?'
+_CN_NUMBER = r'[零〇一二两三四五六七八九十百千]+'
+# 中文金额（大写或小写），万/亿之前至少有一个数字或数位
+_CN_AMOUNT = r'[零〇一二两三四五六七八九十百千万亿壹贰叁肆伍陆柒捌玖拾佰仟]*[零〇一二两三四五六七八九十百千壹贰叁肆伍陆柒捌玖拾佰仟][万亿]*'
+
+# 期限标记：单独的"日"/"月"（不带"个"）前面是"后/起/满"或后面跟这些词时才作为期限，如"收到发票后30日"、"三十日内"
+_DURATION_MARKER = r'(?=\s*(?:以内|之内|内|以后|之后|后|届满|期满))'
+# 不带年份的日期中的月、日
+_MONTH_OR_DAY = rf'(?<![\d.])\d{{1,2}}|{_CN_NUMBER}'
+
+# 所有实体一次扫描；分支顺序即匹配优先级（日期优先于期限，期限优先于不带年份的日期；单独的年份如"2024年"不作为期限）
+ENTITY_PATTERN = re.compile(
+    rf'(?P<date>(?P<year>\d{{4}})\s*年\s*(?P<month>\d{{1,2}})\s*月(?:\s*(?P<day>\d{{1,2}})\s*日)?'
+    rf'|(?P<iso_year>\d{{4}})[-/.](?P<iso_month>\d{{1,2}})[-/.](?P<iso_day>\d{{1,2}}))'
+    rf'|(?P<capital_amount>(?P<capital_yuan>{_CN_AMOUNT})元(?:(?P<jiao>[零壹贰叁肆伍陆柒捌玖])角)?(?:(?P<fen>[壹贰叁肆伍陆柒捌玖])分)?整?)'
+    rf'|(?P<amount>(?:(?:人民币|RMB|[¥￥])\s*)?(?P<amount_number>{_NUMBER})\s*(?P<amount_magnitude>[万亿])?\s*元'
+    rf'|[¥￥]\s*(?P<symbol_number>{_NUMBER})\s*(?P<symbol_magnitude>[万亿])?)'
+    rf'|(?P<percentage>(?P<percent_number>{_NUMBER})\s*[%％]|百分之(?P<percent_words>{_CN_NUMBER}|{_NUMBER}))'
+    rf'|(?P<duration>(?!(?:19|20)\d{{2}}\s*年)(?:(?<=[后起满])(?P<duration_after>))?(?P<duration_number>{_NUMBER}|{_CN_NUMBER})\s*(?P<duration_count>个)?\s*'
+    rf'(?P<duration_unit>工作日|自然日|日历日|天|周|星期|年|小时|月(?!\s*(?:{_MONTH_OR_DAY})\s*[日号])(?(duration_count)|(?(duration_after)|{_DURATION_MARKER}))|日(?(duration_after)|{_DURATION_MARKER})))'
+    rf'|(?P<partial_date>(?P<partial_month>{_MONTH_OR_DAY})\s*月(?:\s*(?P<partial_day>{_MONTH_OR_DAY})\s*[日号])?'
+    rf'|(?P<day_only>{_MONTH_OR_DAY})\s*日)'
+)
+
+# (start, end, 类型, 原文, 归一化值)
+Entity = Tuple[int, int, str, str, object]
+
+
+def parse_chinese_number(text: str) -> int:
+    """中文数字转整数：三十 -> 30，一百零五 -> 105，壹佰万 -> 1000000"""
+    total, section, digit = 0, 0, 0
+    for char in text:
+        if char in CN_DIGITS:
+            digit = CN_DIGITS[char]
+        elif char in CN_UNITS:
+            section += (digit or 1) * CN_UNITS[char]
+            digit = 0
+        elif char == "亿":
+            # 亿作用于之前的全部数值（一万亿 = 10^12）
+            total = (total + section + digit) * CN_SECTIONS[char]
+            section, digit = 0, 0
+        elif char == "万":
+            total += (section + digit) * CN_SECTIONS[char]
+            section, digit = 0, 0
+    return total + section + digit
+
+
+def _parse_number(text: str) -> float:
+    if text and text[0].isdigit():
+        return float(text.replace(",", "").replace("，", ""))
+    return float(parse_chinese_number(text))
+
+
+def _normalize(match: re.Match) -> Tuple[str, object]:
+    """按命中的分支返回 (实体类型, 归一化值)"""
+    group = match.group
+    if group("date"):
+        if group("year"):
+            year, month, day = group("year"), group("month"), group("day")
+        else:
+            year, month, day = group("iso_year"), group("iso_month"), group("iso_day")
+        value = f"{int(year):04d}-{int(month):02d}"
+        return ENTITY_DATE, f"{value}-{int(day):02d}" if day else value
+    if group("capital_amount"):
+        value = parse_chinese_number(group("capital_yuan"))
+        value += CN_DIGITS.get(group("jiao") or "", 0) / 10 + CN_DIGITS.get(group("fen") or "", 0) / 100
+        return ENTITY_AMOUNT, round(value, 2)
+    if group("amount"):
+        number = group("amount_number") or group("symbol_number")
+        magnitude = group("amount_magnitude") or group("symbol_magnitude")
+        return ENTITY_AMOUNT, round(_parse_number(number) * MAGNITUDES.get(magnitude, 1), 2)
+    if group("percentage"):
+        return ENTITY_PERCENTAGE, _parse_number(group("percent_number") or group("percent_words"))
+    if group("partial_date"):
+        # 不带年份的日期按 ISO 8601 省略写法归一化：--12-31（月日）、--10（月）、---05（日）
+        if group("day_only"):
+            return ENTITY_DATE, f"---{int(_parse_number(group('day_only'))):02d}"
+        value = f"--{int(_parse_number(group('partial_month'))):02d}"
+        return ENTITY_DATE, f"{value}-{int(_parse_number(group('partial_day'))):02d}" if group("partial_day") else value
+    unit = group("duration_unit")
+    return ENTITY_DURATION, f"{_parse_number(group('duration_number')):g}{'日' if unit == '天' else unit}"
+
+
+class EntityIndex:
+    """单个文档的实体索引：实体按起点排序且互不重叠，区间查询为 O(log n)"""
+
+    def __init__(self, entities: List[Entity]):
+        self.entities = entities
+        self.starts = [entity[0] for entity in entities]
+        self.ends = [entity[1] for entity in entities]
+
+    def overlapping(self, start: Optional[int], end: Optional[int]) -> List[Entity]:
+        """与 [start, end) 相交的实体；空区间（插入点）取该位置落在其内部的实体"""
+        if start is None:
+            return []
+        if start == end:
+            return self.entities[bisect_right(self.ends, start):bisect_left(self.starts, start)]
+        return self.entities[bisect_right(self.ends, start):bisect_left(self.starts, end)]
+
+
+class EntityExtractor:
+    """数值实体提取 - 金额、百分比、日期、期限
+
+    每个文档只做一次正则扫描构建索引；差异项按两侧区间在索引中二分查找相交的实体，
+    数字中间的字符级修改（如 3,000,000元 -> 3,500,000元）也能定位到完整实体。
+    """
+
+    def extract(self, text: str) -> EntityIndex:
+        entities = []
+        for match in ENTITY_PATTERN.finditer(text):
+            entity_type, value = _normalize(match)
+            entities.append((match.start(), match.end(), entity_type, match.group(), value))
+        return EntityIndex(entities)
+
+    def compare(self, old_entities: List[Entity], new_entities: List[Entity]) -> List[Dict]:
+        """按类型依次配对两侧实体，返回归一化值不同的变更（仅格式不同的视为未变化）"""
+        changes = []
+        for entity_type in ENTITY_PRIORITY:
+            old_side = [entity for entity in old_entities if entity[2] == entity_type]
+            new_side = [entity for entity in new_entities if entity[2] == entity_type]
+            for old, new in zip_longest(old_side, new_side):
+                old_value = old[4] if old else None
+                new_value = new[4] if new else None
+                if old_value != new_value:
+                    changes.append({
+                        "type": entity_type,
+                        "old_text": old[3] if old else None,
+                        "new_text": new[3] if new else None,
+                        "old_value": old_value,
+                        "new_value": new_value
+                    })
+        return changes
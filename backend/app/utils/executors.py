@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+
+def _timed_call(fn, args, kwargs):
+    """在工作线程/进程中执行任务并记录开始、结束时间（模块级函数，可被子进程序列化）"""
+    started_at = time.time()
+    result = fn(*args, **kwargs)
+    return result, started_at, time.time()
+
+
+class InstrumentedExecutor(Executor):
+    """带统计的执行器 - 包装线程池/进程池，记录排队深度、排队等待时间和执行时间"""
+
+    def __init__(self, name: str, executor: Executor, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._pending = 0        # 已提交、尚未完成的任务数
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        submitted_at = time.time()
+        with self._lock:
+            self._pending += 1
+
+        inner = self._executor.submit(_timed_call, fn, args, kwargs)
+        outer = Future()
+
+        def on_done(future: Future):
+            with self._lock:
+                self._pending -= 1
+                if future.cancelled():
+                    self._failed += 1
+                elif future.exception() is not None:
+                    self._failed += 1
+                else:
+                    _, started_at, finished_at = future.result()
+                    wait = max(0.0, started_at - submitted_at)
+                    self._completed += 1
+                    self._total_wait += wait
+                    self._max_wait = max(self._max_wait, wait)
+                    self._total_run += finished_at - started_at
+
+            if future.cancelled():
+                outer.cancel()
+            elif future.exception() is not None:
+                outer.set_exception(future.exception())
+            else:
+                outer.set_result(future.result()[0])
+
+        inner.add_done_callback(on_done)
+        return outer
+
+    def shutdown(self, wait: bool = True, **kwargs):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                # 排队深度：超出工作线程/进程数的未完成任务
+                "queue_depth": max(0, self._pending - self.max_workers),
+                "pending": self._pending,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._total_wait / self._completed * 1000, 2) if self._completed else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_run_ms": round(self._total_run / self._completed * 1000, 2) if self._completed else 0.0
+            }
+
+
+class ExecutorManager:
+    """执行器层 - 线程池处理PyMuPDF解析/渲染等阻塞IO，进程池处理纯Python的差异计算"""
+
+    def __init__(self, thread_workers: int = 4, process_workers: int = 0):
+        self.thread_pool = InstrumentedExecutor("thread", ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="doc-io"), thread_workers)
+        # process_workers 为 0 时不启用进程池，差异计算在线程池中执行
+        self.process_pool = None
+        if process_workers > 0:
+            self.process_pool = InstrumentedExecutor("process", ProcessPoolExecutor(max_workers=process_workers), process_workers)
+
+    @property
+    def cpu_executor(self) -> Executor:
+        """CPU密集任务使用的执行器"""
+        return self.process_pool or self.thread_pool
+
+    async def run_in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.thread_pool, fn, *args)
+
+    async def run_in_process(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.cpu_executor, fn, *args)
+
+    def stats(self) -> Dict:
+        stats = {"thread": self.thread_pool.stats()}
+        if self.process_pool is not None:
+            stats["process"] = self.process_pool.stats()
+        return stats
+
+    def shutdown(self):
+        self.thread_pool.shutdown(wait=False)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False)
+
+
+_executor_manager: Optional[ExecutorManager] = None
+
+
+def get_executors() -> ExecutorManager:
+    """获取进程内共享的执行器层"""
+    global _executor_manager
+    if _executor_manager is None:
+        from app.config import settings
+        process_workers = settings.EXECUTOR_PROCESS_WORKERS
+        if process_workers < 0:
+            process_workers = os.cpu_count() or 1
+        _executor_manager = ExecutorManager(settings.EXECUTOR_THREAD_WORKERS, process_workers)
+        print(f"[DEBUG] 执行器层已创建: 线程池={settings.EXECUTOR_THREAD_WORKERS}, 进程池={process_workers}")
+    return _executor_manager
+
+
+def shutdown_executors():
+    global _executor_manager
+    if _executor_manager is not None:
+        _executor_manager.shutdown()
+        _executor_manager = None
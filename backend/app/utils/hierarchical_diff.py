@@ -0,0 +1,169 @@
+from typing import List, Dict, Tuple
+from app.utils.diff_algorithms import Opcode, DiffBudget, DiffBudgetExceeded, create_diff_algorithm
+from app.utils.text_segmenter import TextSegmenter, Span
+
+# 对比层级：段落 -> 句子 -> 字符
+LEVEL_PARAGRAPH = 0
+LEVEL_SENTENCE = 1
+LEVEL_CHAR = 2
+
+# 超出预算后的降级粒度：line(按行对比) / section(整个区段作为一处替换)
+COARSE_LINE = "line"
+COARSE_SECTION = "section"
+
+# 降级对比的区段: (a_start, a_end, b_start, b_end, 降级粒度)
+CoarseSection = Tuple[int, int, int, int, str]
+
+
+def merge_opcodes(opcodes: List[Opcode]) -> List[Opcode]:
+    """合并相邻的同类操作码；相邻的非equal操作合并为一个replace/delete/insert"""
+    merged = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if i1 == i2 and j1 == j2:
+            continue
+        if merged and (tag == 'equal') == (merged[-1][0] == 'equal'):
+            i1, j1 = merged[-1][1], merged[-1][3]
+            merged.pop()
+        if tag != 'equal':
+            if i2 > i1 and j2 > j1:
+                tag = 'replace'
+            else:
+                tag = 'delete' if i2 > i1 else 'insert'
+        merged.append((tag, i1, i2, j1, j2))
+    return merged
+
+
+class BudgetedDiff:
+    """带预算的区段字符级对比
+
+    区段的字符级对比超出时间/内存预算时，降级为行级对比；行级对比仍超时则整个区段作为一处替换。
+    降级的区段记录在 coarse_sections 中。
+    """
+
+    def __init__(self, algorithm: str = "auto", time_budget: float = None, memory_budget: int = None):
+        self.algorithm = algorithm
+        self.time_budget = time_budget      # 每个区段的时间预算（秒）
+        self.memory_budget = memory_budget  # 每个区段的内存预算（字节）
+        self.segmenter = TextSegmenter()
+        self.coarse_sections: List[CoarseSection] = []
+
+    def get_opcodes(self, text1: str, text2: str, a_start: int, a_end: int, b_start: int, b_end: int) -> List[Opcode]:
+        """对比 text1[a_start:a_end] 与 text2[b_start:b_end]，返回基于全文偏移的操作码"""
+        segment1 = text1[a_start:a_end]
+        segment2 = text2[b_start:b_end]
+        try:
+            local_opcodes = self._fine_opcodes(segment1, segment2, DiffBudget(self.time_budget, self.memory_budget))
+        except DiffBudgetExceeded as e:
+            level = COARSE_LINE
+            try:
+                local_opcodes = self._line_opcodes(segment1, segment2)
+            except DiffBudgetExceeded:
+                level = COARSE_SECTION
+                local_opcodes = [('replace', 0, len(segment1), 0, len(segment2))]
+            print(f"[DEBUG] 区段[{a_start}:{a_end}]/[{b_start}:{b_end}] {e}，降级为{level}级对比")
+            self.coarse_sections.append((a_start, a_end, b_start, b_end, level))
+
+        return [(tag, a_start + i1, a_start + i2, b_start + j1, b_start + j2) for tag, i1, i2, j1, j2 in local_opcodes]
+
+    def _fine_opcodes(self, segment1: str, segment2: str, budget: DiffBudget) -> List[Opcode]:
+        """预算内的细粒度对比（字符级），子类可替换为其他切分方式"""
+        algorithm = create_diff_algorithm(self.algorithm, len(segment1), len(segment2), budget)
+        budget.check_memory(algorithm.name, len(segment1), len(segment2))
+        return algorithm.get_opcodes(segment1, segment2)
+
+    def _line_opcodes(self, segment1: str, segment2: str) -> List[Opcode]:
+        """行级对比：相同的行输出equal，变化的行整行输出，不再细分到字符"""
+        lines1 = self.segmenter.split_paragraphs(segment1)
+        lines2 = self.segmenter.split_paragraphs(segment2)
+        line_ids: Dict[str, int] = {}
+        ids1 = [line_ids.setdefault(segment1[s:e], len(line_ids)) for s, e in lines1]
+        ids2 = [line_ids.setdefault(segment2[s:e], len(line_ids)) for s, e in lines2]
+
+        opcodes = []
+        for tag, i1, i2, j1, j2 in create_diff_algorithm("patience", budget=DiffBudget(self.time_budget)).get_opcodes(ids1, ids2):
+            char_a1 = lines1[i1][0] if i1 < len(lines1) else len(segment1)
+            char_a2 = lines1[i2 - 1][1] if i2 > i1 else char_a1
+            char_b1 = lines2[j1][0] if j1 < len(lines2) else len(segment2)
+            char_b2 = lines2[j2 - 1][1] if j2 > j1 else char_b1
+            opcodes.append((tag, char_a1, char_a2, char_b1, char_b2))
+        return merge_opcodes(opcodes)
+
+
+class HierarchicalDiff:
+    """分层差异对比
+
+    先用哈希对齐段落，只在变化的段落对内对齐句子，最后只对变化的句子区域做字符级对比。
+    输出与字符级对比相同格式的操作码（基于原文的字符偏移）。
+    """
+
+    def __init__(self, algorithm: str = "auto", time_budget: float = None, memory_budget: int = None):
+        # 字符级对比使用的算法
+        self.algorithm = algorithm
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self.segmenter = TextSegmenter()
+        self._unit_ids: Dict[str, int] = {}
+        self.char_level_chars = 0  # 实际进入字符级对比的字符数
+        self.char_differ = BudgetedDiff(algorithm, time_budget, memory_budget)
+
+    @property
+    def coarse_sections(self) -> List[CoarseSection]:
+        """超出预算而降级对比的字符级区域"""
+        return self.char_differ.coarse_sections
+
+    def get_opcodes(self, text1: str, text2: str) -> List[Opcode]:
+        self._unit_ids = {}
+        self.char_level_chars = 0
+        self.char_differ = BudgetedDiff(self.algorithm, self.time_budget, self.memory_budget)
+        opcodes = []
+        self._diff_region(text1, text2, 0, len(text1), 0, len(text2), LEVEL_PARAGRAPH, opcodes)
+        return merge_opcodes(opcodes)
+
+    def _split(self, text: str, start: int, end: int, level: int) -> List[Span]:
+        if level == LEVEL_PARAGRAPH:
+            return self.segmenter.split_paragraphs(text, start, end)
+        return self.segmenter.split_sentences(text, start, end)
+
+    def _unit_id(self, unit_text: str) -> int:
+        """文本单元的哈希ID（相同文本共享同一ID）"""
+        unit_id = self._unit_ids.get(unit_text)
+        if unit_id is None:
+            unit_id = len(self._unit_ids)
+            self._unit_ids[unit_text] = unit_id
+        return unit_id
+
+    def _diff_region(self, text1: str, text2: str, a_start: int, a_end: int, b_start: int, b_end: int, level: int, opcodes: List[Opcode]):
+        """对比 text1[a_start:a_end] 与 text2[b_start:b_end]，结果追加到 opcodes"""
+        if a_start == a_end or b_start == b_end:
+            opcodes.append(('replace', a_start, a_end, b_start, b_end))
+            return
+
+        if level == LEVEL_CHAR:
+            self.char_level_chars += (a_end - a_start) + (b_end - b_start)
+            opcodes.extend(self.char_differ.get_opcodes(text1, text2, a_start, a_end, b_start, b_end))
+            return
+
+        units1 = self._split(text1, a_start, a_end, level)
+        units2 = self._split(text2, b_start, b_end, level)
+        if len(units1) <= 1 and len(units2) <= 1:
+            # 无法再细分，直接进入下一层级
+            self._diff_region(text1, text2, a_start, a_end, b_start, b_end, level + 1, opcodes)
+            return
+
+        ids1 = [self._unit_id(text1[s:e]) for s, e in units1]
+        ids2 = [self._unit_id(text2[s:e]) for s, e in units2]
+
+        unit_algorithm = create_diff_algorithm("patience")
+        for tag, i1, i2, j1, j2 in unit_algorithm.get_opcodes(ids1, ids2):
+            char_a1 = units1[i1][0] if i1 < len(units1) else a_end
+            char_a2 = units1[i2 - 1][1] if i2 > i1 else char_a1
+            char_b1 = units2[j1][0] if j1 < len(units2) else b_end
+            char_b2 = units2[j2 - 1][1] if j2 > j1 else char_b1
+
+            if tag == 'equal':
+                opcodes.append(('equal', char_a1, char_a2, char_b1, char_b2))
+            elif tag == 'replace':
+                # 只对变化的单元对进入下一层级
+                self._diff_region(text1, text2, char_a1, char_a2, char_b1, char_b2, level + 1, opcodes)
+            else:
+                opcodes.append((tag, char_a1, char_a2, char_b1, char_b2))
@@ -0,0 +1,78 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# 同行判定：相邻两个矩形的垂直重叠不少于较矮者高度的该比例
+LINE_OVERLAP_RATIO = 0.5
+# 同行相邻判定：水平间隙不超过行高的该比例（只合并相接的矩形；中文一个字宽约等于行高，间隔一个字的两处修改不能合并）
+MAX_GAP_RATIO = 0.15
+# 跨行归入同一注释：下一行顶部与上一行底部的距离不超过行高的该倍数
+MAX_LINE_SPACING_RATIO = 1.5
+
+# 高亮注释: (差异状态, [矩形, ...])，每个矩形对应注释的一个quad
+Annotation = Tuple[str, List[List[float]]]
+# 矩形的文本来源: (差异项序号, 起始全局字符索引, 结束索引)，索引未知时为 -1（见 coordinate_transform.collect_page_rects）
+RectSpan = Tuple[int, int, int]
+
+
+def _span_columns(spans: Optional[List[RectSpan]], count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    if spans is None:
+        unknown = np.full(count, -1, dtype=np.int64)
+        return unknown, unknown, unknown
+    columns = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+    return columns[:, 0], columns[:, 1], columns[:, 2]
+
+
+def coalesce_line_rects(rects, statuses: List[str], spans: Optional[List[RectSpan]] = None) -> Tuple[np.ndarray, List[str], List[int]]:
+    """合并同一行上相接、状态相同的矩形（输入按阅读顺序），返回 (合并后的 (m, 4) 矩形, 对应状态, 对应差异项序号)
+
+    给出 spans 时只合并同一差异项内字符索引连续的矩形；索引未知时只按几何位置判断。
+    逐字符的高亮合并为每行一个矩形；已按行合并的区间高亮原样保留。
+    """
+    rects = np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+    if not len(rects):
+        return rects, [], []
+    diff_ids, starts, ends = _span_columns(spans, len(rects))
+    status_array = np.asarray(statuses)
+    prev, curr = rects[:-1], rects[1:]
+    heights = np.maximum(np.minimum(prev[:, 3] - prev[:, 1], curr[:, 3] - curr[:, 1]), 0)
+    overlap = np.minimum(prev[:, 3], curr[:, 3]) - np.maximum(prev[:, 1], curr[:, 1])
+    consecutive = (starts[1:] == ends[:-1]) | (starts[1:] < 0) | (ends[:-1] < 0)
+    same_run = (
+        (status_array[1:] == status_array[:-1])
+        & (diff_ids[1:] == diff_ids[:-1])
+        & consecutive
+        & (overlap >= heights * LINE_OVERLAP_RATIO)
+        & (curr[:, 0] - prev[:, 2] <= heights * MAX_GAP_RATIO)
+        & (curr[:, 0] >= prev[:, 0])
+    )
+    run_starts = np.concatenate(([0], np.flatnonzero(~same_run) + 1))
+    mins = np.minimum.reduceat(rects[:, :2], run_starts, axis=0)
+    maxs = np.maximum.reduceat(rects[:, 2:], run_starts, axis=0)
+    return np.hstack((mins, maxs)), status_array[run_starts].tolist(), diff_ids[run_starts].tolist()
+
+
+def group_annotations(line_rects: np.ndarray, statuses: List[str], diff_ids: Optional[List[int]] = None) -> List[Annotation]:
+    """把同一差异项在连续几行上的行矩形归为一个多矩形注释（跨行的一处修改只生成一个注释）"""
+    if not len(line_rects):
+        return []
+    status_array = np.asarray(statuses)
+    diff_array = np.asarray(diff_ids if diff_ids is not None else [-1] * len(line_rects))
+    prev, curr = line_rects[:-1], line_rects[1:]
+    line_heights = np.maximum(prev[:, 3] - prev[:, 1], 0)
+    same_group = (
+        (status_array[1:] == status_array[:-1])
+        & (diff_array[1:] == diff_array[:-1])
+        & (curr[:, 1] >= prev[:, 1])
+        & (curr[:, 1] - prev[:, 3] <= line_heights * MAX_LINE_SPACING_RATIO)
+    )
+    group_starts = np.concatenate(([0], np.flatnonzero(~same_group) + 1))
+    rounded = np.round(line_rects, 2).tolist()
+    group_ends = np.append(group_starts[1:], len(line_rects)).tolist()
+    return [(statuses[start], rounded[start:end]) for start, end in zip(group_starts.tolist(), group_ends)]
+
+
+def coalesce_highlights(rects, statuses: List[str], spans: Optional[List[RectSpan]] = None) -> List[Annotation]:
+    """一页的高亮矩形 -> 高亮注释：先按行合并相接的矩形，再把同一差异项的相邻行合并为多矩形注释"""
+    line_rects, line_statuses, line_diff_ids = coalesce_line_rects(rects, statuses, spans)
+    return group_annotations(line_rects, line_statuses, line_diff_ids)
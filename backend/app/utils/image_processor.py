@@ -1,7 +1,10 @@
 import fitz
 import os
-from typing import Dict, List
+from typing import Dict, List, Tuple
 from app.config import settings
+from app.utils.executors import get_executors
+from app.utils.coordinate_transform import DEFAULT_RENDER_SCALE, collect_page_rects, pdf_rects_to_image
+from app.utils.highlight_coalescer import coalesce_highlights, coalesce_line_rects
 from PIL import Image, ImageDraw
 
 class ImageProcessor:
@@ -9,120 +12,138 @@ class ImageProcessor:
         self.image_dir = settings.IMAGES_DIR
         os.makedirs(self.image_dir, exist_ok=True)
     
-    async def generate_comparison_images(self, standard_path: str, target_path: str, comparison_id: str, diff_list: List[Dict] = None) -> Dict:
-        """生成对比图片 - 使用PyMuPDF直接绘制高亮"""
-        print(f"[DEBUG] 生成对比图片: 标准文档={standard_path}, 目标文档={target_path}")
+    async def generate_comparison_images(self, standard_path: str, target_path: str, comparison_id: str, diff_list: List[Dict] = None, render_scale: float = DEFAULT_RENDER_SCALE) -> Dict:
+        """生成对比图片 - 使用PyMuPDF直接绘制高亮，页面按 render_scale 倍渲染"""
+        print(f"[DEBUG] 生成对比图片: 标准文档={standard_path}, 目标文档={target_path}, 渲染倍数={render_scale}")
 
         # 使用PyMuPDF直接生成带高亮的图片
-        standard_images = await self._pdf_to_images_with_highlights(standard_path, f"{comparison_id}_standard", diff_list, 1)
-        target_images = await self._pdf_to_images_with_highlights(target_path, f"{comparison_id}_target", diff_list, 2)
+        standard_images = await self._pdf_to_images_with_highlights(standard_path, f"{comparison_id}_standard", diff_list, 1, render_scale)
+        target_images = await self._pdf_to_images_with_highlights(target_path, f"{comparison_id}_target", diff_list, 2, render_scale)
 
         return {
             "standard_images": standard_images,
             "target_images": target_images
         }
-    
-    async def _pdf_to_images_with_highlights(self, pdf_path: str, image_prefix: str, diff_list: List[Dict], doc_index: int) -> List[str]:
-        """使用PyMuPDF直接在PDF上绘制高亮，然后导出PNG"""
+
+    async def generate_comparison_images_with_base(self, standard_base_images: List[str], target_path: str, comparison_id: str, diff_list: List[Dict] = None, render_scale: float = DEFAULT_RENDER_SCALE, standard_page_sizes: Dict[int, Tuple[float, float]] = None) -> Dict:
+        """生成对比图片 - 标准文档复用预先渲染的页面图片，只在副本上绘制本次差异
+
+        用于一对多批量对比：标准文档的页面只渲染一次。render_scale 须与渲染 standard_base_images 时的倍数一致；
+        standard_page_sizes 为解析数据中各页的 (宽, 高)（见 coordinate_transform.get_page_sizes）。
+        """
+        print(f"[DEBUG] 生成对比图片(复用标准文档页面): 目标文档={target_path}")
+
+        standard_images = await self._draw_highlights_on_images(standard_base_images, f"{comparison_id}_standard", diff_list, 1, render_scale, standard_page_sizes)
+        target_images = await self._pdf_to_images_with_highlights(target_path, f"{comparison_id}_target", diff_list, 2, render_scale)
+
+        return {
+            "standard_images": standard_images,
+            "target_images": target_images
+        }
+
+    async def _draw_highlights_on_images(self, base_images: List[str], image_prefix: str, diff_list: List[Dict], doc_index: int, scale_factor: float = DEFAULT_RENDER_SCALE, page_sizes: Dict[int, Tuple[float, float]] = None) -> List[str]:
+        """在已渲染的页面图片副本上绘制高亮（在线程池中执行，不阻塞事件循环）"""
+        return await get_executors().run_in_thread(self._draw_highlights_on_images_sync, base_images, image_prefix, diff_list, doc_index, scale_factor, page_sizes)
+
+    def _draw_highlights_on_images_sync(self, base_images: List[str], image_prefix: str, diff_list: List[Dict], doc_index: int, scale_factor: float = DEFAULT_RENDER_SCALE, page_sizes: Dict[int, Tuple[float, float]] = None) -> List[str]:
+        """在已渲染的页面图片副本上绘制半透明高亮（坐标与PyMuPDF页面坐标一致，每页的矩形一次性转换为像素坐标）"""
+        # 差异颜色配置（与PDF高亮注释的颜色一致）
+        colors = {
+            "ADD": (82, 196, 26, 77),      # 绿色 - 新增 (RGBA)
+            "DELETE": (255, 77, 79, 77),   # 红色 - 删除 (RGBA)
+            "MODIFY": (250, 173, 20, 77),  # 橙色 - 修改 (RGBA)
+            "MOVE": (24, 144, 255, 77),    # 蓝色 - 移动 (RGBA)
+            "CONFLICT": (114, 46, 209, 77) # 紫色 - 冲突 (RGBA)
+        }
+
+        page_rects = collect_page_rects(diff_list, doc_index)
+        image_paths = []
+        for page_num, base_image in enumerate(base_images):
+            image_filename = f"{image_prefix}_page_{page_num}.png"
+            try:
+                img = Image.open(base_image.replace('/images/', self.image_dir + '/')).convert('RGBA')
+                overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
+                draw = ImageDraw.Draw(overlay)
+
+                rects, statuses, spans = page_rects.get(page_num, ([], [], []))
+                if rects:
+                    # 同行相邻的矩形先合并，减少绘制次数
+                    line_rects, line_statuses, _ = coalesce_line_rects(rects, statuses, spans)
+                    page_width, page_height = self._page_size(page_sizes, page_num, img, scale_factor)
+                    image_rects = pdf_rects_to_image(line_rects, page_width, page_height, scale_factor)
+                    for rect, status in zip(image_rects.tolist(), line_statuses):
+                        draw.rectangle(rect, fill=colors.get(status, (128, 128, 128, 77)))  # 默认灰色
+
+                Image.alpha_composite(img, overlay).convert('RGB').save(os.path.join(self.image_dir, image_filename))
+                image_paths.append(f"/images/{image_filename}")
+            except Exception as e:
+                print(f"[DEBUG] 绘制差异高亮失败: {e}")
+                image_paths.append(base_image)  # 使用原图片
+
+        return image_paths
+
+    async def _pdf_to_images_with_highlights(self, pdf_path: str, image_prefix: str, diff_list: List[Dict], doc_index: int, render_scale: float = DEFAULT_RENDER_SCALE) -> List[str]:
+        """使用PyMuPDF直接在PDF上绘制高亮，然后导出PNG（在线程池中执行，不阻塞事件循环）"""
         print(f"[DEBUG] 使用PyMuPDF绘制高亮: {pdf_path}, 文档索引: {doc_index}")
         
         try:
-            # 打开PDF文档
-            doc = fitz.open(pdf_path)
-            image_paths = []
-            
-            # 差异颜色配置
-            colors = {
-                "ADD": (0.32, 0.77, 0.10, 0.3),      # 绿色 - 新增 (RGBA)
-                "DELETE": (1.0, 0.30, 0.31, 0.3),     # 红色 - 删除 (RGBA)
-                "MODIFY": (0.98, 0.68, 0.08, 0.3),    # 橙色 - 修改 (RGBA)
-                "MOVE": (0.09, 0.56, 1.0, 0.3)        # 蓝色 - 移动 (RGBA)
-            }
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                print(f"[DEBUG] 处理页面 {page_num}")
-                
-                # 在PDF页面上绘制高亮
-                if diff_list:
-                    page_diffs = [diff for diff in diff_list if diff.get('page_index') == page_num]
-                    print(f"[DEBUG] 页面 {page_num} 有 {len(page_diffs)} 个差异")
-                    
-                    for diff in page_diffs:
-                        status = diff.get('status', '')
-                        color = colors.get(status, (0.5, 0.5, 0.5, 0.3))  # 默认灰色
-                        
-                        # 遍历差异中的字符组
-                        for char_group in diff.get('diff', []):
-                            for char_info in char_group:
-                                if char_info.get('doc_index') == doc_index:
-                                    # 获取字符坐标
-                                    char_polygons = char_info.get('char_polygons', [])
-                                    for polygon in char_polygons:
-                                        if len(polygon) >= 4:
-                                            x0, y0, x1, y1 = polygon[:4]
-                                            
-                                            # 在PDF页面上绘制高亮矩形
-                                            rect = fitz.Rect(x0, y0, x1, y1)
-                                            highlight = page.add_highlight_annot(rect)
-                                            # 高亮注释只支持描边颜色，不支持填充颜色
-                                            highlight.set_colors(stroke=color[:3])
-                                            highlight.set_opacity(color[3])
-                                            
-                                            print(f"[DEBUG] 绘制高亮: {status} 坐标({x0}, {y0}, {x1}, {y1})")
-                
-                # 将页面转换为PNG图片
-                mat = fitz.Matrix(2.0, 2.0)  # 2倍缩放
-                pix = page.get_pixmap(matrix=mat)
-                
-                # 保存图片
-                image_filename = f"{image_prefix}_page_{page_num}.png"
-                image_path = os.path.join(self.image_dir, image_filename)
-                pix.save(image_path)
-                
-                # 返回相对路径
-                relative_path = f"/images/{image_filename}"
-                image_paths.append(relative_path)
-                print(f"[DEBUG] 保存图片: {relative_path}")
-            
-            doc.close()
-            return image_paths
+            return await get_executors().run_in_thread(self._render_pdf_with_highlights, pdf_path, image_prefix, diff_list, doc_index, render_scale)
             
         except Exception as e:
             print(f"[DEBUG] PyMuPDF高亮绘制失败: {e}")
             # 如果失败，回退到普通图片生成
-            return await self.document_to_images(pdf_path, image_prefix)
+            return await self.document_to_images(pdf_path, image_prefix, render_scale)
 
-    def _convert_pdf_coords_to_image_coords(self, pdf_coords: List[float], page_height: float, scale_factor: float = 2.0) -> List[float]:
-        """将PDF坐标转换为图片坐标
+    def _render_pdf_with_highlights(self, pdf_path: str, image_prefix: str, diff_list: List[Dict], doc_index: int, render_scale: float = DEFAULT_RENDER_SCALE) -> List[str]:
+        """在PDF页面上添加高亮注释并逐页导出PNG"""
+        # 打开PDF文档
+        doc = fitz.open(pdf_path)
+        image_paths = []
         
-        Args:
-            pdf_coords: PDF坐标 [x0, y0, x1, y1]
-            page_height: PDF页面高度（点）
-            scale_factor: 缩放因子（默认2.0）
+        # 差异颜色配置
+        colors = {
+            "ADD": (0.32, 0.77, 0.10, 0.3),      # 绿色 - 新增 (RGBA)
+            "DELETE": (1.0, 0.30, 0.31, 0.3),     # 红色 - 删除 (RGBA)
+            "MODIFY": (0.98, 0.68, 0.08, 0.3),    # 橙色 - 修改 (RGBA)
+            "MOVE": (0.09, 0.56, 1.0, 0.3),       # 蓝色 - 移动 (RGBA)
+            "CONFLICT": (0.45, 0.18, 0.82, 0.3)   # 紫色 - 冲突 (RGBA)
+        }
         
-        Returns:
-            转换后的图片坐标 [x0, y0, x1, y1]
-        """
-        if len(pdf_coords) < 4:
-            return pdf_coords
+        page_rects = collect_page_rects(diff_list, doc_index)
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            print(f"[DEBUG] 处理页面 {page_num}")
+            
+            # 在PDF页面上绘制高亮（PyMuPDF页面坐标，渲染时由矩阵统一缩放）
+            # 同行相邻的矩形合并为一个quad，相邻行合并为一个多quad注释
+            rects, statuses, spans = page_rects.get(page_num, ([], [], []))
+            annotations = coalesce_highlights(rects, statuses, spans)
+            print(f"[DEBUG] 页面 {page_num} 有 {len(rects)} 个差异矩形，合并为 {len(annotations)} 个高亮注释")
+            for status, quads in annotations:
+                color = colors.get(status, (0.5, 0.5, 0.5, 0.3))  # 默认灰色
+                highlight = page.add_highlight_annot([fitz.Rect(*quad) for quad in quads])
+                # 高亮注释只支持描边颜色，不支持填充颜色
+                highlight.set_colors(stroke=color[:3])
+                highlight.set_opacity(color[3])
+            
+            # 将页面转换为PNG图片
+            mat = fitz.Matrix(render_scale, render_scale)
+            pix = page.get_pixmap(matrix=mat)
             
-        x0, y0, x1, y1 = pdf_coords[:4]
-        
-        # 1. 应用缩放因子
-        x0_scaled = x0 * scale_factor
-        y0_scaled = y0 * scale_factor
-        x1_scaled = x1 * scale_factor
-        y1_scaled = y1 * scale_factor
-        
-        # 2. 翻转Y轴（PDF原点在左下角，图片原点在左上角）
-        image_height = page_height * scale_factor
-        y0_flipped = image_height - y1_scaled
-        y1_flipped = image_height - y0_scaled
+            # 保存图片
+            image_filename = f"{image_prefix}_page_{page_num}.png"
+            image_path = os.path.join(self.image_dir, image_filename)
+            pix.save(image_path)
+            
+            # 返回相对路径
+            relative_path = f"/images/{image_filename}"
+            image_paths.append(relative_path)
+            print(f"[DEBUG] 保存图片: {relative_path}")
         
-        return [x0_scaled, y0_flipped, x1_scaled, y1_flipped]
+        doc.close()
+        return image_paths
 
-    async def _draw_diff_overlays(self, image_paths: List[str], diff_list: List[Dict], doc_index: int) -> List[str]:
+    async def _draw_diff_overlays(self, image_paths: List[str], diff_list: List[Dict], doc_index: int, scale_factor: float = DEFAULT_RENDER_SCALE, page_sizes: Dict[int, Tuple[float, float]] = None) -> List[str]:
         """在图片上绘制差异标记"""
         print(f"[DEBUG] 开始绘制差异标记，文档索引: {doc_index}")
         
@@ -134,6 +155,7 @@ class ImageProcessor:
             "MOVE": (24, 144, 255, 100)     # 蓝色 - 移动 (RGBA)
         }
         
+        page_rects = collect_page_rects(diff_list, doc_index)
         processed_images = []
         
         for image_path in image_paths:
@@ -147,36 +169,16 @@ class ImageProcessor:
                 # 创建绘图对象
                 draw = ImageDraw.Draw(img, 'RGBA')
                 
-                # 获取图片尺寸（用于坐标转换）
-                img_width, img_height = img.size
-                # 计算原始PDF页面高度（图片是2倍缩放）
-                pdf_page_height = img_height / 2.0
-                
-                # 绘制该页面的差异标记
-                page_diffs = [diff for diff in diff_list if diff.get('page_index') == page_index]
-                print(f"[DEBUG] 页面 {page_index} 有 {len(page_diffs)} 个差异")
-                
-                for diff in page_diffs:
-                    status = diff.get('status', '')
-                    color = colors.get(status, (128, 128, 128, 100))  # 默认灰色
-                    
-                    # 遍历差异中的字符组
-                    for char_group in diff.get('diff', []):
-                        for char_info in char_group:
-                            if char_info.get('doc_index') == doc_index:
-                                # 获取字符坐标
-                                char_polygons = char_info.get('char_polygons', [])
-                                for polygon in char_polygons:
-                                    if len(polygon) >= 4:
-                                        # 转换PDF坐标到图片坐标
-                                        converted_coords = self._convert_pdf_coords_to_image_coords(
-                                            polygon, pdf_page_height, 2.0
-                                        )
-                                        x0, y0, x1, y1 = converted_coords
-                                        
-                                        # 绘制半透明矩形
-                                        draw.rectangle([x0, y0, x1, y1], fill=color, outline=color[:3], width=2)
-                                        print(f"[DEBUG] 绘制差异标记: {status} PDF坐标{polygon[:4]} -> 图片坐标({x0}, {y0}, {x1}, {y1})")
+                # 该页全部矩形一次性转换为图片坐标（PyMuPDF坐标原点在左上角，无需翻转Y轴）
+                rects, statuses, spans = page_rects.get(page_index, ([], [], []))
+                print(f"[DEBUG] 页面 {page_index} 有 {len(rects)} 个差异矩形")
+                if rects:
+                    line_rects, line_statuses, _ = coalesce_line_rects(rects, statuses, spans)
+                    page_width, page_height = self._page_size(page_sizes, page_index, img, scale_factor)
+                    image_rects = pdf_rects_to_image(line_rects, page_width, page_height, scale_factor)
+                    for rect, status in zip(image_rects.tolist(), line_statuses):
+                        color = colors.get(status, (128, 128, 128, 100))  # 默认灰色
+                        draw.rectangle(rect, fill=color, outline=color[:3], width=2)
                 
                 # 保存处理后的图片
                 processed_path = image_path.replace('.png', '_with_diff.png')
@@ -192,6 +194,12 @@ class ImageProcessor:
         
         return processed_images
 
+    def _page_size(self, page_sizes: Dict[int, Tuple[float, float]], page_index: int, img: Image.Image, scale_factor: float) -> Tuple[float, float]:
+        """页面 (宽, 高)：优先取解析数据中的页面尺寸，缺失时由图片像素尺寸和渲染倍数反推"""
+        if page_sizes and page_index in page_sizes:
+            return page_sizes[page_index]
+        return img.width / scale_factor, img.height / scale_factor
+
     def _extract_page_index_from_path(self, image_path: str) -> int:
         """从图片路径中提取页面索引"""
         try:
@@ -204,49 +212,53 @@ class ImageProcessor:
         except:
             return 0
     
-    async def document_to_images(self, doc_path: str, image_prefix: str) -> List[str]:
+    async def document_to_images(self, doc_path: str, image_prefix: str, render_scale: float = DEFAULT_RENDER_SCALE) -> List[str]:
         """将文档转换为图片"""
         print(f"[DEBUG] 开始转换文档为图片: {doc_path}")
         
         # 检查文件类型
         if doc_path.lower().endswith('.pdf'):
-            return await self.pdf_to_images(doc_path, image_prefix)
+            return await self.pdf_to_images(doc_path, image_prefix, render_scale)
         elif doc_path.lower().endswith(('.docx', '.doc')):
-            return await self.word_to_images(doc_path, image_prefix)
+            return await self.word_to_images(doc_path, image_prefix, render_scale)
         else:
             print(f"[DEBUG] 不支持的文档类型: {doc_path}")
             return await self.create_placeholder_images(image_prefix)
     
-    async def pdf_to_images(self, pdf_path: str, image_prefix: str) -> List[str]:
-        """将PDF转换为图片"""
+    async def pdf_to_images(self, pdf_path: str, image_prefix: str, render_scale: float = DEFAULT_RENDER_SCALE) -> List[str]:
+        """将PDF转换为图片（在线程池中执行，不阻塞事件循环）"""
         try:
             print(f"[DEBUG] 转换PDF为图片: {pdf_path}")
-            doc = fitz.open(pdf_path)
-            image_paths = []
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # 设置缩放比例以提高图片质量
-                mat = fitz.Matrix(2.0, 2.0)  # 2倍缩放
-                pix = page.get_pixmap(matrix=mat)
-                
-                # 生成图片文件名
-                image_filename = f"{image_prefix}_page_{page_num}.png"
-                image_path = os.path.join(self.image_dir, image_filename)
-                
-                # 保存图片
-                pix.save(image_path)
-                image_paths.append(f"/images/{image_filename}")
-                print(f"[DEBUG] 保存PDF页面图片: {image_path}")
-            
-            doc.close()
-            return image_paths
+            return await get_executors().run_in_thread(self._render_pdf_pages, pdf_path, image_prefix, render_scale)
         except Exception as e:
             print(f"PDF转图片失败: {e}")
             return await self.create_placeholder_images(image_prefix)
+
+    def _render_pdf_pages(self, pdf_path: str, image_prefix: str, render_scale: float = DEFAULT_RENDER_SCALE) -> List[str]:
+        """逐页渲染PDF为PNG"""
+        doc = fitz.open(pdf_path)
+        image_paths = []
+        
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            
+            # 设置缩放比例以提高图片质量
+            mat = fitz.Matrix(render_scale, render_scale)
+            pix = page.get_pixmap(matrix=mat)
+            
+            # 生成图片文件名
+            image_filename = f"{image_prefix}_page_{page_num}.png"
+            image_path = os.path.join(self.image_dir, image_filename)
+            
+            # 保存图片
+            pix.save(image_path)
+            image_paths.append(f"/images/{image_filename}")
+            print(f"[DEBUG] 保存PDF页面图片: {image_path}")
+        
+        doc.close()
+        return image_paths
     
-    async def word_to_images(self, word_path: str, image_prefix: str) -> List[str]:
+    async def word_to_images(self, word_path: str, image_prefix: str, render_scale: float = DEFAULT_RENDER_SCALE) -> List[str]:
         """将Word文档转换为图片 - 先转PDF再转图片"""
         try:
             print(f"[DEBUG] 转换Word文档为图片: {word_path}")
@@ -255,7 +267,7 @@ class ImageProcessor:
             pdf_path = await self._convert_word_to_pdf(word_path)
             if pdf_path and os.path.exists(pdf_path):
                 print(f"[DEBUG] Word转PDF成功，开始转图片: {pdf_path}")
-                images = await self.pdf_to_images(pdf_path, image_prefix)
+                images = await self.pdf_to_images(pdf_path, image_prefix, render_scale)
                 # 清理临时PDF文件
                 try:
                     os.remove(pdf_path)
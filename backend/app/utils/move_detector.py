@@ -0,0 +1,205 @@
+import re
+from typing import List, Dict, Tuple
+from app.utils.hierarchical_diff import merge_opcodes
+from app.utils.text_segmenter import TextSegmenter, Span
+
+# 句子指纹归一化：忽略空白差异
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# 句首的条款/项目编号（第3条、3.2、3、（一）、一、），移动后通常会重新编号，不计入指纹
+# 3.5%、1.5倍、100万元 之类的数值不是编号
+LEADING_NUMBER_PATTERN = re.compile(
+    r'^(?:第[一二三四五六七八九十百千零〇两\d]+[条款项章节]'
+    r'|\d{1,3}(?:\.\d{1,3})+(?![\d.%％万元亿倍年月日天个])'
+    r'|\d{1,3}(?:[、)）]|[.．](?!\d))'
+    r'|[（(][一二三四五六七八九十\d]+[)）]'
+    r'|[一二三四五六七八九十]+、)'
+)
+# 句子边界字符（与 TextSegmenter 的句子切分一致）
+SENTENCE_TERMINATORS = set('。！？；!?;\n')
+
+
+def detect_moves(text1: str, text2: str, operations: List[Tuple]) -> List[Tuple]:
+    """移动检测（模块级函数，可在子进程中执行）"""
+    return MoveDetector().detect(text1, text2, operations)
+
+
+class MoveDetector:
+    """移动检测 - 基于句子指纹将"某处删除 + 另一处新增"的相同内容识别为移动"""
+
+    def __init__(self, min_move_chars: int = 12, max_slide: int = 64):
+        # 参与匹配的句子最少字符数（去除空白后），避免短句误判为移动
+        self.min_move_chars = min_move_chars
+        # 删除/新增区间向句子边界滑动的最大距离
+        self.max_slide = max_slide
+        self.segmenter = TextSegmenter()
+
+    def detect(self, text1: str, text2: str, operations: List[Tuple]) -> List[Tuple]:
+        """将非equal操作码中的移动内容拆分为 ('move', i1, i2, j1, j2) 操作
+
+        返回的操作列表按原操作顺序排列，未被移动覆盖的剩余部分保持 delete/insert/replace。
+        """
+        # 字符级对比得到的删除/新增区间可能错开句子边界，先滑动对齐，句子指纹才能命中
+        # 滑动后相邻操作之间的equal区域可能缩为零长度，首尾相接的操作需要重新合并
+        operations = self._merge_touching(self._slide_to_sentence_boundaries(text1, text2, operations))
+
+        deleted_units = self._collect_units(text1, operations, side=0)
+        if not deleted_units:
+            return operations
+
+        # 按指纹索引被删除的句子
+        fingerprint_index: Dict[str, List[int]] = {}
+        for unit_index, (_, _, _, fingerprint) in enumerate(deleted_units):
+            fingerprint_index.setdefault(fingerprint, []).append(unit_index)
+
+        # 新增句子与被删除句子按指纹配对（不与同一操作内的句子配对）
+        pairs = []
+        used = set()
+        for op_index, start, end, fingerprint in self._collect_units(text2, operations, side=1):
+            for unit_index in fingerprint_index.get(fingerprint, []):
+                if unit_index in used or deleted_units[unit_index][0] == op_index:
+                    continue
+                used.add(unit_index)
+                deleted_op, old_start, old_end, _ = deleted_units[unit_index]
+                pairs.append([deleted_op, old_start, old_end, op_index, start, end])
+                break
+
+        if not pairs:
+            return operations
+
+        moves = self._merge_pairs(pairs, text1, text2)
+        print(f"[DEBUG] 移动检测: 匹配 {len(pairs)} 个句子, 合并为 {len(moves)} 个移动块")
+        return self._merge_touching(self._split_operations(operations, moves))
+
+    def _merge_touching(self, operations: List[Tuple]) -> List[Tuple]:
+        """合并两侧都首尾相接的相邻非move操作（操作列表不含equal，相接即中间没有未改动内容）"""
+        result = []
+        for operation in operations:
+            if (result and operation[0] != 'move' and result[-1][0] != 'move'
+                    and result[-1][2] == operation[1] and result[-1][4] == operation[3]):
+                result[-1] = merge_opcodes([result[-1], operation])[0]
+            else:
+                result.append(operation)
+        return result
+
+    def _slide_to_sentence_boundaries(self, text1: str, text2: str, operations: List[Tuple]) -> List[Tuple]:
+        """在不改变对比结果的前提下，将纯删除/纯新增区间滑动到句子边界"""
+        result = []
+        for index, (tag, i1, i2, j1, j2) in enumerate(operations):
+            if tag not in ('delete', 'insert'):
+                result.append((tag, i1, i2, j1, j2))
+                continue
+
+            # 相邻操作之间都是equal区域，滑动不能越过它们
+            prev_i, prev_j = (result[-1][2], result[-1][4]) if result else (0, 0)
+            if index + 1 < len(operations):
+                next_i, next_j = operations[index + 1][1], operations[index + 1][3]
+            else:
+                next_i, next_j = len(text1), len(text2)
+
+            text, start, end = (text1, i1, i2) if tag == 'delete' else (text2, j1, j2)
+            left_limit = min(i1 - prev_i, j1 - prev_j, self.max_slide)
+            right_limit = min(next_i - i2 if tag == 'delete' else next_i - i1,
+                              next_j - j1 if tag == 'delete' else next_j - j2,
+                              self.max_slide)
+
+            best_shift = 0
+            best_score = self._boundary_score(text, start, end)
+            shift = 0
+            while shift < left_limit and text[start - shift - 1] == text[end - shift - 1]:
+                shift += 1
+                score = self._boundary_score(text, start - shift, end - shift)
+                if score > best_score:
+                    best_shift, best_score = -shift, score
+            shift = 0
+            while shift < right_limit and end + shift < len(text) and text[start + shift] == text[end + shift]:
+                shift += 1
+                score = self._boundary_score(text, start + shift, end + shift)
+                if score > best_score:
+                    best_shift, best_score = shift, score
+
+            result.append((tag, i1 + best_shift, i2 + best_shift, j1 + best_shift, j2 + best_shift))
+        return result
+
+    def _boundary_score(self, text: str, start: int, end: int) -> int:
+        """区间首尾落在句子边界上的得分"""
+        score = 0
+        if start == 0 or text[start - 1] in SENTENCE_TERMINATORS:
+            score += 1
+        if end == len(text) or text[end - 1] in SENTENCE_TERMINATORS:
+            score += 1
+        return score
+
+    def _collect_units(self, text: str, operations: List[Tuple], side: int) -> List[Tuple[int, int, int, str]]:
+        """收集操作码中删除侧(side=0)或新增侧(side=1)的句子: (op_index, start, end, fingerprint)"""
+        units = []
+        for op_index, (tag, i1, i2, j1, j2) in enumerate(operations):
+            start, end = (i1, i2) if side == 0 else (j1, j2)
+            if end - start < self.min_move_chars:
+                continue
+            for unit_start, unit_end in self.segmenter.split_sentences(text, start, end):
+                fingerprint = LEADING_NUMBER_PATTERN.sub('', WHITESPACE_PATTERN.sub('', text[unit_start:unit_end]), count=1)
+                if len(fingerprint) >= self.min_move_chars:
+                    units.append((op_index, unit_start, unit_end, fingerprint))
+        return units
+
+    def _merge_pairs(self, pairs: List[List], text1: str, text2: str) -> List[List]:
+        """合并两侧都相邻（只隔空白）的句子配对，得到移动块"""
+        pairs.sort(key=lambda pair: (pair[0], pair[1]))
+        moves = []
+        for pair in pairs:
+            if moves:
+                last = moves[-1]
+                if (last[0] == pair[0] and last[3] == pair[3]
+                        and not text1[last[2]:pair[1]].strip()
+                        and not text2[last[5]:pair[4]].strip()
+                        and last[5] <= pair[4]):
+                    last[2] = pair[2]
+                    last[5] = pair[5]
+                    continue
+            moves.append(list(pair))
+        return moves
+
+    def _split_operations(self, operations: List[Tuple], moves: List[List]) -> List[Tuple]:
+        """从原操作中扣除移动区间，生成新的操作列表"""
+        old_moved: Dict[int, List[Span]] = {}
+        new_moved: Dict[int, List[Span]] = {}
+        moves_by_op: Dict[int, List[List]] = {}
+        for deleted_op, old_start, old_end, inserted_op, new_start, new_end in moves:
+            old_moved.setdefault(deleted_op, []).append((old_start, old_end))
+            new_moved.setdefault(inserted_op, []).append((new_start, new_end))
+            moves_by_op.setdefault(deleted_op, []).append(('move', old_start, old_end, new_start, new_end))
+
+        result = []
+        for op_index, (tag, i1, i2, j1, j2) in enumerate(operations):
+            if op_index not in old_moved and op_index not in new_moved:
+                result.append((tag, i1, i2, j1, j2))
+                continue
+
+            old_pieces = self._subtract(i1, i2, old_moved.get(op_index, []))
+            new_pieces = self._subtract(j1, j2, new_moved.get(op_index, []))
+
+            items = list(moves_by_op.get(op_index, []))
+            if tag == 'replace' and len(old_pieces) == 1 and len(new_pieces) == 1:
+                items.append(('replace', old_pieces[0][0], old_pieces[0][1], new_pieces[0][0], new_pieces[0][1]))
+            else:
+                for start, end in old_pieces:
+                    items.append(('delete', start, end, j1, j1))
+                for start, end in new_pieces:
+                    items.append(('insert', i1, i1, start, end))
+
+            # 操作内按出现位置排序（新增片段按其在目标文档中的位置）
+            items.sort(key=lambda item: (item[1] if item[0] != 'insert' else i2, item[3]))
+            result.extend(items)
+        return result
+
+    def _subtract(self, start: int, end: int, removed: List[Span]) -> List[Span]:
+        """从区间 [start, end) 中扣除若干子区间，返回剩余片段"""
+        pieces = []
+        cursor = start
+        for removed_start, removed_end in sorted(removed):
+            if removed_start > cursor:
+                pieces.append((cursor, removed_start))
+            cursor = max(cursor, removed_end)
+        if cursor < end:
+            pieces.append((cursor, end))
+        return pieces
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from app.utils.clause_aligner import ClauseAlignedDiff
+from app.utils.coordinate_mapper import get_page_offsets
+from app.utils.diff_algorithms import Opcode, create_diff_algorithm
+from app.utils.hierarchical_diff import HierarchicalDiff, BudgetedDiff, CoarseSection, merge_opcodes
+from app.utils.text_normalizer import OffsetMap
+from app.utils.text_segmenter import TextSegmenter
+from app.utils.token_diff import TokenDiff
+
+# 对比区段: (a_start, a_end, b_start, b_end)
+Section = Tuple[int, int, int, int]
+
+
+def compute_opcodes(text1: str, text2: str, algorithm: str = "auto", granularity: str = "char") -> List[Opcode]:
+    """计算两段文本的字符级操作码（模块级函数，可在子进程中执行）"""
+    return compute_opcodes_within_budget(text1, text2, algorithm, granularity)[0]
+
+
+def compute_opcodes_within_budget(text1: str, text2: str, algorithm: str = "auto", granularity: str = "char", time_budget: float = None, memory_budget: int = None) -> Tuple[List[Opcode], List[CoarseSection]]:
+    """带预算计算操作码，返回 (操作码, 超出预算而降级对比的区段)（模块级函数，可在子进程中执行）
+
+    char 粒度时整段文本作为一个区段；hierarchical 粒度时每个进入字符级对比的变化区域各自计算预算；
+    clause 粒度时每对对齐的条款各自计算预算；token 粒度与 char 相同，但在词元序列上对比。
+    """
+    if granularity == "hierarchical":
+        differ = HierarchicalDiff(algorithm, time_budget, memory_budget)
+        return differ.get_opcodes(text1, text2), differ.coarse_sections
+    if granularity == "clause":
+        differ = ClauseAlignedDiff(algorithm, time_budget, memory_budget)
+        return differ.get_opcodes(text1, text2), differ.coarse_sections
+    if granularity == "token":
+        differ = TokenDiff(algorithm, time_budget, memory_budget)
+    elif granularity == "char":
+        differ = BudgetedDiff(algorithm, time_budget, memory_budget)
+    else:
+        raise ValueError(f"未知的对比粒度: {granularity}")
+    return differ.get_opcodes(text1, text2, 0, len(text1), 0, len(text2)), differ.coarse_sections
+
+
+class ParallelDiffRunner:
+    """按页对齐切分文档，在进程池中并行对比各区段，再拼接为全局操作码"""
+
+    def __init__(self, algorithm: str = "auto", granularity: str = "char", max_workers: int = None, executor: Executor = None, time_budget: float = None, memory_budget: int = None):
+        self.algorithm = algorithm
+        self.granularity = granularity
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # 共享的进程池（None 表示每次对比临时创建进程池）
+        self.executor = executor
+        # 每个区段的时间（秒）/内存（字节）预算
+        self.time_budget = time_budget
+        self.memory_budget = memory_budget
+        self.segmenter = TextSegmenter()
+        # 最近一次对比中超出预算而降级对比的区段（全局偏移）
+        self.coarse_sections: List[CoarseSection] = []
+
+    def split_sections(self, text1: str, text2: str, standard_data: Dict, offset_map: Optional[OffsetMap] = None, target_size: int = None) -> List[Section]:
+        """在标准文档的页边界附近、两侧内容一致的位置切分，得到可独立对比的区段
+
+        text1 为归一化文本时传入其 offset_map：页边界是原文偏移，先换算到归一化文本再切分。
+        target_size 为区段的最小字符数（两侧之和），默认按进程数均分；传 1 时在每个可切分的页边界切分。
+        """
+        page_offsets = get_page_offsets(standard_data)
+        if not page_offsets or len(page_offsets) < 2:
+            return [(0, len(text1), 0, len(text2))]
+        if offset_map is not None:
+            page_offsets = [offset_map.to_normalized(page_offset) for page_offset in page_offsets]
+
+        equal_runs = self._align_sentences(text1, text2)
+        run_starts = [run[0] for run in equal_runs]
+
+        # 每个区段的目标大小：让每个进程分到若干个区段，平衡负载
+        if target_size is None:
+            target_size = max(1, (len(text1) + len(text2)) // (self.max_workers * 4))
+
+        sections = []
+        last_a, last_b = 0, 0
+        for page_offset in page_offsets[1:]:
+            cut = self._find_cut(page_offset, equal_runs, run_starts)
+            if cut is None:
+                continue
+            cut_a, cut_b = cut
+            if cut_a <= last_a or cut_b <= last_b:
+                continue
+            if (cut_a - last_a) + (cut_b - last_b) < target_size:
+                continue
+            sections.append((last_a, cut_a, last_b, cut_b))
+            last_a, last_b = cut_a, cut_b
+        sections.append((last_a, len(text1), last_b, len(text2)))
+        return sections
+
+    def _align_sentences(self, text1: str, text2: str) -> List[Section]:
+        """句子级哈希对齐，返回两侧内容相同的区间"""
+        units1 = self.segmenter.split_sentences(text1)
+        units2 = self.segmenter.split_sentences(text2)
+        unit_ids: Dict[str, int] = {}
+        ids1 = [unit_ids.setdefault(text1[s:e], len(unit_ids)) for s, e in units1]
+        ids2 = [unit_ids.setdefault(text2[s:e], len(unit_ids)) for s, e in units2]
+
+        equal_runs = []
+        for tag, i1, i2, j1, j2 in create_diff_algorithm("patience").get_opcodes(ids1, ids2):
+            if tag == 'equal':
+                equal_runs.append((units1[i1][0], units1[i2 - 1][1], units2[j1][0], units2[j2 - 1][1]))
+        return equal_runs
+
+    def _find_cut(self, offset: int, equal_runs: List[Section], run_starts: List[int]) -> Optional[Tuple[int, int]]:
+        """找到不早于 offset 的、落在相同内容区间内的切分点 (cut_a, cut_b)"""
+        index = bisect_left(run_starts, offset)
+        # offset 落在前一个相同区间内部
+        if index > 0:
+            a_start, a_end, b_start, _ = equal_runs[index - 1]
+            if a_start <= offset <= a_end:
+                return offset, b_start + (offset - a_start)
+        # 否则顺延到下一个相同区间的起点
+        if index < len(equal_runs):
+            return equal_runs[index][0], equal_runs[index][2]
+        return None
+
+    async def _run_jobs(self, executor: Optional[Executor], text1: str, text2: str, jobs: List[Section]) -> Dict[Section, Tuple[List[Opcode], List[CoarseSection]]]:
+        """将各区段提交到执行器并发对比（executor 为 None 时使用事件循环的默认线程池）"""
+        loop = asyncio.get_running_loop()
+        futures = [
+            loop.run_in_executor(
+                executor, compute_opcodes_within_budget,
+                text1[a_start:a_end], text2[b_start:b_end],
+                self.algorithm, self.granularity, self.time_budget, self.memory_budget
+            )
+            for a_start, a_end, b_start, b_end in jobs
+        ]
+        return dict(zip(jobs, await asyncio.gather(*futures)))
+
+    async def iter_section_opcodes(self, text1: str, text2: str, standard_data: Dict, offset_map: Optional[OffsetMap] = None) -> AsyncIterator[Tuple[List[Opcode], List[CoarseSection]]]:
+        """按页切分后并发对比各区段，按文档顺序逐段产出 (操作码, 降级区段)（全局偏移），供流式对比使用
+
+        有变化的区段一次性提交到执行器（None 表示默认线程池），前面的区段算完即产出，不等待全文对比完成。
+        """
+        sections = self.split_sections(text1, text2, standard_data, offset_map, target_size=1)
+        loop = asyncio.get_running_loop()
+        futures = {
+            section: loop.run_in_executor(
+                self.executor, compute_opcodes_within_budget,
+                text1[section[0]:section[1]], text2[section[2]:section[3]],
+                self.algorithm, self.granularity, self.time_budget, self.memory_budget
+            )
+            for section in sections
+            if text1[section[0]:section[1]] != text2[section[2]:section[3]]
+        }
+        print(f"[DEBUG] 流式对比: {len(sections)}个区段, 其中{len(futures)}个有变化")
+        try:
+            for section in sections:
+                a_start, a_end, b_start, b_end = section
+                if section in futures:
+                    section_opcodes, section_coarse = await futures[section]
+                else:
+                    section_opcodes, section_coarse = [('equal', 0, a_end - a_start, 0, b_end - b_start)], []
+                yield (
+                    merge_opcodes([(tag, a_start + i1, a_start + i2, b_start + j1, b_start + j2) for tag, i1, i2, j1, j2 in section_opcodes]),
+                    [(a_start + i1, a_start + i2, b_start + j1, b_start + j2, level) for i1, i2, j1, j2, level in section_coarse]
+                )
+        finally:
+            # 调用方提前结束（如客户端断开）时取消尚未开始的区段
+            for future in futures.values():
+                future.cancel()
+
+    async def get_opcodes(self, text1: str, text2: str, standard_data: Dict, offset_map: Optional[OffsetMap] = None) -> List[Opcode]:
+        """并行计算全文操作码（text1 为归一化文本时传入标准文档的 offset_map）"""
+        start_time = time.time()
+        sections = self.split_sections(text1, text2, standard_data, offset_map)
+
+        # 内容完全相同的区段无需送入进程池
+        jobs = [section for section in sections if text1[section[0]:section[1]] != text2[section[2]:section[3]]]
+        print(f"[DEBUG] 并行对比: {len(sections)}个区段, 其中{len(jobs)}个有变化, 进程数: {self.max_workers}")
+
+        results: Dict[Section, Tuple[List[Opcode], List[CoarseSection]]] = {}
+        try:
+            if jobs and self.executor is not None:
+                results = await self._run_jobs(self.executor, text1, text2, jobs)
+            elif len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as pool:
+                    results = await self._run_jobs(pool, text1, text2, jobs)
+        except Exception as e:
+            print(f"[DEBUG] 进程池对比失败，回退到默认线程池: {e}")
+            results = {}
+        # 只有一个区段有变化（未配置执行器时）或进程池失败时，在默认线程池中计算，不在事件循环上执行
+        pending = [job for job in jobs if job not in results]
+        if pending:
+            results.update(await self._run_jobs(None, text1, text2, pending))
+
+        # 拼接各区段结果，转换为全局偏移
+        opcodes = []
+        self.coarse_sections = []
+        for section in sections:
+            a_start, a_end, b_start, b_end = section
+            section_coarse = []
+            if section in results:
+                section_opcodes, section_coarse = results[section]
+            else:
+                section_opcodes = [('equal', 0, a_end - a_start, 0, b_end - b_start)]
+            for tag, i1, i2, j1, j2 in section_opcodes:
+                opcodes.append((tag, a_start + i1, a_start + i2, b_start + j1, b_start + j2))
+            for i1, i2, j1, j2, level in section_coarse:
+                self.coarse_sections.append((a_start + i1, a_start + i2, b_start + j1, b_start + j2, level))
+
+        print(f"[DEBUG] 并行对比完成, 耗时: {time.time() - start_time:.3f}秒")
+        return merge_opcodes(opcodes)
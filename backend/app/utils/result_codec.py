@@ -0,0 +1,258 @@
+import base64
+import json
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # 未安装 zstandard 时使用 zlib 压缩
+    zstandard = None
+
+# 存储格式标识，写入 result_json["result_format"]
+RESULT_FORMAT = "columnar-v1"
+
+# 高亮项的标准字段（DiffEngine._build_highlight_groups 的输出）；其余形状的高亮项原样保存
+CANONICAL_ENTRY_KEYS = {"text", "page_index", "line_index", "doc_index", "char_polygons", "polygon", "sub_info", "sub_type"}
+EMPTY_POLYGON = [0, 0, 0, 0, 0, 0, 0, 0]
+
+# 列名 -> array 类型码：每组高亮项数、每项的起始字符索引/长度/页号/行号/文档序号、float32矩形(每项4个)
+COLUMNS = {
+    "group_sizes": "I",
+    "starts": "i",
+    "lengths": "i",
+    "pages": "i",
+    "lines": "i",
+    "doc_indexes": "b",
+    "rects": "f",
+}
+
+
+def _is_canonical_entry(entry: Dict) -> bool:
+    """高亮项能否无损拆分为列（文本、起始索引、长度、页号、行号、文档序号、单个矩形）"""
+    try:
+        if entry.keys() != CANONICAL_ENTRY_KEYS or entry["polygon"] != EMPTY_POLYGON or entry["sub_type"] != "":
+            return False
+        polygons = entry["char_polygons"]
+        sub_info = entry["sub_info"]
+        if len(polygons) != 1 or len(polygons[0]) != 4 or len(sub_info) != 1:
+            return False
+        sub = sub_info[0]
+        text_index = sub["sub_text_index"]
+        return (sub.keys() == {"page_id", "sub_polygons", "sub_text_index"}
+                and text_index.keys() == {"start_index", "length"}
+                and sub["page_id"] == entry["page_index"]
+                and sub["sub_polygons"] == polygons[0]
+                and len(entry["text"]) == text_index["length"]
+                and entry["doc_index"] in (1, 2)
+                and all(isinstance(entry[key], int) for key in ("page_index", "line_index")))
+    except (AttributeError, KeyError, TypeError):
+        return False
+
+
+def encode_result(result: Dict) -> Dict:
+    """将对比结果编码为列式压缩格式
+
+    差异项的标量字段（文本、状态、页号等）保留为JSON；体积最大的高亮分组拆成并行数组
+    （起始索引、长度、页号、行号、文档序号、float32矩形），整体以zstd（或zlib）压缩后base64存入JSON列。
+    其余顶层字段（summary、ai_review_enabled等）保持原样，无需解压即可读取。
+    """
+    diff_list = result.get("diff_list", [])
+    columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+    items = []
+    texts = []
+    irregular = {}
+    entry_count = 0
+
+    for diff_item in diff_list:
+        groups = diff_item.get("diff") or []
+        item = {key: value for key, value in diff_item.items() if key != "diff"}
+        item["_groups"] = len(groups) if "diff" in diff_item else None
+        items.append(item)
+        for group in groups:
+            columns["group_sizes"].append(len(group))
+            for entry in group:
+                if _is_canonical_entry(entry):
+                    text_index = entry["sub_info"][0]["sub_text_index"]
+                    texts.append(entry["text"])
+                    columns["starts"].append(text_index["start_index"])
+                    columns["lengths"].append(text_index["length"])
+                    columns["pages"].append(entry["page_index"])
+                    columns["lines"].append(entry["line_index"])
+                    columns["doc_indexes"].append(entry["doc_index"])
+                    columns["rects"].extend(entry["char_polygons"][0])
+                else:
+                    # 非标准形状（如逐字符映射项、示例差异）原样保存，列中占位
+                    irregular[str(entry_count)] = entry
+                    columns["starts"].append(0)
+                    columns["lengths"].append(0)
+                    columns["pages"].append(0)
+                    columns["lines"].append(0)
+                    columns["doc_indexes"].append(0)
+                    columns["rects"].extend((0.0, 0.0, 0.0, 0.0))
+                entry_count += 1
+
+    header = {"items": items, "texts": "".join(texts), "irregular": irregular, "columns": {}}
+    binary = []
+    for name, column in columns.items():
+        if sys.byteorder == "big":
+            column.byteswap()
+        header["columns"][name] = len(column)
+        binary.append(column.tobytes())
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    raw = struct.pack("<I", len(header_bytes)) + header_bytes + b"".join(binary)
+    if zstandard is not None:
+        codec, payload = "zstd", zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        codec, payload = "zlib", zlib.compress(raw, 6)
+    print(f"[DEBUG] 对比结果编码({codec}): {len(diff_list)}个差异, {entry_count}个高亮项, {len(raw)}->{len(payload)}字节")
+
+    encoded = {key: value for key, value in result.items() if key != "diff_list"}
+    encoded.update({
+        "result_format": RESULT_FORMAT,
+        "codec": codec,
+        "diff_count": len(diff_list),
+        "payload": base64.b64encode(payload).decode("ascii")
+    })
+    return encoded
+
+
+def is_encoded(result_json: Optional[Dict]) -> bool:
+    return bool(result_json) and result_json.get("result_format") == RESULT_FORMAT
+
+
+class ColumnarResult:
+    """列式对比结果 - 解压后按需展开单个差异项，只有需要旧格式时才构建完整的嵌套结构"""
+
+    def __init__(self, result_json: Dict):
+        payload = base64.b64decode(result_json["payload"])
+        if result_json["codec"] == "zstd":
+            if zstandard is None:
+                raise RuntimeError("对比结果使用zstd压缩，但未安装zstandard")
+            raw = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            raw = zlib.decompress(payload)
+
+        header_length = struct.unpack_from("<I", raw)[0]
+        header = json.loads(raw[4:4 + header_length].decode("utf-8"))
+        self.items: List[Dict] = header["items"]
+        self.texts: str = header["texts"]
+        self.irregular: Dict[str, Dict] = header["irregular"]
+
+        self.columns: Dict[str, array] = {}
+        offset = 4 + header_length
+        for name, typecode in COLUMNS.items():
+            column = array(typecode)
+            size = header["columns"][name] * column.itemsize
+            column.frombytes(raw[offset:offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            self.columns[name] = column
+            offset += size
+
+        # 每个差异项的第一个分组、每个分组的第一个高亮项、每个高亮项在 texts 中的起点
+        self._item_group_starts = self._prefix_sums([item["_groups"] or 0 for item in self.items])
+        self._group_entry_starts = self._prefix_sums(self.columns["group_sizes"])
+        self._entry_text_starts = self._prefix_sums(self.columns["lengths"])
+
+    @staticmethod
+    def _prefix_sums(sizes) -> List[int]:
+        sums = [0]
+        for size in sizes:
+            sums.append(sums[-1] + size)
+        return sums
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def item(self, index: int) -> Dict:
+        """展开第 index 个差异项为旧格式"""
+        diff_item = {key: value for key, value in self.items[index].items() if key != "_groups"}
+        if self.items[index]["_groups"] is None:
+            return diff_item
+
+        group_sizes = self.columns["group_sizes"]
+        groups = []
+        for group_index in range(self._item_group_starts[index], self._item_group_starts[index + 1]):
+            entry_start = self._group_entry_starts[group_index]
+            groups.append([self._entry(entry_index) for entry_index in range(entry_start, entry_start + group_sizes[group_index])])
+        diff_item["diff"] = groups
+        return diff_item
+
+    def _entry(self, entry_index: int) -> Dict:
+        irregular = self.irregular.get(str(entry_index))
+        if irregular is not None:
+            return irregular
+        columns = self.columns
+        text_start = self._entry_text_starts[entry_index]
+        length = columns["lengths"][entry_index]
+        page_index = columns["pages"][entry_index]
+        # float32 存储，展开时保留两位小数
+        rect = [round(value, 2) for value in columns["rects"][4 * entry_index:4 * entry_index + 4]]
+        return {
+            "text": self.texts[text_start:text_start + length],
+            "page_index": page_index,
+            "line_index": columns["lines"][entry_index],
+            "doc_index": columns["doc_indexes"][entry_index],
+            "char_polygons": [rect],
+            "polygon": list(EMPTY_POLYGON),
+            "sub_info": [{
+                "page_id": page_index,
+                "sub_polygons": list(rect),
+                "sub_text_index": {"start_index": columns["starts"][entry_index], "length": length}
+            }],
+            "sub_type": ""
+        }
+
+    def iter_items(self) -> Iterator[Dict]:
+        for index in range(len(self.items)):
+            yield self.item(index)
+
+    def to_diff_list(self) -> List[Dict]:
+        return list(self.iter_items())
+
+    def to_columns(self) -> Dict:
+        """列式结构（不展开嵌套高亮项），供能直接处理并行数组的调用方使用"""
+        return {
+            "items": [{key: value for key, value in item.items() if key != "_groups"} for item in self.items],
+            "item_group_counts": [item["_groups"] or 0 for item in self.items],
+            "group_sizes": self.columns["group_sizes"].tolist(),
+            "texts": self.texts,
+            "starts": self.columns["starts"].tolist(),
+            "lengths": self.columns["lengths"].tolist(),
+            "pages": self.columns["pages"].tolist(),
+            "lines": self.columns["lines"].tolist(),
+            "doc_indexes": self.columns["doc_indexes"].tolist(),
+            "rects": [round(value, 2) for value in self.columns["rects"]],
+            "irregular": self.irregular
+        }
+
+
+def get_diff_list(result_json: Optional[Dict]) -> List[Dict]:
+    """读取差异列表（旧格式）；兼容未编码的历史结果"""
+    if not result_json:
+        return []
+    if is_encoded(result_json):
+        return ColumnarResult(result_json).to_diff_list()
+    return result_json.get("diff_list", [])
+
+
+def decode_result(result_json: Optional[Dict]) -> Optional[Dict]:
+    """还原为旧格式的对比结果（含 diff_list，去掉编码字段）；未编码的历史结果原样返回"""
+    if not is_encoded(result_json):
+        return result_json
+    decoded = {key: value for key, value in result_json.items() if key not in ("result_format", "codec", "diff_count", "payload")}
+    decoded["diff_list"] = ColumnarResult(result_json).to_diff_list()
+    return decoded
+
+
+def get_diff_count(result_json: Optional[Dict]) -> int:
+    """差异数量，无需解压"""
+    if not result_json:
+        return 0
+    if is_encoded(result_json):
+        return result_json["diff_count"]
+    return len(result_json.get("diff_list", []))
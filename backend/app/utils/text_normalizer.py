@@ -0,0 +1,95 @@
+import re
+from bisect import bisect_right
+from typing import List, Tuple
+
+# 中日韩字符及全角标点
+CJK_CLASS = r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]'
+
+# 删除类规则：匹配到的字符从文本中删除
+DELETE_RULES = {
+    # 中文字符之间的空白（PDF提取时常见的字间空格、换行）
+    "cjk_spaces": rf'(?<={CJK_CLASS})\s+(?={CJK_CLASS})',
+    # 软连字符（PDF中的断词提示，不显示）；解析器按 span 直接拼接全文、不插入换行，行尾"-\n"断词无从识别
+    "hyphenation": r'\u00ad',
+}
+
+# 替换类规则：一对一字符替换，不改变文本长度
+TRANSLATE_RULES = {
+    # 全角ASCII字符（含全角标点）及全角空格 -> 半角
+    "fullwidth": {**{code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}, 0x3000: 0x20},
+}
+
+
+class OffsetMap:
+    """归一化文本偏移 -> 原文偏移的映射
+
+    只记录发生删除的位置：norm_starts[k] 及之后的归一化偏移需加上 shifts[k]。
+    """
+
+    def __init__(self, norm_starts: List[int] = None, shifts: List[int] = None):
+        self.norm_starts = norm_starts or [0]
+        self.shifts = shifts or [0]
+        # 每段未删除文本在原文中的起点
+        self.original_starts = [start + shift for start, shift in zip(self.norm_starts, self.shifts)]
+
+    def to_original(self, index: int) -> int:
+        """将归一化文本中的位置（字符边界）映射到原文；紧邻的被删除字符归入该位置之前"""
+        return index + self.shifts[bisect_right(self.norm_starts, index) - 1]
+
+    def to_normalized(self, index: int) -> int:
+        """将原文中的位置映射到归一化文本；落在被删除字符内部的位置归到删除处"""
+        segment = bisect_right(self.original_starts, index) - 1
+        normalized = index - self.shifts[segment]
+        if segment + 1 < len(self.norm_starts):
+            normalized = min(normalized, self.norm_starts[segment + 1])
+        return normalized
+
+
+class TextNormalizer:
+    """文本归一化 - 对比前消除全角/半角、字间空格、断词连字符等噪声差异，并保留回原文的偏移映射"""
+
+    def __init__(self, rules: Tuple[str, ...] = ()):
+        unknown_rules = [rule for rule in rules if rule not in DELETE_RULES and rule not in TRANSLATE_RULES]
+        if unknown_rules:
+            raise ValueError(f"未知的归一化规则: {', '.join(unknown_rules)}")
+        self.rules = tuple(rules)
+
+        delete_patterns = [f"(?:{DELETE_RULES[rule]})" for rule in self.rules if rule in DELETE_RULES]
+        self.delete_pattern = re.compile("|".join(delete_patterns)) if delete_patterns else None
+
+        self.translate_table = {}
+        for rule in self.rules:
+            if rule in TRANSLATE_RULES:
+                self.translate_table.update(TRANSLATE_RULES[rule])
+
+    def normalize(self, text: str) -> Tuple[str, OffsetMap]:
+        """返回归一化文本及其到原文的偏移映射"""
+        norm_starts = [0]
+        shifts = [0]
+        if self.delete_pattern is not None:
+            pieces = []
+            cursor = 0
+            deleted = 0
+            # 先做删除（按匹配区间整体拼接，不逐字符处理）
+            for match in self.delete_pattern.finditer(text):
+                start, end = match.span()
+                if start == end:
+                    continue
+                pieces.append(text[cursor:start])
+                norm_starts.append(start - deleted)
+                deleted += end - start
+                shifts.append(deleted)
+                cursor = end
+            if cursor:
+                pieces.append(text[cursor:])
+                text = "".join(pieces)
+
+        # 再做一对一替换，不影响偏移
+        if self.translate_table:
+            text = text.translate(self.translate_table)
+        return text, OffsetMap(norm_starts, shifts)
+
+    @staticmethod
+    def parse_rules(rules: str) -> Tuple[str, ...]:
+        """解析逗号分隔的规则配置，如 "fullwidth,cjk_spaces" """
+        return tuple(rule.strip() for rule in rules.split(",") if rule.strip())
@@ -0,0 +1,26 @@
+import re
+from typing import List, Tuple
+
+# 文本区间格式: (start, end)，左闭右开，基于 full_text 的字符偏移
+Span = Tuple[int, int]
+
+# 段落以换行符结束；句子以中英文句末标点或换行结束（标点归属前一句）
+PARAGRAPH_PATTERN = re.compile(r'[^\n]*\n|[^\n]+$')
+SENTENCE_PATTERN = re.compile(r'[^。！？；!?;\n]*[。！？；!?;\n]+|[^。！？；!?;\n]+$')
+
+
+class TextSegmenter:
+    """文本切分器 - 将文本切分为首尾相接、覆盖全文的段落/句子区间"""
+
+    def split_paragraphs(self, text: str, start: int = 0, end: int = None) -> List[Span]:
+        """按换行切分段落"""
+        return self._split(PARAGRAPH_PATTERN, text, start, end)
+
+    def split_sentences(self, text: str, start: int = 0, end: int = None) -> List[Span]:
+        """按句末标点切分句子"""
+        return self._split(SENTENCE_PATTERN, text, start, end)
+
+    def _split(self, pattern: re.Pattern, text: str, start: int, end: int) -> List[Span]:
+        if end is None:
+            end = len(text)
+        return [(match.start(), match.end()) for match in pattern.finditer(text, start, end) if match.end() > match.start()]
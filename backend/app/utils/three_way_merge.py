@@ -0,0 +1,68 @@
+from bisect import bisect_right
+from typing import List, Tuple
+
+# 三方对比的变更来源
+ORIGIN_STANDARD = "standard"  # 仅标准文档（我方）相对基准版本有修改
+ORIGIN_TARGET = "target"      # 仅目标文档（对方）相对基准版本有修改
+ORIGIN_BOTH = "both"          # 双方做了相同的修改
+ORIGIN_CONFLICT = "conflict"  # 双方对同一处做了不同的修改
+
+# 三方变更区域: (origin, base_start, base_end, standard_start, standard_end, target_start, target_end)
+MergeRegion = Tuple[str, int, int, int, int, int, int]
+
+
+class ThreeWayMerger:
+    """三方合并 - 基于 基准↔标准、基准↔目标 两组对齐结果划分变更区域并判断来源/冲突"""
+
+    def merge(self, base_text: str, standard_text: str, target_text: str, standard_opcodes: List[Tuple], target_opcodes: List[Tuple]) -> List[MergeRegion]:
+        """返回按基准文本顺序排列的变更区域"""
+        # 两侧的变更块（基准文本上的区间），按起点排序后一次扫描合并
+        hunks = []
+        for side, opcodes in ((0, standard_opcodes), (1, target_opcodes)):
+            for tag, i1, i2, j1, j2 in opcodes:
+                if tag != 'equal':
+                    hunks.append((i1, i2, side))
+        hunks.sort()
+
+        # 重叠或相接的变更块归入同一区域，保证区域之间至少隔着一个两侧都未改动的字符
+        groups = []
+        for base_start, base_end, side in hunks:
+            if groups and base_start <= groups[-1][1]:
+                groups[-1][1] = max(groups[-1][1], base_end)
+                groups[-1][2].add(side)
+            else:
+                groups.append([base_start, base_end, {side}])
+
+        standard_starts = [op[1] for op in standard_opcodes]
+        target_starts = [op[1] for op in target_opcodes]
+        regions = []
+        for base_start, base_end, sides in groups:
+            standard_start = self._map_start(base_start, standard_opcodes, standard_starts)
+            standard_end = self._map_end(base_end, len(base_text), len(standard_text), standard_opcodes, standard_starts)
+            target_start = self._map_start(base_start, target_opcodes, target_starts)
+            target_end = self._map_end(base_end, len(base_text), len(target_text), target_opcodes, target_starts)
+
+            if sides == {0}:
+                origin = ORIGIN_STANDARD
+            elif sides == {1}:
+                origin = ORIGIN_TARGET
+            elif standard_text[standard_start:standard_end] == target_text[target_start:target_end]:
+                origin = ORIGIN_BOTH
+            else:
+                origin = ORIGIN_CONFLICT
+            regions.append((origin, base_start, base_end, standard_start, standard_end, target_start, target_end))
+        return regions
+
+    def _map_start(self, position: int, opcodes: List[Tuple], starts: List[int]) -> int:
+        """区域起点：前一个字符位于equal操作内，按其线性偏移映射"""
+        if position == 0:
+            return 0
+        _, i1, _, j1, j2 = opcodes[bisect_right(starts, position - 1) - 1]
+        return min(j1 + (position - i1), j2)
+
+    def _map_end(self, position: int, base_length: int, other_length: int, opcodes: List[Tuple], starts: List[int]) -> int:
+        """区域终点：当前字符位于equal操作内，按其线性偏移映射"""
+        if position >= base_length:
+            return other_length
+        _, i1, _, j1, j2 = opcodes[bisect_right(starts, position) - 1]
+        return min(j1 + (position - i1), j2)
@@ -0,0 +1,103 @@
+import re
+from typing import List, Dict
+from app.utils.diff_algorithms import Opcode, DiffBudget, create_diff_algorithm
+from app.utils.hierarchical_diff import BudgetedDiff, merge_opcodes
+from app.utils.text_segmenter import Span
+
+try:
+    import jieba
+    jieba.setLogLevel(60)  # 关闭词典加载日志
+except ImportError:  # 未安装 jieba 时中文按单字切分
+    jieba = None
+
+# 日期：2024年1月1日 / 2024-01-01 / 2024/1/1 / 2024.1.1
+DATE_PATTERN = r'\d{4}\s*年\s*\d{1,2}\s*月(?:\s*\d{1,2}\s*日)?|\d{4}[-/.]\d{1,2}[-/.]\d{1,2}'
+# 数字/金额/百分比：3,000,000 / 3，000，000 / 12.5 / 0.05%
+NUMBER_PATTERN = r'\d+(?:[,，]\d{3})*(?:\.\d+)?%?'
+CJK_RUN_PATTERN = r'[一-鿿]+'
+# 每个字符恰好属于一个词元；日期优先于数字匹配
+TOKEN_PATTERN = re.compile(rf'({DATE_PATTERN})|({NUMBER_PATTERN})|[A-Za-z]+|({CJK_RUN_PATTERN})|\s+|.', re.DOTALL)
+
+# 语义清理：夹在两处修改之间、不超过该长度且不长于两侧修改的相同片段并入修改
+SEMANTIC_EQUAL_CHARS = 4
+
+
+class Tokenizer:
+    """词元切分器 - 日期、数字/金额整体作为一个词元，中文用 jieba 分词（未安装时按单字），其余按英文单词/空白/单字符"""
+
+    def split(self, text: str, start: int = 0, end: int = None) -> List[Span]:
+        if end is None:
+            end = len(text)
+        spans = []
+        for match in TOKEN_PATTERN.finditer(text, start, end):
+            if match.lastindex == 3 and jieba is not None:
+                position = match.start()
+                for word in jieba.cut(match.group(), HMM=False):
+                    spans.append((position, position + len(word)))
+                    position += len(word)
+            elif match.lastindex == 3:
+                spans.extend((position, position + 1) for position in range(match.start(), match.end()))
+            else:
+                spans.append((match.start(), match.end()))
+        return spans
+
+
+def semantic_cleanup(opcodes: List[Opcode], max_equal: int = SEMANTIC_EQUAL_CHARS) -> List[Opcode]:
+    """合并被很短的相同片段隔开的相邻修改
+
+    参照 diff-match-patch 的 diff_cleanupSemantic：相同片段不超过 max_equal 个字符，
+    且比前后两处修改都短（修改长度取删除、插入两侧较长者，按各自原始长度计算）时并入修改，
+    例如 "3,000,000元" -> "3,500,000元" 的多个碎片合并为一处替换；
+    整条新增的条款与相邻的单字修改之间的连接文字不会被吞并。
+    """
+    cleaned = []
+    prev_edit_size = 0  # 上一处修改自身（合并前）的长度
+    for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if cleaned and cleaned[-1][0] != 'equal':
+            _, prev_i1, prev_i2, prev_j1, prev_j2 = cleaned[-1]
+            if tag != 'equal':
+                cleaned[-1] = ('replace', prev_i1, i2, prev_j1, j2)
+                prev_edit_size = max(prev_edit_size, i2 - i1, j2 - j1)
+                continue
+            if index + 1 < len(opcodes) and opcodes[index + 1][0] != 'equal':
+                _, next_i1, next_i2, next_j1, next_j2 = opcodes[index + 1]
+                equal_length = i2 - i1
+                if (equal_length <= max_equal
+                        and equal_length < prev_edit_size
+                        and equal_length < max(next_i2 - next_i1, next_j2 - next_j1)):
+                    cleaned[-1] = ('replace', prev_i1, i2, prev_j1, j2)
+                    continue
+        if tag != 'equal':
+            prev_edit_size = max(i2 - i1, j2 - j1)
+        cleaned.append((tag, i1, i2, j1, j2))
+    return merge_opcodes(cleaned)
+
+
+class TokenDiff(BudgetedDiff):
+    """词元级对比
+
+    在词元序列上计算差异（序列比字符短数倍），再映射回字符偏移并做语义清理；
+    超出预算时与字符级对比一样降级为行级/整段对比。
+    """
+
+    def __init__(self, algorithm: str = "auto", time_budget: float = None, memory_budget: int = None):
+        super().__init__(algorithm, time_budget, memory_budget)
+        self.tokenizer = Tokenizer()
+
+    def _fine_opcodes(self, segment1: str, segment2: str, budget: DiffBudget) -> List[Opcode]:
+        tokens1 = self.tokenizer.split(segment1)
+        tokens2 = self.tokenizer.split(segment2)
+        token_ids: Dict[str, int] = {}
+        ids1 = [token_ids.setdefault(segment1[s:e], len(token_ids)) for s, e in tokens1]
+        ids2 = [token_ids.setdefault(segment2[s:e], len(token_ids)) for s, e in tokens2]
+
+        algorithm = create_diff_algorithm(self.algorithm, len(ids1), len(ids2), budget)
+        budget.check_memory(algorithm.name, len(ids1), len(ids2))
+        opcodes = []
+        for tag, i1, i2, j1, j2 in algorithm.get_opcodes(ids1, ids2):
+            char_a1 = tokens1[i1][0] if i1 < len(tokens1) else len(segment1)
+            char_a2 = tokens1[i2 - 1][1] if i2 > i1 else char_a1
+            char_b1 = tokens2[j1][0] if j1 < len(tokens2) else len(segment2)
+            char_b2 = tokens2[j2 - 1][1] if j2 > j1 else char_b1
+            opcodes.append((tag, char_a1, char_a2, char_b1, char_b2))
+        return semantic_cleanup(opcodes)
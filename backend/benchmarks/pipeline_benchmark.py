@@ -0,0 +1,219 @@
+"""解析 → 对比 → 坐标映射 → 渲染 全流程基准测试
+
+在 backend 目录下运行（需先按 README 创建 app/config.py）:
+
+    python -m benchmarks.pipeline_benchmark --pages 1,10,100,500 --edit-density 0.05 --moves 3 --table-changes 5
+    python -m benchmarks.pipeline_benchmark --pages 10 --compare benchmarks/results/<上一次结果>.json
+
+结果以JSON写入 benchmarks/results/，文件名包含git提交号，便于跨提交比较。
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic_contract import generate_contract, mutate_contract, write_pdf
+
+STAGES = ("parse", "diff", "map", "render")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _reset_peak_rss() -> bool:
+    """重置进程的RSS峰值（仅Linux支持），返回峰值是否可按阶段统计"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # 非Linux: ru_maxrss 为进程生命周期内的峰值（macOS单位为字节，Linux为KB）
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _json_size(data) -> int:
+    return len(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _files_size(image_urls: List[str], image_dir: str) -> int:
+    return sum(os.path.getsize(os.path.join(image_dir, os.path.basename(url))) for url in image_urls if os.path.exists(os.path.join(image_dir, os.path.basename(url))))
+
+
+class StageTimer:
+    """记录单个阶段的耗时、RSS峰值和输出大小"""
+
+    def __init__(self, results: Dict, name: str):
+        self.results = results
+        self.name = name
+        self.output_bytes = 0
+
+    def __enter__(self):
+        self.per_stage_rss = _reset_peak_rss()
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.results[self.name] = {
+            "wall_time_s": round(time.perf_counter() - self.started_at, 4),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+            "peak_rss_scope": "stage" if self.per_stage_rss else "process",
+            "output_bytes": self.output_bytes if exc_type is None else None,
+            "error": repr(exc) if exc is not None else None,
+        }
+        return False
+
+
+async def run_case(pages: int, edit_density: float, moves: int, table_changes: int, seed: int, workdir: str, skip_render: bool) -> Dict:
+    """生成一对合成合同并依次测量各阶段"""
+    from app.utils.coordinate_mapper import CoordinateMapper
+    from app.utils.diff_engine import DiffEngine
+    from app.utils.file_parser import DocumentParser
+    from app.utils.image_processor import ImageProcessor
+
+    standard_blocks = generate_contract(pages, seed)
+    target_blocks, injected = mutate_contract(standard_blocks, edit_density, moves, table_changes, seed)
+    standard_path = os.path.join(workdir, f"standard_{pages}.pdf")
+    target_path = os.path.join(workdir, f"target_{pages}.pdf")
+    case = {
+        "pages_requested": pages,
+        "standard_pages": write_pdf(standard_blocks, standard_path),
+        "target_pages": write_pdf(target_blocks, target_path),
+        "injected": injected,
+        "stages": {},
+    }
+    stages = case["stages"]
+
+    parser = DocumentParser()
+    with StageTimer(stages, "parse") as timer:
+        standard_data = await parser.parse_document(standard_path, "application/pdf")
+        target_data = await parser.parse_document(target_path, "application/pdf")
+        timer.output_bytes = _json_size(standard_data) + _json_size(target_data)
+    case["standard_chars"] = len(standard_data.get("full_text", ""))
+    case["target_chars"] = len(target_data.get("full_text", ""))
+
+    # compare_documents = 文本对比 + 坐标映射，这里拆成两个阶段分别计时
+    engine = DiffEngine()
+    with StageTimer(stages, "diff") as timer:
+        diff_list = await engine._compare_texts(standard_data.get("full_text", ""), target_data.get("full_text", ""), standard_data, target_data)
+        timer.output_bytes = _json_size(diff_list)
+
+    mapper = CoordinateMapper()
+    with StageTimer(stages, "map") as timer:
+        mapped_diff_list = mapper.map_diff_to_coordinates(diff_list, {
+            "standard": engine._get_coordinate_store(standard_data),
+            "target": engine._get_coordinate_store(target_data)
+        })
+        timer.output_bytes = _json_size(mapped_diff_list)
+    case["diff_count"] = len(mapped_diff_list)
+
+    if not skip_render:
+        processor = ImageProcessor()
+        processor.image_dir = os.path.join(workdir, "images")
+        os.makedirs(processor.image_dir, exist_ok=True)
+        with StageTimer(stages, "render") as timer:
+            images = await processor.generate_comparison_images(standard_path, target_path, f"bench_{pages}", mapped_diff_list)
+            timer.output_bytes = _files_size(images["standard_images"] + images["target_images"], processor.image_dir)
+
+    return case
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current: Dict, baseline: Dict):
+    """按页数和阶段打印与基线结果的耗时/内存对比"""
+    baseline_cases = {case["pages_requested"]: case for case in baseline.get("cases", [])}
+    print(f"对比基线: {baseline.get('commit')} -> {current.get('commit')}")
+    for case in current["cases"]:
+        base_case = baseline_cases.get(case["pages_requested"])
+        if base_case is None:
+            continue
+        for stage in STAGES:
+            now = case["stages"].get(stage)
+            before = base_case["stages"].get(stage)
+            if not now or not before or not before["wall_time_s"]:
+                continue
+            ratio = now["wall_time_s"] / before["wall_time_s"]
+            print(f"  {case['pages_requested']:>4}页 {stage:<6} 耗时 {before['wall_time_s']:.3f}s -> {now['wall_time_s']:.3f}s ({ratio:.2f}x)  "
+                  f"RSS峰值 {before['peak_rss_mb']:.0f}MB -> {now['peak_rss_mb']:.0f}MB")
+
+
+async def main(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="contract_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    results = {
+        "commit": _git_commit(),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "edit_density": args.edit_density,
+            "moves": args.moves,
+            "table_changes": args.table_changes,
+            "seed": args.seed,
+        },
+        "cases": [],
+    }
+    try:
+        for pages in args.pages:
+            print(f"[BENCH] {pages}页 ...")
+            case = await run_case(pages, args.edit_density, args.moves, args.table_changes, args.seed, workdir, args.skip_render)
+            results["cases"].append(case)
+            for stage in STAGES:
+                if stage in case["stages"]:
+                    metrics = case["stages"][stage]
+                    print(f"[BENCH]   {stage:<6} {metrics['wall_time_s']:.3f}s  RSS峰值 {metrics['peak_rss_mb']:.0f}MB  输出 {metrics['output_bytes']}字节")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit'] or 'nogit'}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] 结果已保存: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare_results(results, json.load(f))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="合同对比流程基准测试")
+    parser.add_argument("--pages", type=lambda value: [int(item) for item in value.split(",")], default=[1, 10, 100], help="逗号分隔的页数列表，如 1,10,100,500")
+    parser.add_argument("--edit-density", type=float, default=0.05, help="被修改的条款比例")
+    parser.add_argument("--moves", type=int, default=3, help="移动的条款数")
+    parser.add_argument("--table-changes", type=int, default=5, help="修改的表格单元格数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-render", action="store_true", help="跳过图片渲染阶段")
+    parser.add_argument("--workdir", help="保留生成的PDF和图片的目录（默认使用临时目录并在结束后删除）")
+    parser.add_argument("--output", help="结果JSON路径（默认 benchmarks/results/<commit>_<时间>.json）")
+    parser.add_argument("--compare", help="与之前保存的结果JSON对比")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,156 @@
+import random
+from typing import Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+# A4 页面尺寸（pt）及排版参数
+PAGE_WIDTH = 595.0
+PAGE_HEIGHT = 842.0
+MARGIN = 60.0
+FONT_SIZE = 10.5
+LINE_HEIGHT = 16.0
+CHARS_PER_LINE = 42
+LINES_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN) / LINE_HEIGHT)
+# 平均每页的条款数，用于按目标页数估算条款总数
+CLAUSES_PER_PAGE = 7
+# 每隔多少条插入一个表格
+TABLE_EVERY = 25
+
+SUBJECTS = ["甲方", "乙方", "双方", "供应商", "采购方", "承包人", "发包人"]
+ACTIONS = [
+    "应当在合同签订之日起{n}日内支付合同总价款的{p}%",
+    "应按照国家标准及行业规范完成全部交付工作，并提供相应的质量证明文件",
+    "有权对交付的货物进行验收，验收不合格的应在{n}个工作日内书面通知对方",
+    "应对在履行本合同过程中知悉的商业秘密承担保密义务，保密期限为{n}年",
+    "未按约定时间履行义务的，每逾期一日应按合同总价款的{q}%支付违约金",
+    "应在收到发票后{n}日内完成付款，付款方式为银行转账",
+    "因不可抗力导致合同无法履行的，应在{n}日内通知对方并提供相关证明",
+    "应保证所提供的产品不侵犯任何第三方的知识产权",
+]
+CONDITIONS = [
+    "如遇特殊情况，经双方书面协商一致后可以变更",
+    "本条款自合同生效之日起执行",
+    "违约方应赔偿守约方因此遭受的全部损失",
+    "相关费用由责任方承担",
+    "双方另有约定的除外",
+]
+INSERTIONS = ["，但法律法规另有规定的除外", "，且应当以书面形式确认", "，并抄送监理单位备案"]
+TABLE_HEADERS = ["序号", "名称", "数量", "单价(元)", "金额(元)"]
+ITEMS = ["服务器", "交换机", "存储设备", "软件许可", "实施服务", "运维服务", "培训服务"]
+
+
+def _clause_text(rng: random.Random, number: int) -> str:
+    sentences = []
+    for _ in range(rng.randint(2, 4)):
+        action = rng.choice(ACTIONS).format(n=rng.randint(3, 90), p=rng.randint(5, 60), q=rng.choice(["0.05", "0.1", "0.3"]))
+        sentences.append(f"{rng.choice(SUBJECTS)}{action}，{rng.choice(CONDITIONS)}。")
+    return f"第{number}条 " + "".join(sentences)
+
+
+def _table_rows(rng: random.Random) -> List[List[str]]:
+    rows = [list(TABLE_HEADERS)]
+    for index in range(rng.randint(3, 6)):
+        quantity = rng.randint(1, 50)
+        price = rng.randint(100, 99999)
+        rows.append([str(index + 1), rng.choice(ITEMS), str(quantity), f"{price:,}", f"{quantity * price:,}"])
+    return rows
+
+
+def generate_contract(pages: int, seed: int = 0) -> List[Dict]:
+    """生成合同内容块列表：{"type": "clause", "text"} 或 {"type": "table", "rows"}"""
+    rng = random.Random(seed)
+    blocks = [{"type": "clause", "text": "采购合同"}]
+    for number in range(1, max(1, pages * CLAUSES_PER_PAGE) + 1):
+        blocks.append({"type": "clause", "text": _clause_text(rng, number)})
+        if number % TABLE_EVERY == 0:
+            blocks.append({"type": "table", "rows": _table_rows(rng)})
+    return blocks
+
+
+def mutate_contract(blocks: List[Dict], edit_density: float = 0.05, moves: int = 0, table_changes: int = 0, seed: int = 0) -> Tuple[List[Dict], Dict]:
+    """基于标准合同生成目标合同，返回 (目标内容块, 实际注入的变更统计)
+
+    edit_density: 被修改的条款比例（替换数字、插入或删除句子）
+    moves: 整条移动到其他位置的条款数
+    table_changes: 被修改的表格单元格数
+    """
+    rng = random.Random(seed + 1)
+    target = [dict(block, rows=[list(row) for row in block["rows"]]) if block["type"] == "table" else dict(block) for block in blocks]
+    stats = {"edits": 0, "moves": 0, "table_changes": 0}
+
+    clause_indexes = [index for index, block in enumerate(target) if block["type"] == "clause" and index > 0]
+    for index in rng.sample(clause_indexes, int(len(clause_indexes) * edit_density)):
+        text = target[index]["text"]
+        edit = rng.choice(("replace", "insert", "delete"))
+        if edit == "replace":
+            digits = [position for position, char in enumerate(text) if char.isdigit()]
+            if digits:
+                position = rng.choice(digits)
+                text = text[:position] + str((int(text[position]) + 1) % 10) + text[position + 1:]
+        elif edit == "insert":
+            position = text.rfind("。")
+            text = text[:position] + rng.choice(INSERTIONS) + text[position:]
+        else:
+            sentences = text.split("。")
+            if len(sentences) > 2:
+                del sentences[rng.randrange(1, len(sentences) - 1)]
+                text = "。".join(sentences)
+        target[index]["text"] = text
+        stats["edits"] += 1
+
+    for _ in range(moves):
+        clause_indexes = [index for index, block in enumerate(target) if block["type"] == "clause" and index > 0]
+        if len(clause_indexes) < 2:
+            break
+        block = target.pop(rng.choice(clause_indexes))
+        target.insert(rng.randrange(1, len(target) + 1), block)
+        stats["moves"] += 1
+
+    tables = [block for block in target if block["type"] == "table"]
+    for _ in range(table_changes if tables else 0):
+        rows = rng.choice(tables)["rows"]
+        row = rng.randrange(1, len(rows))
+        column = rng.choice((2, 3, 4))
+        rows[row][column] = f"{rng.randint(1, 99999):,}"
+        stats["table_changes"] += 1
+
+    return target, stats
+
+
+def _wrap(text: str) -> List[str]:
+    return [text[start:start + CHARS_PER_LINE] for start in range(0, len(text), CHARS_PER_LINE)] or [""]
+
+
+def write_pdf(blocks: List[Dict], pdf_path: str) -> int:
+    """将内容块排版写入PDF（内置简体中文字体），返回页数"""
+    doc = fitz.open()
+    page = None
+    y = PAGE_HEIGHT
+
+    def new_line(height: float):
+        nonlocal page, y
+        if page is None or y + height > PAGE_HEIGHT - MARGIN:
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            y = MARGIN
+        y += height
+
+    for block in blocks:
+        if block["type"] == "clause":
+            for line in _wrap(block["text"]):
+                new_line(LINE_HEIGHT)
+                page.insert_text((MARGIN, y), line, fontname="china-s", fontsize=FONT_SIZE)
+            new_line(LINE_HEIGHT / 2)
+        else:
+            column_width = (PAGE_WIDTH - 2 * MARGIN) / len(TABLE_HEADERS)
+            for row in block["rows"]:
+                new_line(LINE_HEIGHT + 4)
+                for column, cell in enumerate(row):
+                    x0 = MARGIN + column * column_width
+                    page.draw_rect(fitz.Rect(x0, y - LINE_HEIGHT, x0 + column_width, y + 4), color=(0, 0, 0), width=0.5)
+                    page.insert_text((x0 + 3, y - 2), cell, fontname="china-s", fontsize=FONT_SIZE - 1)
+            new_line(LINE_HEIGHT / 2)
+
+    page_count = len(doc)
+    doc.save(pdf_path, garbage=3, deflate=True)
+    doc.close()
+    return page_count
@@ -0,0 +1,53 @@
+from typing import Dict, List
+
+# 合成文档的版式：左边距、首行位置、字宽、行距、字高
+LEFT, TOP, CHAR_WIDTH, LINE_HEIGHT, CHAR_HEIGHT = 50, 50, 10, 15, 12
+
+
+def make_document(pages: List[List[str]]) -> Dict:
+    """按解析器的输出结构生成文档数据：每页若干行，每行一个 span，字符等宽排列"""
+    pages_data = []
+    text_parts = []
+    page_offsets = []
+    text_length = 0
+    for page_index, lines in enumerate(pages):
+        page_offsets.append(text_length)
+        block_lines = []
+        for line_index, text in enumerate(lines):
+            y = TOP + line_index * LINE_HEIGHT
+            char_bboxes = [[LEFT + k * CHAR_WIDTH, y, LEFT + (k + 1) * CHAR_WIDTH, y + CHAR_HEIGHT] for k in range(len(text))]
+            span = {"text": text, "bbox": [LEFT, y, LEFT + len(text) * CHAR_WIDTH, y + CHAR_HEIGHT], "font": "SimSun", "size": 10, "color": 0, "char_bboxes": char_bboxes}
+            block_lines.append({"spans": [span]})
+            text_parts.append(text)
+            text_length += len(text)
+        pages_data.append({
+            "page_index": page_index,
+            "width": 612,
+            "height": 792,
+            "char_offset": page_offsets[-1],
+            "blocks": [{"lines": block_lines}]
+        })
+    return {"pages": pages_data, "full_text": "".join(text_parts), "page_offsets": page_offsets}
+
+
+def assert_valid_opcodes(a, b, opcodes):
+    """操作码连续覆盖两侧文本，equal 段内容一致，按操作码能由 a 重建 b"""
+    if not a and not b:
+        assert opcodes in ([], [('equal', 0, 0, 0, 0)])
+        return
+    assert opcodes[0][1] == 0 and opcodes[0][3] == 0
+    assert opcodes[-1][2] == len(a) and opcodes[-1][4] == len(b)
+    rebuilt = []
+    for (tag, i1, i2, j1, j2), following in zip(opcodes, opcodes[1:] + [None]):
+        if following is not None:
+            assert following[1] == i2 and following[3] == j2
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+            rebuilt.append(a[i1:i2])
+        else:
+            rebuilt.append(b[j1:j2])
+    assert "".join(rebuilt) == b
+
+
+def edit_ops(opcodes):
+    return [op for op in opcodes if op[0] != 'equal']
@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import app.utils.diff_engine as diff_engine_module
+from app.utils.diff_engine import DiffEngine
+from helpers import make_document
+
+STANDARD_PAGES = [
+    ["第一条 甲方应于签约后三十日内支付价款。", "第二条 乙方应按期交付货物。"],
+    ["第三条 违约金为合同总价的百分之五。", "第四条 本合同自双方签字之日起生效。"],
+]
+
+
+def _target(page_index: int, line_index: int, text: str):
+    pages = [list(lines) for lines in STANDARD_PAGES]
+    pages[page_index][line_index] = text
+    return make_document(pages)
+
+
+TARGETS = [
+    _target(0, 0, "第一条 甲方应于签约后九十日内支付价款。"),
+    _target(1, 0, "第三条 违约金为合同总价的百分之十。"),
+    _target(1, 1, "第四条 本合同自双方盖章之日起生效。"),
+]
+
+
+def test_standard_document_is_indexed_once(monkeypatch):
+    standard = make_document(STANDARD_PAGES)
+    built = []
+    build_store = diff_engine_module.get_coordinate_store
+
+    def counting_store(document_data):
+        built.append(id(document_data))
+        return build_store(document_data)
+
+    monkeypatch.setattr(diff_engine_module, "get_coordinate_store", counting_store)
+
+    document_cache = {}
+    DiffEngine(document_cache=document_cache).prepare_document(standard)
+    assert built == [id(standard)]
+    assert (id(standard), "text_sha256") in document_cache
+    assert (id(standard), "entities") in document_cache
+
+    for target in TARGETS:
+        asyncio.run(DiffEngine(max_workers=1, document_cache=document_cache).compare_documents(standard, target))
+
+    # 标准文档只在预处理时构建一次坐标索引，每个目标各构建一次
+    assert built.count(id(standard)) == 1
+    assert [document_id for document_id in built if document_id != id(standard)] == [id(target) for target in TARGETS]
+
+
+def test_concurrent_targets_match_independent_comparisons():
+    standard = make_document(STANDARD_PAGES)
+    document_cache = {}
+    DiffEngine(document_cache=document_cache).prepare_document(standard)
+
+    async def run_batch(executor):
+        engines = [DiffEngine(max_workers=1, executor=executor, document_cache=document_cache) for _ in TARGETS]
+        return await asyncio.gather(*[engine.compare_documents(standard, target) for engine, target in zip(engines, TARGETS)])
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        batch_results = asyncio.run(run_batch(executor))
+
+    for target, batch_result in zip(TARGETS, batch_results):
+        alone = asyncio.run(DiffEngine(max_workers=1).compare_documents(standard, target))
+        assert batch_result["diff_list"] == alone["diff_list"]
+        assert batch_result["summary"] == alone["summary"]
+
+    # 每个目标只改了一处
+    assert [len(result["diff_list"]) for result in batch_results] == [1, 1, 1]
+    assert batch_results[0]["diff_list"][0]["status"] == "MODIFY"
+
+
+def test_cache_key_distinguishes_targets_and_options():
+    standard = make_document(STANDARD_PAGES)
+    document_cache = {}
+    engine = DiffEngine(document_cache=document_cache)
+    keys = [engine.cache_key(standard, target) for target in TARGETS]
+    assert len(set(keys)) == len(TARGETS)
+    # 共享缓存的引擎与独立引擎得到相同的结果缓存键
+    assert keys == [DiffEngine().cache_key(standard, target) for target in TARGETS]
+    assert DiffEngine(granularity="clause").cache_key(standard, TARGETS[0]) != keys[0]
@@ -0,0 +1,63 @@
+import asyncio
+
+from app.utils.clause_aligner import ClauseAlignedDiff, ClauseSegmenter, find_renumbered_clauses
+from app.utils.diff_engine import DiffEngine
+from helpers import edit_ops, make_document
+
+TITLES = ["合同标的", "价款支付", "交付期限", "质量标准", "违约责任", "争议解决", "合同生效"]
+NUMBERS = "一二三四五六七八九十"
+
+
+def _clauses(titles):
+    return [f"第{number}条 {title}：双方应按照本条约定履行{title}相关义务。" for number, title in zip(NUMBERS, titles)]
+
+
+def _compare(standard_lines, target_lines, granularity):
+    engine = DiffEngine(granularity=granularity, max_workers=1)
+    return asyncio.run(engine.compare_documents(make_document([standard_lines]), make_document([target_lines])))
+
+
+def test_segmenter_ignores_references_and_decimals():
+    text = "前言。第一条 根据第五条约定，违约金为1.5倍。1.2 付款方式：转账。"
+    clauses = ClauseSegmenter().split(text)
+    assert [clause.number for clause in clauses] == [None, "第一条", "1.2"]
+    assert clauses[0].start == 0 and clauses[-1].end == len(text)
+    assert all(previous.end == following.start for previous, following in zip(clauses, clauses[1:]))
+
+
+def test_inserted_clause_is_one_addition():
+    standard = _clauses(TITLES)
+    target = _clauses(TITLES[:2] + ["保密义务"] + TITLES[2:])
+
+    result = _compare(standard, target, "clause")
+    assert [item["status"] for item in result["diff_list"]] == ["ADD"]
+    assert result["diff_list"][0]["new_text"] == target[2]
+    # 后续条款的重新编号只在摘要中汇总一次
+    assert result["summary"]["renumbered_clauses"] == 5
+    assert result["renumbered_clauses"][0] == {"standard_number": "第三条", "target_number": "第四条"}
+
+    # 字符级对比逐条报告编号变化
+    assert len(_compare(standard, target, "char")["diff_list"]) > 1
+
+
+def test_renumbered_clause_reports_only_body_changes():
+    standard = "".join(_clauses(TITLES[:4]))
+    target_clauses = _clauses(["合同标的", "保密义务"] + TITLES[1:4])
+    target_clauses[3] = target_clauses[3].replace("履行", "全面履行")
+    target = "".join(target_clauses)
+
+    differ = ClauseAlignedDiff("myers")
+    opcodes = differ.get_opcodes(standard, target)
+    inserted = len(target_clauses[1])
+    # 新增的条款 + 改名为第四条的原第三条正文中的修改
+    assert [(tag, target[j1:j2]) for tag, i1, i2, j1, j2 in edit_ops(opcodes)] == [('insert', target_clauses[1]), ('insert', "全面")]
+    assert edit_ops(opcodes)[0][3] == len(target_clauses[0]) and edit_ops(opcodes)[0][4] == len(target_clauses[0]) + inserted
+    assert find_renumbered_clauses(standard, target, opcodes) == [("第二条", "第三条"), ("第三条", "第四条"), ("第四条", "第五条")]
+
+
+def test_same_number_with_different_spacing_is_diffed():
+    standard = "第一条 标的。第二条 价款。"
+    target = "第一条 标的。第 二 条 价款。"
+    opcodes = ClauseAlignedDiff("myers").get_opcodes(standard, target)
+    assert [target[j1:j2] for tag, i1, i2, j1, j2 in edit_ops(opcodes)] == [" ", " "]
+    assert find_renumbered_clauses(standard, target, opcodes) == []
@@ -0,0 +1,89 @@
+from app.utils.coordinate_mapper import CoordinateMapper, find_page_index, get_page_offsets
+from app.utils.coordinate_store import get_coordinate_store
+from helpers import CHAR_WIDTH, LEFT, make_document
+
+
+def _store(pages):
+    return get_coordinate_store(make_document(pages))
+
+
+def _char_entry(text, page_index, line_index, doc_index=1, char_index=None, start_index=None):
+    entry = {"text": text, "page_index": page_index, "line_index": line_index, "doc_index": doc_index}
+    if char_index is not None:
+        entry["char_index"] = char_index
+    if start_index is not None:
+        entry["sub_info"] = [{"page_id": page_index, "sub_polygons": [], "sub_text_index": {"start_index": start_index, "length": 1}}]
+    return entry
+
+
+def test_page_offsets():
+    document_data = make_document([["甲方乙方", "丙"], ["丁戊"]])
+    assert get_page_offsets(document_data) == [0, 5]
+    # 旧数据没有 page_offsets 时按 span 文本推算
+    del document_data["page_offsets"]
+    assert get_page_offsets(document_data) == [0, 5]
+    document_data["full_text"] += "多余"
+    assert get_page_offsets(document_data) is None
+
+    assert [find_page_index(index, [0, 5]) for index in (0, 4, 5, 6)] == [0, 0, 1, 1]
+    assert find_page_index(3, None) == 0
+
+
+def test_store_indexes():
+    store = _store([["甲方乙方", "乙方丙方"], ["丁方"]])
+    # (页号, 行号, 页内字符序号)
+    assert store.index_of(0, 1, 5) == 5
+    assert store.index_of(1, 0, 1) == 9
+    # 位置不在指定行上
+    assert store.index_of(0, 0, 5) is None
+    assert store.index_of(2, 0, 0) is None
+
+    # (页号, 行号, 字符)：取离已知位置最近的一个
+    assert store.find_on_line(0, 1, "方") == 5
+    assert store.find_on_line(0, 1, "方", near=7) == 7
+    assert store.find_on_line(0, 0, "丙") is None
+    assert store.find_on_line(0, 0, "") is None
+
+
+def test_find_char_index_lookup_order():
+    store = _store([["甲方乙方", "方乙丙方丁"]])
+    mapper = CoordinateMapper()
+    # 1. 全局索引与字符一致时直接取用
+    assert mapper._find_char_index(_char_entry("方", 0, 1, start_index=4), store) == 4
+    # 2. 全局索引不一致时按 (页号, 行号, 页内字符序号)
+    assert mapper._find_char_index(_char_entry("乙", 0, 0, char_index=2, start_index=6), store) == 2
+    # 3. 都不一致时按行内字符内容匹配，取离全局索引最近的一个
+    assert mapper._find_char_index(_char_entry("方", 0, 1, char_index=1, start_index=8), store) == 7
+    assert mapper._find_char_index(_char_entry("戊", 0, 1, char_index=0), store) is None
+
+
+def test_map_diff_selects_store_by_document():
+    standard = _store([["甲方付款"]])
+    target = _store([["", "乙方付款"]])
+    run_entry = {"text": "付款", "page_index": 0, "line_index": 0, "doc_index": 1,
+                 "sub_info": [{"page_id": 0, "sub_polygons": [1, 2, 3, 4], "sub_text_index": {"start_index": 2, "length": 2}}]}
+    diff_list = [{
+        "diff_id": "diff_1",
+        "status": "MODIFY",
+        "old_text": "甲",
+        "diff": [[
+            _char_entry("甲", 0, 0, doc_index=1, start_index=0),
+            _char_entry("乙", 0, 0, doc_index=2, start_index=0),
+            run_entry,
+            _char_entry("无", 0, 0, doc_index=1, char_index=0)
+        ]]
+    }]
+
+    mapped, = CoordinateMapper().map_diff_to_coordinates(diff_list, {"standard": standard, "target": target})
+    assert mapped["diff_id"] == "diff_1" and mapped["old_text"] == "甲"
+    standard_char, target_char, kept_run, unmapped = mapped["diff"][0]
+    assert standard_char["font"] == "SimSun"
+    assert standard_char["bbox"] == [LEFT, 50, LEFT + CHAR_WIDTH, 62]
+    assert standard_char["char_polygons"] == [standard_char["bbox"]]
+    # 目标文档的空行不占行号
+    assert target_char["line_index"] == 0 and target_char["bbox"][1] == 65
+    # 区间高亮和找不到的字符原样保留
+    assert kept_run is run_entry
+    assert unmapped == diff_list[0]["diff"][0][3]
+    # 输入的差异项不被修改
+    assert "font" not in diff_list[0]["diff"][0][0]
@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.utils.coordinate_store import CoordinateStore, CoordinateStoreBuilder, get_coordinate_store
+from helpers import make_document
+
+
+def _sample_store():
+    builder = CoordinateStoreBuilder()
+    builder.add_span(0, 0, ([10 * i, 50, 10 * i + 10, 62] for i in range(3)), 3, "SimSun", 12, 0)
+    builder.add_span(0, 1, ([10 * i, 70, 10 * i + 10, 82.5] for i in range(2)), 2, "SimHei", 10.5, 0xFF0000)
+    builder.add_span(1, 0, [[0, 0, 8, 8]], 1, "SimSun", 12, 0xFFFFFFFF)
+    return builder.build("甲方乙方丙")
+
+
+def test_coordinate_store_round_trip():
+    store = _sample_store()
+    decoded = CoordinateStore.decode(store.encode(), store.text)
+
+    assert len(decoded) == len(store) == 6
+    assert decoded.fonts == ["SimSun", "SimHei"]
+    for name in ("pages", "lines", "bboxes", "font_ids", "sizes", "colors"):
+        np.testing.assert_array_equal(getattr(decoded, name), getattr(store, name))
+    for char_index in range(len(store)):
+        assert decoded.char_info(char_index) == store.char_info(char_index)
+    assert decoded.char_info(len(store)) is None
+
+
+def test_get_coordinate_store_prefers_encoded_column():
+    store = _sample_store()
+    document_data = {"full_text": store.text, "coordinate_store": store.encode(), "pages": []}
+    loaded = get_coordinate_store(document_data)
+    assert loaded.text == store.text
+    np.testing.assert_array_equal(loaded.bboxes, store.bboxes)
+
+
+def test_from_document_counts_only_lines_with_text():
+    document_data = make_document([["甲方", "", "乙方"], ["丙"]])
+    # 解析结果中的空行（如只有空 span 的行、跨块的空行）不占行号
+    document_data["pages"][0]["blocks"][0]["lines"][1] = {"spans": [{"text": "", "bbox": [0, 0, 0, 0]}]}
+    document_data["pages"][0]["blocks"].insert(0, {"lines": [{"spans": []}]})
+
+    store = get_coordinate_store(document_data)
+    assert store.text == "甲方乙方丙"
+    assert store.pages.tolist() == [0, 0, 0, 0, 1]
+    assert store.lines.tolist() == [0, 0, 1, 1, 0]
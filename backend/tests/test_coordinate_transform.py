@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.utils.coordinate_transform import (DEFAULT_PAGE_SIZE, ORIGIN_BOTTOM_LEFT, collect_page_rects, get_page_sizes,
+                                            pdf_rects_to_image)
+
+
+def test_page_sizes_use_parsed_dimensions():
+    document_data = {"pages": [
+        {"page_index": 0, "width": 595.0, "height": 842.0},   # A4 纵向
+        {"page_index": 1, "width": 842.0, "height": 595.0},   # A4 横向
+        {"page_index": 2}
+    ]}
+    assert get_page_sizes(document_data) == {0: (595.0, 842.0), 1: (842.0, 595.0), 2: DEFAULT_PAGE_SIZE}
+    assert get_page_sizes(None) == {}
+
+
+def test_rects_are_scaled_in_one_call():
+    rects = [[10, 20, 30, 40], [100, 200, 110, 212]]
+    image_rects = pdf_rects_to_image(rects, 595, 842, scale=1.5)
+    assert image_rects.shape == (2, 4)
+    np.testing.assert_allclose(image_rects, [[15, 30, 45, 60], [150, 300, 165, 318]])
+    # 单个矩形也返回 (1, 4)
+    assert pdf_rects_to_image([1, 2, 3, 4], 595, 842).shape == (1, 4)
+    assert pdf_rects_to_image([], 595, 842).shape == (0, 4)
+
+
+def test_bottom_left_origin_flips_with_page_height():
+    # 横向页面的高度是 595，而不是 Letter 的 792
+    image_rects = pdf_rects_to_image([[10, 500, 30, 585]], 842, 595, scale=2.0, origin=ORIGIN_BOTTOM_LEFT)
+    np.testing.assert_allclose(image_rects, [[20, 20, 60, 190]])
+
+
+def test_rects_are_clipped_to_the_page():
+    image_rects = pdf_rects_to_image([[-5, 590, 620, 800]], 612, 792, scale=2.0)
+    np.testing.assert_allclose(image_rects, [[0, 1180, 1224, 1584]])
+    with pytest.raises(ValueError):
+        pdf_rects_to_image([[0, 0, 1, 1]], 612, 792, origin="center")
+
+
+def test_collect_page_rects_groups_by_entry_page():
+    run = {"doc_index": 1, "page_index": 1, "char_polygons": [[1, 2, 3, 4]],
+           "sub_info": [{"sub_text_index": {"start_index": 40, "length": 3}}]}
+    diff_list = [
+        {"status": "DELETE", "page_index": 0, "diff": [[
+            {"doc_index": 1, "char_polygons": [[0, 0, 5, 5, 9, 9, 9, 9]]},
+            run,
+            {"doc_index": 2, "page_index": 0, "char_polygons": [[7, 7, 8, 8]]}
+        ]]},
+        {"status": "ADD", "page_index": 2, "diff": [[{"doc_index": 1, "page_index": 2, "char_polygons": [[5, 5, 6], [6, 6, 7, 7]]}]]}
+    ]
+    pages = collect_page_rects(diff_list, doc_index=1)
+    # 高亮项没有页号时取差异项的页号；矩形只取前4个值，不完整的矩形跳过
+    assert pages == {
+        0: ([[0, 0, 5, 5]], ["DELETE"], [(0, -1, -1)]),
+        1: ([[1, 2, 3, 4]], ["DELETE"], [(0, 40, 43)]),
+        2: ([[6, 6, 7, 7]], ["ADD"], [(1, -1, -1)])
+    }
+    assert collect_page_rects(diff_list, doc_index=2) == {0: ([[7, 7, 8, 8]], ["DELETE"], [(0, -1, -1)])}
+    assert collect_page_rects(None, doc_index=1) == {}
@@ -0,0 +1,85 @@
+import difflib
+import random
+
+import pytest
+
+from app.utils.diff_algorithms import MyersDiff, PatienceDiff, create_diff_algorithm
+from helpers import assert_valid_opcodes
+
+
+def _lcs_length(a, b) -> int:
+    """动态规划求最长公共子序列长度（最优编辑的匹配字符数）"""
+    previous = [0] * (len(b) + 1)
+    for char_a in a:
+        current = [0]
+        for j, char_b in enumerate(b):
+            current.append(previous[j] + 1 if char_a == char_b else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def _matched_length(opcodes) -> int:
+    return sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes if tag == 'equal')
+
+
+def _random_pairs(count: int, seed: int = 20240601):
+    """随机文本对：小字母表保证大量重复字符，另一侧由随机编辑生成"""
+    rng = random.Random(seed)
+    alphabet = "甲乙方款日元abc"
+    pairs = [("", ""), ("", "abc"), ("abc", ""), ("abc", "abc")]
+    for _ in range(count):
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        b = list(a)
+        for _ in range(rng.randint(0, 12)):
+            position = rng.randint(0, len(b))
+            operation = rng.random()
+            if operation < 0.4:
+                b.insert(position, rng.choice(alphabet))
+            elif operation < 0.8 and position < len(b):
+                del b[position]
+            elif position < len(b):
+                b[position] = rng.choice(alphabet)
+        pairs.append((a, "".join(b)))
+    return pairs
+
+
+@pytest.mark.parametrize("a, b", _random_pairs(200))
+def test_myers_is_optimal(a, b):
+    opcodes = MyersDiff().get_opcodes(a, b)
+    assert_valid_opcodes(a, b, opcodes)
+    matched = _matched_length(opcodes)
+    assert matched == _lcs_length(a, b)
+    # SequenceMatcher 不保证最优，Myers 的匹配字符数不会少于它
+    reference = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+    assert matched >= _matched_length(reference)
+
+
+@pytest.mark.parametrize("a, b", _random_pairs(200))
+def test_patience_is_valid(a, b):
+    opcodes = PatienceDiff().get_opcodes(a, b)
+    assert_valid_opcodes(a, b, opcodes)
+    assert _matched_length(opcodes) <= _lcs_length(a, b)
+
+
+def test_patience_matches_difflib_on_unique_lines():
+    """行内容各不相同时 patience 的锚点即全部公共行，结果与 difflib 一致"""
+    a = ["第%d条" % i for i in range(30)]
+    b = a[:5] + ["新增条款"] + a[5:20] + a[22:]
+    expected = difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+    assert PatienceDiff().get_opcodes(a, b) == expected
+
+
+def test_myers_keeps_cjk_deletion_in_one_op():
+    a = "甲方应当在合同签订后三十日内向乙方支付全部货款，乙方应当在收到货款后开具发票。" * 3
+    b = a.replace("在合同签订后三十日内", "", 1)
+    opcodes = create_diff_algorithm("auto", len(a), len(b)).get_opcodes(a, b)
+    assert [op for op in opcodes if op[0] != 'equal'] == [('delete', 4, 14, 4, 4)]
+
+
+def test_create_diff_algorithm_auto():
+    assert isinstance(create_diff_algorithm("auto", 10, 10), MyersDiff)
+    # 常见合同规模（数百页）默认使用最优的 Myers
+    assert isinstance(create_diff_algorithm("auto", 330000, 330000), MyersDiff)
+    assert isinstance(create_diff_algorithm("auto", 600000, 600000), PatienceDiff)
+    with pytest.raises(ValueError):
+        create_diff_algorithm("unknown")
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.utils.diff_algorithms import DiffBudget, DiffBudgetExceeded
+from app.utils.diff_engine import DiffEngine
+from app.utils.hierarchical_diff import COARSE_LINE, COARSE_SECTION, BudgetedDiff
+from app.utils.parallel_diff import compute_opcodes_within_budget
+from helpers import assert_valid_opcodes, edit_ops, make_document
+
+LINES_A = "第一条 甲方应支付价款。\n第二条 乙方应交付货物。\n第三条 本合同自签字之日起生效。\n"
+LINES_B = "第一条 甲方应支付价款。\n第二条 乙方应于十日内交付货物。\n第三条 本合同自签字之日起生效。\n"
+
+
+def test_memory_budget_checks_estimate_before_diffing():
+    DiffBudget(memory_limit=10000).check_memory("myers", 40, 40)
+    with pytest.raises(DiffBudgetExceeded):
+        DiffBudget(memory_limit=10000).check_memory("sequence_matcher", 40, 40)
+    # 未设置预算时不限制
+    DiffBudget().check()
+    DiffBudget().check_memory("patience", 10 ** 9, 10 ** 9)
+
+
+def test_over_memory_budget_falls_back_to_line_diff():
+    differ = BudgetedDiff("myers", memory_budget=1000)
+    opcodes = differ.get_opcodes(LINES_A, LINES_B, 0, len(LINES_A), 0, len(LINES_B))
+    assert_valid_opcodes(LINES_A, LINES_B, opcodes)
+    # 只有变化的第二行整行替换，前后行保持相同
+    second_a = LINES_A.index("第二条")
+    second_b = LINES_B.index("第二条")
+    assert edit_ops(opcodes) == [('replace', second_a, LINES_A.index("第三条"), second_b, LINES_B.index("第三条"))]
+    assert differ.coarse_sections == [(0, len(LINES_A), 0, len(LINES_B), COARSE_LINE)]
+
+
+def test_over_time_budget_reports_whole_section():
+    differ = BudgetedDiff("myers", time_budget=1e-9)
+    opcodes = differ.get_opcodes(LINES_A, LINES_B, 0, len(LINES_A), 0, len(LINES_B))
+    assert opcodes == [('replace', 0, len(LINES_A), 0, len(LINES_B))]
+    assert differ.coarse_sections == [(0, len(LINES_A), 0, len(LINES_B), COARSE_SECTION)]
+
+
+def test_within_budget_keeps_char_diff():
+    opcodes, coarse_sections = compute_opcodes_within_budget(LINES_A, LINES_B, "myers", "char", time_budget=60, memory_budget=10 ** 8)
+    assert coarse_sections == []
+    assert edit_ops(opcodes) == [('insert', LINES_A.index("交付"), LINES_A.index("交付"), LINES_B.index("于十日内"), LINES_B.index("交付"))]
+
+
+def test_hierarchical_budget_applies_per_changed_region():
+    # 整篇字符级对比超出预算
+    _, coarse_sections = compute_opcodes_within_budget(LINES_A, LINES_B, "myers", "char", memory_budget=5000)
+    assert [section[-1] for section in coarse_sections] == [COARSE_LINE]
+
+    opcodes, coarse_sections = compute_opcodes_within_budget(LINES_A, LINES_B, "myers", "hierarchical", memory_budget=5000)
+    assert_valid_opcodes(LINES_A, LINES_B, opcodes)
+    # 只有变化的句子进入字符级对比，区段在预算内，不降级
+    assert coarse_sections == []
+
+
+def test_engine_marks_coarse_items():
+    standard = make_document([["第一条 甲方应支付价款。", "第二条 乙方应交付货物。"]])
+    target = make_document([["第一条 甲方应支付价款。", "第二条 乙方应于十日内交付货物。"]])
+
+    result = asyncio.run(DiffEngine(max_workers=1, time_budget=1e-9).compare_documents(standard, target))
+    assert result["diff_list"]
+    assert all(item["coarse"] == COARSE_SECTION for item in result["diff_list"])
+    assert result["summary"]["coarse_differences"] == len(result["diff_list"])
+
+    result = asyncio.run(DiffEngine(max_workers=1).compare_documents(standard, target))
+    assert [item.get("coarse") for item in result["diff_list"]] == [None]
+    assert result["summary"]["coarse_differences"] == 0
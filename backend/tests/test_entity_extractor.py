@@ -0,0 +1,69 @@
+import pytest
+
+from app.utils.entity_extractor import (ENTITY_AMOUNT, ENTITY_DATE, ENTITY_DURATION, ENTITY_PERCENTAGE,
+                                        EntityExtractor, parse_chinese_number)
+
+
+def _entities(text):
+    return [(entity_type, raw, value) for _, _, entity_type, raw, value in EntityExtractor().extract(text).entities]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("三十", 30), ("一百零五", 105), ("两千", 2000), ("壹佰万", 1000000), ("一万亿", 10 ** 12),
+])
+def test_parse_chinese_number(text, expected):
+    assert parse_chinese_number(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("总价3,000,000元", [(ENTITY_AMOUNT, "3,000,000元", 3000000.0)]),
+    ("人民币300万元", [(ENTITY_AMOUNT, "人民币300万元", 3000000.0)]),
+    ("壹佰万元整", [(ENTITY_AMOUNT, "壹佰万元整", 1000000)]),
+    ("违约金为5%", [(ENTITY_PERCENTAGE, "5%", 5.0)]),
+    ("百分之五", [(ENTITY_PERCENTAGE, "百分之五", 5.0)]),
+    ("2024年12月31日", [(ENTITY_DATE, "2024年12月31日", "2024-12-31")]),
+    ("2024-1-5", [(ENTITY_DATE, "2024-1-5", "2024-01-05")]),
+])
+def test_amounts_percentages_and_dates(text, expected):
+    assert _entities(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # 不带年份的月、日是日期，不是期限
+    ("12月31日前付清", [(ENTITY_DATE, "12月31日", "--12-31")]),
+    ("于十月交付", [(ENTITY_DATE, "十月", "--10")]),
+    ("十二月三十一号", [(ENTITY_DATE, "十二月三十一号", "--12-31")]),
+    ("每月5日前", [(ENTITY_DATE, "5日", "---05")]),
+    ("交付后12月31日前验收", [(ENTITY_DATE, "12月31日", "--12-31")]),
+    # 带"个"或期限标记的才是期限
+    ("3个月", [(ENTITY_DURATION, "3个月", "3月")]),
+    ("6月内", [(ENTITY_DURATION, "6月", "6月")]),
+    ("于签约后三十日内", [(ENTITY_DURATION, "三十日", "30日")]),
+    ("收到发票后30日支付", [(ENTITY_DURATION, "30日", "30日")]),
+    ("5个工作日内", [(ENTITY_DURATION, "5个工作日", "5工作日")]),
+    ("30天", [(ENTITY_DURATION, "30天", "30日")]),
+    ("合同期限为2年", [(ENTITY_DURATION, "2年", "2年")]),
+    # 单独的年份既不是日期也不是期限
+    ("2024年", []),
+    ("3号楼", []),
+])
+def test_dates_without_year_and_durations(text, expected):
+    assert _entities(text) == expected
+
+
+def test_compare_ignores_format_only_changes():
+    extractor = EntityExtractor()
+    old = extractor.extract("总价3,000,000元，12月31日前付清").entities
+    assert extractor.compare(old, extractor.extract("总价300万元，12月31日前付清").entities) == []
+
+    changes = extractor.compare(old, extractor.extract("总价3,000,000元，11月30日前付清").entities)
+    assert changes == [{"type": ENTITY_DATE, "old_text": "12月31日", "new_text": "11月30日", "old_value": "--12-31", "new_value": "--11-30"}]
+
+
+def test_overlapping_finds_whole_entity_for_inner_edit():
+    text = "合同总价为3,000,000元。"
+    index = EntityExtractor().extract(text)
+    # "000" 中间的单字修改定位到完整金额
+    assert [entity[3] for entity in index.overlapping(7, 8)] == ["3,000,000元"]
+    assert index.overlapping(0, 2) == []
+    assert index.overlapping(None, None) == []
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from app.utils.executors import ExecutorManager
+
+
+@pytest.fixture
+def manager():
+    manager = ExecutorManager(thread_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def test_event_loop_stays_responsive_during_blocking_work(manager):
+    async def run():
+        ticks = []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.time())
+                await asyncio.sleep(0.01)
+
+        beat = asyncio.ensure_future(heartbeat())
+        thread_name = await manager.run_in_thread(lambda: (time.sleep(0.2), threading.current_thread().name)[1])
+        beat.cancel()
+        return thread_name, ticks
+
+    thread_name, ticks = asyncio.run(run())
+    assert thread_name.startswith("doc-io")
+    # 阻塞任务执行期间事件循环仍在调度其他协程
+    assert len(ticks) >= 5
+
+
+def test_stats_report_queue_depth_and_wait_time(manager):
+    release = threading.Event()
+    futures = [manager.thread_pool.submit(release.wait) for _ in range(3)]
+    time.sleep(0.05)
+    stats = manager.stats()["thread"]
+    assert stats["pending"] == 3
+    # 1个工作线程，另外2个任务在排队
+    assert stats["queue_depth"] == 2
+
+    release.set()
+    assert [future.result(timeout=5) for future in futures] == [True, True, True]
+    stats = manager.stats()["thread"]
+    assert stats["pending"] == 0 and stats["queue_depth"] == 0
+    assert stats["completed"] == 3 and stats["failed"] == 0
+    assert stats["max_wait_ms"] >= 40
+    assert "process" not in manager.stats()
+
+
+def test_failures_propagate_and_are_counted(manager):
+    async def run():
+        await manager.run_in_thread(int, "不是数字")
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    stats = manager.stats()["thread"]
+    assert stats["failed"] == 1 and stats["completed"] == 0
+
+
+def test_cpu_work_uses_process_pool_when_configured():
+    thread_only = ExecutorManager(thread_workers=1)
+    assert thread_only.cpu_executor is thread_only.thread_pool
+    thread_only.shutdown()
+
+    manager = ExecutorManager(thread_workers=1, process_workers=1)
+    try:
+        assert manager.cpu_executor is manager.process_pool
+        worker_pid = asyncio.run(manager.run_in_process(os.getpid))
+        assert worker_pid != os.getpid()
+        assert manager.stats()["process"]["completed"] == 1
+    finally:
+        manager.shutdown()
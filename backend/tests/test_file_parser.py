@@ -0,0 +1,54 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("app.config")
+
+from app.utils.coordinate_store import get_coordinate_store
+from app.utils.file_parser import DocumentParser
+
+
+def _write_pdf(path, pages):
+    """每页按行写入文本（Helvetica，等宽字体下 i 与 W 的字形宽度也不同）"""
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page(width=595, height=842)
+        for line_number, line in enumerate(lines):
+            page.insert_text((72, 100 + line_number * 20), line, fontname="helv", fontsize=12)
+    doc.save(str(path))
+    doc.close()
+
+
+@pytest.fixture
+def parser():
+    # 只测试提取逻辑，不创建上传目录
+    return DocumentParser.__new__(DocumentParser)
+
+
+def test_extract_glyph_boxes(tmp_path, parser):
+    pdf_path = tmp_path / "contract.pdf"
+    _write_pdf(pdf_path, [["iiii WWWW", "Article 2"], ["Page two"]])
+
+    document_data = parser._extract_text_and_coordinates_sync(str(pdf_path))
+    full_text = document_data["full_text"]
+    assert full_text == "iiii WWWWArticle 2Page two"
+    assert document_data["page_offsets"] == [0, len("iiii WWWWArticle 2")]
+    assert [page["char_offset"] for page in document_data["pages"]] == document_data["page_offsets"]
+
+    store = get_coordinate_store(document_data)
+    assert len(store) == len(full_text)
+    assert store.pages.tolist() == [0] * 18 + [1] * 8
+    assert store.lines.tolist() == [0] * 9 + [1] * 9 + [0] * 8
+
+    # 逐字形矩形：同一行内从左到右排列，窄字母与宽字母的宽度不同（不是按span宽度均分）
+    first_line = store.bboxes[:9]
+    assert (first_line[1:, 0] >= first_line[:-1, 0]).all()
+    widths = first_line[:, 2] - first_line[:, 0]
+    assert widths[0] < widths[5]
+
+
+def test_unreadable_pdf_returns_empty_document(tmp_path, parser):
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    document_data = parser._extract_text_and_coordinates_sync(str(broken))
+    assert document_data["full_text"] == ""
+    assert document_data["page_offsets"] == [0]
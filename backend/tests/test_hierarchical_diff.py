@@ -0,0 +1,61 @@
+import asyncio
+
+from app.utils.diff_algorithms import MyersDiff
+from app.utils.diff_engine import DiffEngine
+from app.utils.hierarchical_diff import HierarchicalDiff, merge_opcodes
+from helpers import assert_valid_opcodes, edit_ops, make_document
+
+PARAGRAPHS = [
+    "第一条 本合同由甲乙双方签订。双方应遵守本合同约定。\n",
+    "第二条 乙方应于三十日内交付货物。交付地点为甲方仓库。\n",
+    "第三条 甲方应在验收合格后付款。付款方式为银行转账。\n",
+    "第四条 因本合同发生的争议，提交甲方所在地法院管辖。\n",
+]
+
+
+def test_only_changed_sentences_reach_char_level():
+    text1 = "".join(PARAGRAPHS * 20)
+    changed = list(PARAGRAPHS * 20)
+    changed[41] = changed[41].replace("三十日", "十五日")
+    text2 = "".join(changed)
+
+    differ = HierarchicalDiff(algorithm="myers")
+    opcodes = differ.get_opcodes(text1, text2)
+    assert_valid_opcodes(text1, text2, opcodes)
+    assert edit_ops(opcodes) == edit_ops(MyersDiff().get_opcodes(text1, text2))
+    # 只有被修改的那一句进入字符级对比
+    assert differ.char_level_chars == 2 * len("第二条 乙方应于三十日内交付货物。")
+
+
+def test_paragraph_insert_and_delete():
+    text1 = "".join(PARAGRAPHS)
+    text2 = PARAGRAPHS[0] + "第一条之一 新增条款内容。\n" + PARAGRAPHS[1] + PARAGRAPHS[3]
+    differ = HierarchicalDiff()
+    opcodes = differ.get_opcodes(text1, text2)
+    assert_valid_opcodes(text1, text2, opcodes)
+    inserted = len(PARAGRAPHS[0])
+    deleted = len(PARAGRAPHS[0]) + len(PARAGRAPHS[1])
+    assert edit_ops(opcodes) == [
+        ('insert', inserted, inserted, inserted, inserted + len("第一条之一 新增条款内容。\n")),
+        ('delete', deleted, deleted + len(PARAGRAPHS[2]), deleted + len("第一条之一 新增条款内容。\n"), deleted + len("第一条之一 新增条款内容。\n")),
+    ]
+    # 整段增删在段落层级即可确定，不进入字符级对比
+    assert differ.char_level_chars == 0
+
+
+def test_merge_opcodes_joins_adjacent_edits():
+    opcodes = [('equal', 0, 2, 0, 2), ('delete', 2, 3, 2, 2), ('insert', 3, 3, 2, 4), ('equal', 3, 5, 4, 6), ('equal', 5, 6, 6, 7)]
+    assert merge_opcodes(opcodes) == [('equal', 0, 2, 0, 2), ('replace', 2, 3, 2, 4), ('equal', 3, 6, 4, 7)]
+
+
+def test_hierarchical_granularity_keeps_diff_item_shape():
+    standard = make_document([[p.rstrip("\n") for p in PARAGRAPHS]])
+    target_lines = [p.rstrip("\n") for p in PARAGRAPHS]
+    target_lines[1] = target_lines[1].replace("三十日", "九十日")
+    target = make_document([target_lines])
+
+    char_result = asyncio.run(DiffEngine(granularity="char", max_workers=1).compare_documents(standard, target))
+    hierarchical_result = asyncio.run(DiffEngine(granularity="hierarchical", max_workers=1).compare_documents(standard, target))
+    assert [item["status"] for item in hierarchical_result["diff_list"]] == [item["status"] for item in char_result["diff_list"]] == ["MODIFY"]
+    assert hierarchical_result["diff_list"][0]["old_text"] == "三"
+    assert hierarchical_result["diff_list"][0]["new_text"] == "九"
@@ -0,0 +1,71 @@
+import numpy as np
+
+from app.utils.highlight_coalescer import coalesce_highlights, coalesce_line_rects, group_annotations
+
+
+def _line(x0, y0, count, width=10.0, height=12.0):
+    """一行上逐字相接的字符矩形"""
+    return [[x0 + i * width, y0, x0 + (i + 1) * width, y0 + height] for i in range(count)]
+
+
+def test_adjacent_chars_merge_into_line_rect():
+    rects = _line(100, 200, 4)
+    line_rects, statuses, diff_ids = coalesce_line_rects(rects, ["MODIFY"] * 4, [(0, 10 + i, 11 + i) for i in range(4)])
+    np.testing.assert_allclose(line_rects, [[100, 200, 140, 212]])
+    assert statuses == ["MODIFY"]
+    assert diff_ids == [0]
+
+
+def test_separate_diffs_and_statuses_stay_apart():
+    rects = _line(100, 200, 4)
+    statuses = ["MODIFY", "MODIFY", "MODIFY", "ADD"]
+    spans = [(0, 10, 11), (0, 11, 12), (1, 12, 13), (2, 13, 14)]
+    line_rects, line_statuses, diff_ids = coalesce_line_rects(rects, statuses, spans)
+    assert len(line_rects) == 3
+    assert line_statuses == ["MODIFY", "MODIFY", "ADD"]
+    assert diff_ids == [0, 1, 2]
+
+
+def test_non_consecutive_indexes_do_not_merge():
+    """同一差异项内字符索引不连续（中间隔着未修改的字）时不合并"""
+    rects = _line(100, 200, 2)
+    line_rects, _, _ = coalesce_line_rects(rects, ["MODIFY"] * 2, [(0, 10, 11), (0, 12, 13)])
+    assert len(line_rects) == 2
+
+
+def test_gap_of_one_char_does_not_merge():
+    rects = [[100, 200, 110, 212], [122, 200, 132, 212]]
+    line_rects, _, _ = coalesce_line_rects(rects, ["DELETE"] * 2)
+    assert len(line_rects) == 2
+    line_rects, _, _ = coalesce_line_rects([[100, 200, 110, 212], [111, 200, 121, 212]], ["DELETE"] * 2)
+    assert len(line_rects) == 1
+
+
+def test_different_lines_do_not_merge():
+    rects = _line(100, 200, 2) + _line(100, 216, 2)
+    line_rects, _, _ = coalesce_line_rects(rects, ["ADD"] * 4)
+    np.testing.assert_allclose(line_rects, [[100, 200, 120, 212], [100, 216, 120, 228]])
+
+
+def test_wrapped_diff_becomes_one_annotation():
+    """跨行的一处修改合并为一个多矩形注释，下一个差异项另起一个注释"""
+    rects = _line(400, 200, 3) + _line(100, 216, 2) + _line(300, 216, 1)
+    statuses = ["MODIFY"] * 5 + ["ADD"]
+    spans = [(0, 20 + i, 21 + i) for i in range(5)] + [(1, 40, 41)]
+    annotations = coalesce_highlights(rects, statuses, spans)
+    assert annotations == [
+        ("MODIFY", [[400.0, 200.0, 430.0, 212.0], [100.0, 216.0, 120.0, 228.0]]),
+        ("ADD", [[300.0, 216.0, 310.0, 228.0]]),
+    ]
+
+
+def test_distant_lines_are_separate_annotations():
+    line_rects = np.array([[100, 200, 200, 212], [100, 400, 200, 412]], dtype=np.float64)
+    annotations = group_annotations(line_rects, ["DELETE", "DELETE"], [0, 0])
+    assert len(annotations) == 2
+
+
+def test_empty_input():
+    line_rects, statuses, diff_ids = coalesce_line_rects([], [])
+    assert len(line_rects) == 0 and statuses == [] and diff_ids == []
+    assert coalesce_highlights([], []) == []
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.utils.diff_algorithms import MyersDiff
+from app.utils.diff_engine import DiffEngine
+from app.utils.move_detector import LEADING_NUMBER_PATTERN, MoveDetector
+from helpers import edit_ops, make_document
+
+CLAUSES = [
+    "第1条 本合同自双方签字盖章之日起生效。",
+    "第2条 乙方应保证所提供服务符合国家相关标准。",
+    "第3条 甲方应在收到发票后三十日内支付全部款项。",
+    "第4条 任何一方违约应向守约方支付违约金。",
+    "第5条 本合同一式两份，双方各执一份。",
+]
+
+
+def _detect(text1, text2):
+    return MoveDetector().detect(text1, text2, edit_ops(MyersDiff().get_opcodes(text1, text2)))
+
+
+def _assert_no_touching_edits(operations):
+    for previous, current in zip(operations, operations[1:]):
+        if 'move' not in (previous[0], current[0]):
+            assert not (previous[2] == current[1] and previous[4] == current[3]), (previous, current)
+
+
+def test_moved_clause_becomes_one_move():
+    text1 = "".join(CLAUSES)
+    text2 = "".join([CLAUSES[0], CLAUSES[2], CLAUSES[3], CLAUSES[1], CLAUSES[4]])
+    operations = _detect(text1, text2)
+    moves = [op for op in operations if op[0] == 'move']
+    assert len(moves) == 1
+    _, i1, i2, j1, j2 = moves[0]
+    assert CLAUSES[1] in text1[i1:i2] and CLAUSES[1] in text2[j1:j2]
+    assert all(CLAUSES[1] not in text1[op[1]:op[2]] + text2[op[3]:op[4]] for op in operations if op[0] != 'move')
+
+
+def test_renumbered_moved_clause_is_still_a_move():
+    """移动后条款重新编号，编号不计入指纹"""
+    text1 = "".join(CLAUSES)
+    body = CLAUSES[1].split(" ", 1)[1]
+    text2 = "".join([CLAUSES[0], CLAUSES[2].replace("第3条", "第2条"), CLAUSES[3].replace("第4条", "第3条"), "第4条 " + body, CLAUSES[4]])
+    moves = [op for op in _detect(text1, text2) if op[0] == 'move']
+    assert len(moves) == 1
+    assert body in text2[moves[0][3]:moves[0][4]]
+
+
+@pytest.mark.parametrize("sentence, stripped", [
+    ("第12条 乙方应按时交货。", " 乙方应按时交货。"),
+    ("3.2 付款方式为银行转账。", " 付款方式为银行转账。"),
+    ("（二）甲方负责验收。", "甲方负责验收。"),
+    ("五、争议解决", "争议解决"),
+    ("1.5倍的违约金", "1.5倍的违约金"),
+    ("3.5%的年利率", "3.5%的年利率"),
+    ("100万元以内", "100万元以内"),
+])
+def test_leading_number_pattern(sentence, stripped):
+    assert LEADING_NUMBER_PATTERN.sub('', sentence, count=1) == stripped
+
+
+def test_short_sentences_are_not_moves():
+    text1 = "甲方付款。乙方交货。双方签字。"
+    text2 = "乙方交货。甲方付款。双方签字。"
+    assert all(op[0] != 'move' for op in _detect(text1, text2))
+
+
+def test_slid_deletions_are_merged():
+    """滑动到句子边界后首尾相接的删除合并为一个操作，而不是两个相邻的删除项"""
+    sentences = ["本合同自签订之日起生效。", "甲方应当按期付款。", "双方应当保守秘密。", "违约方应当赔偿损失。", "甲方应当按期验收。"]
+    text1 = "".join(sentences[:3] + sentences[3:5] + sentences[1:3])
+    text2 = "".join(sentences[:3] + sentences[1:3] + sentences[4:5])
+    operations = _detect(text1, text2)
+    _assert_no_touching_edits(operations)
+    deletes = [op for op in operations if op[0] == 'delete']
+    assert len(deletes) == 1
+    assert "违约方应当赔偿损失。" in text1[deletes[0][1]:deletes[0][2]]
+
+
+def test_engine_reports_single_move_item():
+    standard = make_document([CLAUSES])
+    target = make_document([[CLAUSES[0], CLAUSES[2], CLAUSES[3], CLAUSES[1], CLAUSES[4]]])
+    result = asyncio.run(DiffEngine(max_workers=1).compare_documents(standard, target))
+    statuses = [item["status"] for item in result["diff_list"]]
+    assert statuses.count("MOVE") == 1
+    move = next(item for item in result["diff_list"] if item["status"] == "MOVE")
+    assert {entry["doc_index"] for group in move["diff"] for entry in group} == {1, 2}
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.diff_algorithms import MyersDiff
+from app.utils.parallel_diff import ParallelDiffRunner
+from app.utils.text_normalizer import TextNormalizer
+from helpers import assert_valid_opcodes, edit_ops, make_document
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """记录提交的任务数和执行线程"""
+
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = 0
+        self.threads = set()
+
+    def submit(self, fn, *args, **kwargs):
+        self.submitted += 1
+
+        def run():
+            self.threads.add(threading.get_ident())
+            return fn(*args, **kwargs)
+        return super().submit(run)
+
+
+def _pages(count: int, edits=()):
+    """count 页，每页10句各不相同的条款；edits 中的 (页, 句) 改为修改后的文本"""
+    pages = []
+    for page in range(count):
+        lines = [f"第{page * 10 + line + 1}条 甲方应于第{page}页第{line}句约定的期限内履行义务。" for line in range(10)]
+        for edit_page, edit_line in edits:
+            if edit_page == page:
+                lines[edit_line] = lines[edit_line].replace("甲方", "乙方")
+        pages.append(lines)
+    return pages
+
+
+def test_sections_cover_both_texts_and_cut_in_equal_content():
+    standard = make_document(_pages(12))
+    target = make_document(_pages(12, edits=[(2, 3), (7, 5)]))
+    text1, text2 = standard["full_text"], target["full_text"]
+    sections = ParallelDiffRunner(max_workers=2).split_sections(text1, text2, standard)
+
+    assert len(sections) > 2
+    assert sections[0][0] == 0 and sections[0][2] == 0
+    assert sections[-1][1] == len(text1) and sections[-1][3] == len(text2)
+    for previous, current in zip(sections, sections[1:]):
+        assert previous[1] == current[0] and previous[3] == current[2]
+        # 切分点两侧的内容一致
+        assert text1[current[0]:current[0] + 10] == text2[current[2]:current[2] + 10]
+
+
+def test_parallel_opcodes_match_sequential_diff():
+    standard = make_document(_pages(12))
+    target = make_document(_pages(12, edits=[(2, 3), (7, 5), (11, 9)]))
+    text1, text2 = standard["full_text"], target["full_text"]
+
+    executor = CountingExecutor()
+    runner = ParallelDiffRunner(algorithm="myers", max_workers=2, executor=executor)
+    opcodes = asyncio.run(runner.get_opcodes(text1, text2, standard))
+    executor.shutdown()
+
+    assert_valid_opcodes(text1, text2, opcodes)
+    assert edit_ops(opcodes) == edit_ops(MyersDiff().get_opcodes(text1, text2))
+    # 只有包含修改的区段被提交，且都不在事件循环线程上计算
+    sections = runner.split_sections(text1, text2, standard)
+    assert executor.submitted == 3 < len(sections)
+    assert threading.get_ident() not in executor.threads
+
+
+def test_single_changed_section_runs_off_the_event_loop():
+    standard = make_document(_pages(6))
+    target = make_document(_pages(6, edits=[(4, 1)]))
+    text1, text2 = standard["full_text"], target["full_text"]
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        executor = CountingExecutor()
+        loop.set_default_executor(executor)
+        opcodes = await ParallelDiffRunner(max_workers=2).get_opcodes(text1, text2, standard)
+        return opcodes, executor
+
+    opcodes, executor = asyncio.run(run())
+    assert_valid_opcodes(text1, text2, opcodes)
+    assert executor.submitted == 1
+    assert threading.get_ident() not in executor.threads
+
+
+def test_sections_on_normalized_text():
+    """归一化文本上切分时，页边界先换算为归一化偏移"""
+    pages = [[line.replace("甲方", "甲 方") for line in lines] for lines in _pages(8)]
+    standard = make_document(pages)
+    target = make_document(_pages(8, edits=[(5, 2)]))
+    normalizer = TextNormalizer(("cjk_spaces",))
+    text1, offset_map = normalizer.normalize(standard["full_text"])
+    text2, _ = normalizer.normalize(target["full_text"])
+
+    runner = ParallelDiffRunner(algorithm="myers", max_workers=2)
+    for a_start, a_end, b_start, b_end in runner.split_sections(text1, text2, standard, offset_map):
+        assert 0 <= a_start <= a_end <= len(text1)
+    opcodes = asyncio.run(runner.get_opcodes(text1, text2, standard, offset_map))
+    assert_valid_opcodes(text1, text2, opcodes)
+    assert len(edit_ops(opcodes)) == 1
@@ -0,0 +1,68 @@
+from app.utils.result_codec import ColumnarResult, decode_result, encode_result, get_diff_count, get_diff_list, is_encoded
+
+
+def _entry(text, start, page_index, line_index, doc_index, rect):
+    return {
+        "text": text,
+        "page_index": page_index,
+        "line_index": line_index,
+        "doc_index": doc_index,
+        "char_polygons": [rect],
+        "polygon": [0, 0, 0, 0, 0, 0, 0, 0],
+        "sub_info": [{
+            "page_id": page_index,
+            "sub_polygons": list(rect),
+            "sub_text_index": {"start_index": start, "length": len(text)}
+        }],
+        "sub_type": ""
+    }
+
+
+def _sample_result():
+    irregular = {"text": "两", "page_index": 0, "doc_index": 1, "char_polygons": [[1, 2, 3, 4], [5, 6, 7, 8]]}
+    return {
+        "summary": {"total": 3},
+        "ai_review_enabled": False,
+        "diff_list": [
+            {
+                "diff_id": "diff_1",
+                "status": "MODIFY",
+                "old_text": "三十日",
+                "new_text": "十五日",
+                "diff": [
+                    [_entry("三十", 12, 0, 3, 1, [100.5, 200.25, 124.5, 212.0])],
+                    [_entry("十五", 14, 0, 3, 2, [100.5, 200.25, 124.5, 212.0]), irregular],
+                ]
+            },
+            {"diff_id": "diff_2", "status": "ADD", "diff": []},
+            {"diff_id": "diff_3", "status": "DELETE", "old_text": "无高亮"},
+        ]
+    }
+
+
+def test_result_codec_round_trip():
+    result = _sample_result()
+    encoded = encode_result(result)
+
+    assert is_encoded(encoded)
+    assert not is_encoded(result)
+    assert "diff_list" not in encoded
+    assert encoded["summary"] == result["summary"]
+    assert get_diff_count(encoded) == 3
+    assert get_diff_list(encoded) == result["diff_list"]
+
+    columnar = ColumnarResult(encoded)
+    assert len(columnar) == 3
+    assert columnar.item(2) == result["diff_list"][2]
+    assert columnar.to_columns()["texts"] == "三十十五"
+
+    assert decode_result(encoded) == result
+
+
+def test_result_codec_legacy_result():
+    result = _sample_result()
+    assert get_diff_list(result) is result["diff_list"]
+    assert get_diff_count(result) == 3
+    assert get_diff_list(None) == []
+    assert decode_result(result) is result
+    assert decode_result(None) is None
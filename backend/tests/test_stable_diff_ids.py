@@ -0,0 +1,61 @@
+import asyncio
+
+from app.utils.diff_engine import STABLE_DIFF_ID_PATTERN, DiffEngine
+from helpers import make_document
+
+
+def _pages(edits=()):
+    lines = [f"第{index + 1}条 甲方应于第{index}项约定的期限内履行相应的合同义务。" for index in range(8)]
+    for line_index, old, new in edits:
+        lines[line_index] = lines[line_index].replace(old, new)
+    return [lines[:4], lines[4:]]
+
+
+def _diff_ids(standard_pages, target_pages, **options):
+    result = asyncio.run(DiffEngine(max_workers=1, **options).compare_documents(make_document(standard_pages), make_document(target_pages)))
+    return [item["diff_id"] for item in result["diff_list"]]
+
+
+def test_ids_are_content_addressed_and_repeatable():
+    target = _pages(edits=[(1, "甲方", "乙方"), (6, "期限", "时限")])
+    diff_ids = _diff_ids(_pages(), target)
+    assert len(diff_ids) == 2
+    assert all(STABLE_DIFF_ID_PATTERN.match(diff_id) for diff_id in diff_ids)
+    # 重新对比（新的引擎实例）得到相同的ID
+    assert _diff_ids(_pages(), target) == diff_ids
+
+
+def test_unrelated_edit_keeps_other_ids():
+    before = _diff_ids(_pages(), _pages(edits=[(1, "甲方", "乙方"), (6, "期限", "时限")]))
+    # 第4条的修改距离其他差异超过上下文长度，不影响它们的ID
+    after = _diff_ids(_pages(), _pages(edits=[(1, "甲方", "乙方"), (3, "合同", "协议"), (6, "期限", "时限")]))
+    assert len(after) == 3
+    assert after[0] == before[0] and after[2] == before[1]
+    assert after[1] not in before
+
+    # 差异本身的内容变化时ID随之变化
+    changed = _diff_ids(_pages(), _pages(edits=[(1, "甲方", "丙方"), (6, "期限", "时限")]))
+    assert changed[0] != before[0] and changed[1] == before[1]
+
+
+def test_repeated_diffs_in_the_same_context_are_numbered():
+    engine = DiffEngine()
+    text1, text2 = "甲方应付款", "乙方应付款"
+    first = engine._stable_diff_id("MODIFY", text1, text2, 0, 1, 0, 1)
+    second = engine._stable_diff_id("MODIFY", text1, text2, 0, 1, 0, 1)
+    assert second == f"{first}_2"
+    assert STABLE_DIFF_ID_PATTERN.match(second)
+    # 早期按序号生成的ID不匹配
+    assert not STABLE_DIFF_ID_PATTERN.match("diff_3")
+
+
+def test_streamed_ids_match_full_comparison():
+    standard = make_document(_pages())
+    target = make_document(_pages(edits=[(1, "甲方", "乙方"), (6, "期限", "时限")]))
+    engine = DiffEngine(max_workers=1)
+
+    async def stream():
+        return [item["diff_id"] async for event in engine.iter_compare_documents(standard, target) if event["type"] == "page" for item in event["diff_list"]]
+
+    streamed = asyncio.run(stream())
+    assert streamed == [item["diff_id"] for item in asyncio.run(engine.compare_documents(standard, target))["diff_list"]]
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.diff_engine import DiffEngine
+from app.utils.parallel_diff import compute_opcodes_within_budget
+from helpers import make_document
+
+LAST_PAGE_MARKER = "最后一页"
+
+
+class HoldLastSectionExecutor(ThreadPoolExecutor):
+    """最后一页所在区段的对比等待 release 之后才开始"""
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.release = threading.Event()
+
+    def submit(self, fn, *args, **kwargs):
+        if fn is compute_opcodes_within_budget and LAST_PAGE_MARKER in args[0]:
+            def held():
+                assert self.release.wait(5)
+                return fn(*args, **kwargs)
+            return super().submit(held)
+        return super().submit(fn, *args, **kwargs)
+
+
+def _pages(edits=(), last_line=None):
+    pages = []
+    for page in range(5):
+        lines = [f"第{page * 6 + line + 1}条 甲方应于第{page}页第{line}句约定的期限内履行义务。" for line in range(6)]
+        for edit_page, edit_line in edits:
+            if edit_page == page:
+                lines[edit_line] = lines[edit_line].replace("甲方", "乙方")
+        pages.append(lines)
+    pages[-1][-1] = last_line or f"{LAST_PAGE_MARKER}：本合同一式两份，双方各执一份。"
+    return pages
+
+
+async def _collect(engine, standard, target):
+    return [event async for event in engine.iter_compare_documents(standard, target)]
+
+
+def test_first_page_is_emitted_before_the_whole_diff_finishes():
+    standard = make_document(_pages())
+    target = make_document(_pages(edits=[(0, 2), (2, 4)], last_line=f"{LAST_PAGE_MARKER}：本合同一式三份，双方各执一份。"))
+    executor = HoldLastSectionExecutor()
+    engine = DiffEngine(executor=executor)
+
+    async def run():
+        events = engine.iter_compare_documents(standard, target)
+        # 最后一页的区段还未开始计算时，第一页的差异已经产出
+        first = await asyncio.wait_for(events.__anext__(), timeout=2)
+        executor.release.set()
+        return [first] + [event async for event in events]
+
+    events = asyncio.run(run())
+    executor.shutdown()
+    assert events[0]["type"] == "page" and events[0]["page_index"] == 0
+    assert [event["page_index"] for event in events[:-1]] == [0, 2, 4]
+    assert events[-1]["type"] == "summary"
+    assert events[-1]["summary"]["total_differences"] == 3
+
+
+def test_each_standard_page_is_emitted_once():
+    """新增项按插入位置所在的标准文档页分批，同一页不会出现在多个事件中"""
+    standard_pages = _pages()
+    target_pages = _pages(edits=[(1, 0), (3, 5)])
+    # 标准文档第3页开头新增一句，在目标文档中排在第2页末尾
+    target_pages[2].append("第十三条之一 新增的保密条款内容。")
+    target_pages[3][0] = target_pages[3][0].replace("甲方", "乙方")
+    standard = make_document(standard_pages)
+    target = make_document(target_pages)
+
+    events = asyncio.run(_collect(DiffEngine(max_workers=1), standard, target))
+    page_events = [event for event in events if event["type"] == "page"]
+    pages = [event["page_index"] for event in page_events]
+    assert pages == sorted(set(pages))
+
+    streamed = [item for event in page_events for item in event["diff_list"]]
+    full = asyncio.run(DiffEngine(max_workers=1).compare_documents(standard, target))["diff_list"]
+    assert [(item["status"], item["diff_text"]) for item in streamed] == [(item["status"], item["diff_text"]) for item in full]
+    added = next(item for item in streamed if item["status"] == "ADD")
+    assert added["page_index"] == 2
+    assert added in next(event for event in page_events if event["page_index"] == 3)["diff_list"]
@@ -0,0 +1,69 @@
+import asyncio
+import random
+
+import pytest
+
+from app.utils.diff_engine import DiffEngine
+from app.utils.text_normalizer import TRANSLATE_RULES, OffsetMap, TextNormalizer
+from helpers import make_document
+
+ALL_RULES = ("fullwidth", "cjk_spaces", "hyphenation")
+
+
+def _random_texts(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    alphabet = ["甲", "方", "款", "A", "b", "1", "，", "（", "）", "Ａ", "１", " ", "  ", "　", "\n", "\u00ad", "-"]
+    return [" 甲 方 ", "\u00ad", ""] + ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("text", _random_texts(200))
+def test_offset_map_round_trip(text):
+    normalized, offset_map = TextNormalizer(ALL_RULES).normalize(text)
+    translate_table = TRANSLATE_RULES["fullwidth"]
+
+    # 归一化文本的每个字符都能映射回原文中对应的字符
+    for index, char in enumerate(normalized):
+        assert text[offset_map.to_original(index)].translate(translate_table) == char
+    # 归一化位置 -> 原文 -> 归一化 不变
+    for index in range(len(normalized) + 1):
+        assert offset_map.to_normalized(offset_map.to_original(index)) == index
+    # 原文位置映射到归一化文本后单调不减，且落在范围内
+    positions = [offset_map.to_normalized(index) for index in range(len(text) + 1)]
+    assert positions == sorted(positions)
+    assert positions[0] == 0 and positions[-1] == len(normalized)
+
+
+def test_positions_inside_deleted_runs_clamp_to_deletion_point():
+    text = "甲  方款"
+    normalized, offset_map = TextNormalizer(("cjk_spaces",)).normalize(text)
+    assert normalized == "甲方款"
+    assert [offset_map.to_normalized(index) for index in range(len(text) + 1)] == [0, 1, 1, 1, 2, 3]
+    assert [offset_map.to_original(index) for index in range(len(normalized) + 1)] == [0, 3, 4, 5]
+
+
+def test_identity_map():
+    offset_map = OffsetMap()
+    assert offset_map.to_original(5) == 5 and offset_map.to_normalized(5) == 5
+
+
+def test_rules():
+    assert TextNormalizer().normalize("甲 方，")[0] == "甲 方，"
+    assert TextNormalizer(("fullwidth",)).normalize("（１）ＡＢ")[0] == "(1)AB"
+    assert TextNormalizer(("cjk_spaces",)).normalize("甲 方 A B")[0] == "甲方 A B"
+    # 只删除软连字符；普通连字符和换行保留
+    assert TextNormalizer(("hyphenation",)).normalize("con\u00adtract co-\noperate")[0] == "contract co-\noperate"
+    with pytest.raises(ValueError):
+        TextNormalizer(("unknown",))
+
+
+def test_engine_reports_original_offsets():
+    standard = make_document([["甲 方应于三十日内付款。", "乙方（卖方）负责运输。"]])
+    target = make_document([["甲方应于三十日内付清款项。", "乙方(卖方)负责运输。"]])
+    engine = DiffEngine(normalize_rules=ALL_RULES, max_workers=1)
+    diff_list = asyncio.run(engine.compare_documents(standard, target))["diff_list"]
+
+    # 字间空格和全角括号不产生差异，真实修改的位置指向原文
+    assert [item["status"] for item in diff_list] == ["ADD", "ADD"]
+    assert [item["new_text"] for item in diff_list] == ["清", "项"]
+    for item in diff_list:
+        assert target["full_text"][item["diff_start"]:item["diff_start"] + item["diff_length"]] == item["new_text"]
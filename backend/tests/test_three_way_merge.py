@@ -0,0 +1,58 @@
+from app.utils.diff_algorithms import MyersDiff
+from app.utils.three_way_merge import ORIGIN_BOTH, ORIGIN_CONFLICT, ORIGIN_STANDARD, ORIGIN_TARGET, ThreeWayMerger
+
+
+def _merge(base, standard, target):
+    differ = MyersDiff()
+    return ThreeWayMerger().merge(base, standard, target, differ.get_opcodes(base, standard), differ.get_opcodes(base, target))
+
+
+def _texts(region, base, standard, target):
+    _, base_start, base_end, standard_start, standard_end, target_start, target_end = region
+    return base[base_start:base_end], standard[standard_start:standard_end], target[target_start:target_end]
+
+
+def test_conflicting_edits():
+    base = "甲方应于三十日内付款，逾期按日计息。"
+    standard = "甲方应于九十日内付款，逾期按日计息。"
+    target = "甲方应于六十日内付款，逾期按日计息。"
+    regions = _merge(base, standard, target)
+
+    assert [region[0] for region in regions] == [ORIGIN_CONFLICT]
+    assert _texts(regions[0], base, standard, target) == ("三", "九", "六")
+
+
+def test_identical_edits_are_not_conflicts():
+    base = "乙方应按月提交报告。"
+    changed = "乙方应按季度提交报告。"
+    regions = _merge(base, changed, changed)
+    assert [region[0] for region in regions] == [ORIGIN_BOTH]
+
+
+def test_one_sided_edits():
+    base = "第一条 合同期限为一年。第二条 付款方式为转账。"
+    standard = "第一条 合同期限为两年。第二条 付款方式为转账。"
+    target = "第一条 合同期限为一年。第二条 付款方式为现金。"
+    regions = _merge(base, standard, target)
+
+    assert [region[0] for region in regions] == [ORIGIN_STANDARD, ORIGIN_TARGET]
+    assert _texts(regions[0], base, standard, target) == ("一", "两", "一")
+    assert _texts(regions[1], base, standard, target) == ("转账", "转账", "现金")
+
+
+def test_adjacent_edits_form_one_conflict():
+    base = "违约金为合同总额的百分之五。"
+    standard = "违约金为合同总额的百分之十。"
+    target = "违约金为合同总价的百分之五。"
+    regions = _merge(base, standard, target)
+    assert [region[0] for region in regions] == [ORIGIN_TARGET, ORIGIN_STANDARD]
+
+    # 相接的修改归入同一区域
+    target = "违约金为合同总额的百分比五。"
+    regions = _merge(base, standard, target)
+    assert [region[0] for region in regions] == [ORIGIN_CONFLICT]
+
+
+def test_unchanged_documents():
+    base = "本合同一式两份。"
+    assert _merge(base, base, base) == []
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import app.utils.token_diff as token_diff
+from app.utils.diff_engine import DiffEngine
+from app.utils.token_diff import TokenDiff, Tokenizer, semantic_cleanup
+from helpers import assert_valid_opcodes, edit_ops, make_document
+
+
+@pytest.fixture(autouse=True)
+def without_jieba(monkeypatch):
+    # 中文按单字切分，结果不依赖 jieba 词典
+    monkeypatch.setattr(token_diff, "jieba", None)
+
+
+def _tokens(text):
+    return [text[start:end] for start, end in Tokenizer().split(text)]
+
+
+def test_tokenizer_keeps_dates_and_amounts_whole():
+    text = "于2024年1月1日前支付3,000,000元（含12.5%税）at once"
+    tokens = _tokens(text)
+    assert "".join(tokens) == text
+    assert "2024年1月1日" in tokens
+    assert "3,000,000" in tokens
+    assert "12.5%" in tokens
+    assert tokens[:2] == ["于", "2024年1月1日"]
+    assert tokens[-3:] == ["at", " ", "once"]
+    assert _tokens("2024-01-01") == ["2024-01-01"]
+
+
+def _token_opcodes(text1, text2):
+    opcodes = TokenDiff("myers").get_opcodes(text1, text2, 0, len(text1), 0, len(text2))
+    assert_valid_opcodes(text1, text2, opcodes)
+    return opcodes
+
+
+def test_changed_amount_is_one_replacement():
+    text1 = "合同总价为3,000,000元。"
+    text2 = "合同总价为3,500,000元。"
+    assert edit_ops(_token_opcodes(text1, text2)) == [('replace', 5, 14, 5, 14)]
+
+    text1 = "乙方应于2024年1月1日前交付。"
+    text2 = "乙方应于2024年3月1日前交付。"
+    (tag, i1, i2, j1, j2), = edit_ops(_token_opcodes(text1, text2))
+    assert (tag, text1[i1:i2], text2[j1:j2]) == ('replace', "2024年1月1日", "2024年3月1日")
+
+
+def test_semantic_cleanup_absorbs_short_equalities():
+    # 两处修改之间只隔一个字符，合并为一处替换
+    opcodes = [('equal', 0, 2, 0, 2), ('replace', 2, 4, 2, 4), ('equal', 4, 5, 4, 5), ('replace', 5, 7, 5, 7), ('equal', 7, 9, 7, 9)]
+    assert semantic_cleanup(opcodes) == [('equal', 0, 2, 0, 2), ('replace', 2, 7, 2, 7), ('equal', 7, 9, 7, 9)]
+
+    # 相同片段不短于前一处修改时保留
+    opcodes = [('replace', 0, 1, 0, 1), ('equal', 1, 3, 1, 3), ('replace', 3, 6, 3, 6)]
+    assert semantic_cleanup(opcodes) == opcodes
+    # 相同片段超过 max_equal 时保留
+    opcodes = [('replace', 0, 10, 0, 10), ('equal', 10, 15, 10, 15), ('replace', 15, 25, 15, 25)]
+    assert semantic_cleanup(opcodes) == opcodes
+
+
+def test_inserted_clause_does_not_swallow_neighbouring_edit():
+    text1 = "甲方付款。乙方交货。"
+    text2 = "甲方付款，并提供发票。乙方发货。"
+    opcodes = _token_opcodes(text1, text2)
+    changes = [(text1[i1:i2], text2[j1:j2]) for tag, i1, i2, j1, j2 in edit_ops(opcodes)]
+    assert changes == [("", "，并提供发票"), ("交", "发")]
+
+
+def test_engine_token_granularity():
+    standard = make_document([["合同总价为3,000,000元，", "于2024年1月1日前付清。"]])
+    target = make_document([["合同总价为3,500,000元，", "于2024年1月1日前付清。"]])
+    result = asyncio.run(DiffEngine(granularity="token", max_workers=1).compare_documents(standard, target))
+    assert [(item["status"], item["old_text"], item["new_text"]) for item in result["diff_list"]] == [("MODIFY", "3,000,000", "3,500,000")]
@@ -122,6 +122,8 @@ const DiffSidebar: React.FC<DiffSidebarProps> = ({
         return '#faad14';  // 橙色表示修改
       case 'MOVE':
         return '#1890ff';
+      case 'CONFLICT':
+        return '#722ed1';
       default:
         return '#d9d9d9';
     }
@@ -138,6 +140,8 @@ const DiffSidebar: React.FC<DiffSidebarProps> = ({
         return <EditOutlined style={{ color: '#faad14' }} />;
       case 'MOVE':
         return <EditOutlined style={{ color: '#1890ff' }} />;
+      case 'CONFLICT':
+        return <EditOutlined style={{ color: '#722ed1' }} />;
       default:
         return null;
     }
@@ -154,6 +158,8 @@ const DiffSidebar: React.FC<DiffSidebarProps> = ({
         return '修改';
       case 'MOVE':
         return '移动';
+      case 'CONFLICT':
+        return '冲突';
       default:
         return status;
     }
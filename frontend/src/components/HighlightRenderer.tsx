@@ -1,4 +1,4 @@
-import React, { useRef, useEffect, useCallback, useState } from 'react';
+import React, { useRef, useEffect, useCallback, useMemo, useState } from 'react';
 import { DiffItem } from '../types/document';
 
 interface HighlightRendererProps {
@@ -8,10 +8,26 @@ interface HighlightRendererProps {
   canvasWidth: number;
   canvasHeight: number;
   onDiffClick: (diff: DiffItem) => void;
+  docIndex?: number;  // 只绘制该侧文档的高亮（1: 标准文档, 2: 目标文档），不传时两侧都绘制
   className?: string;
   style?: React.CSSProperties;
 }
 
+type Rect = [number, number, number, number];
+
+// 待合并的高亮矩形及其文本区间（全局字符索引，未知时为 -1）
+interface SourceRect {
+  rect: Rect;
+  start: number;
+  end: number;
+}
+
+// 单个差异在当前页的高亮矩形（同行相邻的字符矩形已合并）
+interface PageHighlight {
+  diff: DiffItem;
+  rects: Rect[];
+}
+
 interface HighlightStyle {
   color: string;
   opacity: number;
@@ -44,6 +60,12 @@ const DIFF_STYLES: Record<string, HighlightStyle> = {
     opacity: 0.3,
     strokeColor: '#1890ff',
     strokeWidth: 1
+  },
+  CONFLICT: {
+    color: '#722ed1',
+    opacity: 0.3,
+    strokeColor: '#722ed1',
+    strokeWidth: 1
   }
 };
 
@@ -95,6 +117,41 @@ class CoordinateTransformer {
     const [x0, y0, x1, y1] = rect;
     return x >= x0 && x <= x1 && y >= y0 && y <= y1;
   }
+
+  /**
+   * 合并同一行上相接且字符连续的矩形（输入为同一差异、同一侧文档的矩形，按阅读顺序）
+   * 判定规则与后端 highlight_coalescer 一致：垂直重叠不少于较矮者高度的一半，水平间隙不超过行高的 0.15，
+   * 字符索引已知时还要求前一矩形的结束索引等于后一矩形的起始索引
+   * @param sources 矩形及其文本区间
+   * @returns 合并后的矩形列表
+   */
+  static coalesceRects(sources: SourceRect[]): Rect[] {
+    const merged: Rect[] = [];
+    let previous: SourceRect | null = null;
+    for (const source of sources) {
+      const { rect } = source;
+      const last = merged[merged.length - 1];
+      if (previous && last) {
+        const prevRect = previous.rect;
+        const height = Math.max(Math.min(prevRect[3] - prevRect[1], rect[3] - rect[1]), 0);
+        const overlap = Math.min(prevRect[3], rect[3]) - Math.max(prevRect[1], rect[1]);
+        const consecutive = source.start < 0 || previous.end < 0 || source.start === previous.end;
+        if (consecutive && overlap >= height * 0.5 && rect[0] - prevRect[2] <= height * 0.15 && rect[0] >= prevRect[0]) {
+          merged[merged.length - 1] = [
+            Math.min(last[0], rect[0]),
+            Math.min(last[1], rect[1]),
+            Math.max(last[2], rect[2]),
+            Math.max(last[3], rect[3])
+          ];
+          previous = source;
+          continue;
+        }
+      }
+      merged.push([...rect]);
+      previous = source;
+    }
+    return merged;
+  }
 }
 
 const HighlightRenderer: React.FC<HighlightRendererProps> = ({
@@ -104,51 +161,68 @@ const HighlightRenderer: React.FC<HighlightRendererProps> = ({
   canvasWidth,
   canvasHeight,
   onDiffClick,
+  docIndex,
   className,
   style
 }) => {
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const [hoveredDiff, setHoveredDiff] = useState<DiffItem | null>(null);
 
-  // 绘制单个高亮
+  // 当前页各差异的高亮矩形，diffList 或页码变化时重新合并
+  const pageHighlights = useMemo<PageHighlight[]>(() => {
+    return diffList
+      .filter(diff => diff.page_index === pageIndex)
+      .map(diff => {
+        // 按文档分组后再合并，两侧文档的矩形不会合并到一起
+        const sourcesByDoc = new Map<number, SourceRect[]>();
+        (diff.diff || []).forEach(charGroup => {
+          charGroup.forEach(charInfo => {
+            if (charInfo.page_index !== pageIndex) return;
+            if (docIndex !== undefined && charInfo.doc_index !== docIndex) return;
+            const polygons = (charInfo.char_polygons || []).filter(polygon => polygon.length >= 4);
+            const textIndex = charInfo.sub_info?.[0]?.sub_text_index;
+            const start = textIndex && polygons.length === 1 ? textIndex.start_index : -1;
+            const end = textIndex && polygons.length === 1 ? textIndex.start_index + textIndex.length : -1;
+            const sources = sourcesByDoc.get(charInfo.doc_index) || [];
+            polygons.forEach(polygon => {
+              sources.push({ rect: [polygon[0], polygon[1], polygon[2], polygon[3]], start, end });
+            });
+            sourcesByDoc.set(charInfo.doc_index, sources);
+          });
+        });
+        const rects: Rect[] = [];
+        sourcesByDoc.forEach(sources => {
+          rects.push(...CoordinateTransformer.coalesceRects(sources));
+        });
+        return { diff, rects };
+      });
+  }, [diffList, pageIndex, docIndex]);
+
+  // 绘制单个差异的高亮：所有矩形放入同一路径，一次填充、一次描边
   const drawHighlight = useCallback((
     ctx: CanvasRenderingContext2D,
-    diff: DiffItem,
+    rects: Rect[],
     style: HighlightStyle,
     isHovered: boolean = false
   ) => {
-    // 获取差异的坐标信息
-    const charDiffs = diff.diff || [];
-    
-    charDiffs.forEach(charGroup => {
-      charGroup.forEach(charInfo => {
-        if (charInfo.page_index === pageIndex) {
-          const charPolygons = charInfo.char_polygons || [];
-          
-          charPolygons.forEach(polygon => {
-            if (polygon.length >= 4) {
-              const [x0, y0, x1, y1] = polygon;
-              
-              // 设置样式
-              ctx.fillStyle = style.color;
-              ctx.globalAlpha = isHovered ? style.opacity * 1.5 : style.opacity;
-              ctx.strokeStyle = style.strokeColor;
-              ctx.lineWidth = isHovered ? style.strokeWidth * 2 : style.strokeWidth;
-              
-              // 绘制高亮矩形
-              const width = x1 - x0;
-              const height = y1 - y0;
-              ctx.fillRect(x0, y0, width, height);
-              ctx.strokeRect(x0, y0, width, height);
-              
-              // 重置透明度
-              ctx.globalAlpha = 1.0;
-            }
-          });
-        }
-      });
+    if (rects.length === 0) return;
+
+    // 设置样式
+    ctx.fillStyle = style.color;
+    ctx.globalAlpha = isHovered ? style.opacity * 1.5 : style.opacity;
+    ctx.strokeStyle = style.strokeColor;
+    ctx.lineWidth = isHovered ? style.strokeWidth * 2 : style.strokeWidth;
+
+    ctx.beginPath();
+    rects.forEach(([x0, y0, x1, y1]) => {
+      ctx.rect(x0, y0, x1 - x0, y1 - y0);
     });
-  }, [pageIndex]);
+    ctx.fill();
+    ctx.stroke();
+
+    // 重置透明度
+    ctx.globalAlpha = 1.0;
+  }, []);
 
   // 渲染所有高亮
   const renderHighlights = useCallback(() => {
@@ -165,50 +239,31 @@ const HighlightRenderer: React.FC<HighlightRendererProps> = ({
     // 清除画布
     ctx.clearRect(0, 0, canvas.width, canvas.height);
     
-    // 获取当前页面的差异
-    const pageDiffs = diffList.filter(diff => diff.page_index === pageIndex);
-    
     // 绘制高亮
-    pageDiffs.forEach(diff => {
+    pageHighlights.forEach(({ diff, rects }) => {
       const style = DIFF_STYLES[diff.status] || DIFF_STYLES.ADD;
       const isHovered = hoveredDiff?.element_id === diff.element_id;
-      drawHighlight(ctx, diff, style, isHovered);
+      drawHighlight(ctx, rects, style, isHovered);
     });
     
-    console.log(`[HighlightRenderer] 页面 ${pageIndex} 渲染了 ${pageDiffs.length} 个高亮`);
-  }, [diffList, pageIndex, canvasWidth, canvasHeight, drawHighlight, hoveredDiff]);
+    console.log(`[HighlightRenderer] 页面 ${pageIndex} 渲染了 ${pageHighlights.length} 个高亮`);
+  }, [pageHighlights, pageIndex, canvasWidth, canvasHeight, drawHighlight, hoveredDiff]);
 
   // 查找点击的差异
   const findClickedDiff = useCallback((
     x: number,
     y: number
   ): DiffItem | null => {
-    const pageDiffs = diffList.filter(diff => diff.page_index === pageIndex);
-    
-    for (const diff of pageDiffs) {
-      const charDiffs = diff.diff || [];
-      
-      for (const charGroup of charDiffs) {
-        for (const charInfo of charGroup) {
-          if (charInfo.page_index === pageIndex) {
-            const charPolygons = charInfo.char_polygons || [];
-            
-            for (const polygon of charPolygons) {
-              if (polygon.length >= 4) {
-                const [x0, y0, x1, y1] = polygon;
-                
-                if (CoordinateTransformer.isPointInRect([x, y], [x0, y0, x1, y1])) {
-                  return diff;
-                }
-              }
-            }
-          }
+    for (const { diff, rects } of pageHighlights) {
+      for (const rect of rects) {
+        if (CoordinateTransformer.isPointInRect([x, y], rect)) {
+          return diff;
         }
       }
     }
     
     return null;
-  }, [diffList, pageIndex]);
+  }, [pageHighlights]);
 
   // 处理Canvas点击事件
   const handleCanvasClick = useCallback((event: React.MouseEvent<HTMLCanvasElement>) => {
@@ -64,7 +64,7 @@ export interface DiffReview {
 export interface DiffItem {
   element_id: string;
   type: string;
-  status: 'ADD' | 'DELETE' | 'MODIFY' | 'MOVE';
+  status: 'ADD' | 'DELETE' | 'MODIFY' | 'MOVE' | 'CONFLICT';
   page_index: number;
   elements: string;
   diff: Array<Array<{
@@ -94,4 +94,23 @@ export interface DiffItem {
   diff_length?: number;
   old_text?: string;
   new_text?: string;
+  // 三方对比：变更来源（standard 我方 / target 对方 / both 双方相同 / conflict 冲突）及基准版本文本
+  origin?: 'standard' | 'target' | 'both' | 'conflict';
+  base_text?: string;
+  // 超出对比预算而降级为行级/区段级对比的差异
+  coarse?: 'line' | 'section';
+  // 金额/百分比/日期/期限变更（entity_type 为 entity_changes 中优先级最高的类型）
+  entity_type?: EntityType;
+  entity_changes?: EntityChange[];
+}
+
+export type EntityType = 'AMOUNT' | 'PERCENTAGE' | 'DATE' | 'DURATION';
+
+export interface EntityChange {
+  type: EntityType;
+  old_text: string | null;
+  new_text: string | null;
+  // 金额（元）/百分比为数字，日期为 YYYY-MM(-DD)，期限为 数值+单位
+  old_value: number | string | null;
+  new_value: number | string | null;
 }